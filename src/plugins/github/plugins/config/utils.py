@@ -14,7 +14,13 @@ from src.plugins.github.plugins.publish.validation import add_step_summary, stri
 from src.plugins.github.utils import extract_issue_info_from_issue
 from src.providers.constants import PYPI_KEY_TEMPLATE
 from src.providers.docker_test import DockerPluginTest, Metadata
-from src.providers.models import RegistryPlugin, StoreTestResult
+from src.providers.models import (
+    PluginConfigDict,
+    RegistryPlugin,
+    RegistryPluginList,
+    StoreTestResult,
+    StoreTestResultDict,
+)
 from src.providers.utils import dump_json, load_json_from_file
 from src.providers.validation import PublishType, ValidationDict, validate_info
 from src.providers.validation.models import PluginPublishInfo
@@ -35,10 +41,8 @@ async def validate_info_from_issue(handler: IssueHandler) -> ValidationDict:
     )
     # 从历史插件中获取标签
     previous_plugins: dict[str, RegistryPlugin] = {
-        PYPI_KEY_TEMPLATE.format(
-            project_link=plugin["project_link"], module_name=plugin["module_name"]
-        ): RegistryPlugin(**plugin)
-        for plugin in load_json_from_file("plugins.json")
+        plugin.key: plugin
+        for plugin in load_json_from_file("plugins.json", RegistryPluginList)
     }
     raw_data["tags"] = previous_plugins[PYPI_KEY_TEMPLATE.format(**raw_data)].tags
     # 更新作者信息
@@ -56,7 +60,7 @@ async def validate_info_from_issue(handler: IssueHandler) -> ValidationDict:
 
     # 运行插件测试
     test = DockerPluginTest(project_link, module_name, test_config)
-    test_result = await test.run("3.12")
+    test_result = await test.run_matrix()
 
     # 去除颜色字符
     test_output = strip_ansi("\n".join(test_result.outputs))
@@ -70,6 +74,7 @@ async def validate_info_from_issue(handler: IssueHandler) -> ValidationDict:
     raw_data["load"] = test_result.load
     raw_data["test_output"] = test_output
     raw_data["metadata"] = bool(metadata)
+    raw_data["test_env"] = test_result.test_envs
 
     # 输出插件测试相关信息
     add_step_summary(await render_summary(test_result, test_output, project_link))
@@ -110,16 +115,11 @@ def update_file(result: ValidationDict) -> None:
 
     # 读取文件
     previous_plugins: dict[str, RegistryPlugin] = {
-        PYPI_KEY_TEMPLATE.format(
-            project_link=plugin["project_link"], module_name=plugin["module_name"]
-        ): RegistryPlugin(**plugin)
-        for plugin in load_json_from_file("plugins.json")
-    }
-    previous_results: dict[str, StoreTestResult] = {
-        key: StoreTestResult(**value)
-        for key, value in load_json_from_file("results.json").items()
+        plugin.key: plugin
+        for plugin in load_json_from_file("plugins.json", RegistryPluginList)
     }
-    plugin_configs: dict[str, str] = load_json_from_file("plugin_configs.json")
+    previous_results = load_json_from_file("results.json", StoreTestResultDict)
+    plugin_configs = load_json_from_file("plugin_configs.json", PluginConfigDict)
 
     # 更新信息
     plugin = RegistryPlugin.from_publish_info(result.info)
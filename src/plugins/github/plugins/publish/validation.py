@@ -110,7 +110,7 @@ async def validate_plugin_info_from_issue(
         # 插件不跳过则运行插件测试
         test_result = await DockerPluginTest(
             project_link, module_name, test_config
-        ).run("3.12")
+        ).run_matrix()
         # 去除颜色字符
         test_output = strip_ansi("\n".join(test_result.outputs))
         metadata = test_result.metadata
@@ -122,6 +122,7 @@ async def validate_plugin_info_from_issue(
         raw_data["load"] = test_result.load
         raw_data["test_output"] = test_output
         raw_data["metadata"] = bool(metadata)
+        raw_data["test_env"] = test_result.test_envs
 
         # 输出插件测试相关信息
         add_step_summary(await render_summary(test_result, test_output, project_link))
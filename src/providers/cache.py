@@ -0,0 +1,233 @@
+"""HTTP 响应缓存
+
+缓存 GET 请求的响应内容与 ETag/Last-Modified，再次请求时通过
+If-None-Match/If-Modified-Since 验证缓存是否有效，服务器返回 304 时直接使用缓存的内容。
+
+内存中只保留最近使用的部分响应，设置缓存目录后还会将响应保存到磁盘中，供之后的运行使用。
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Self
+
+import httpx
+from pydantic import BaseModel
+
+TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+""" 缓存的内容已经解压，不需要保存的响应头 """
+
+
+class CacheEntry(BaseModel):
+    """缓存的响应"""
+
+    url: str
+    headers: list[tuple[str, str]]
+    """响应头，不包含与传输编码相关的部分"""
+    content: bytes = b""
+    """解压后的响应内容"""
+
+    @property
+    def etag(self) -> str | None:
+        return self._get_header("etag")
+
+    @property
+    def last_modified(self) -> str | None:
+        return self._get_header("last-modified")
+
+    def dump(self) -> bytes:
+        """转换成文件内容
+
+        第一行为响应信息，之后为原始响应内容
+        """
+        info = self.model_dump_json(exclude={"content"})
+        return info.encode() + b"\n" + self.content
+
+    @classmethod
+    def load(cls, data: bytes) -> Self:
+        """从文件内容加载"""
+        info, _, content = data.partition(b"\n")
+        entry = cls.model_validate_json(info)
+        entry.content = content
+        return entry
+
+    def _get_header(self, name: str) -> str | None:
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+
+
+class HTTPCache:
+    """HTTP 响应缓存"""
+
+    def __init__(self, cache_dir: Path | None = None, maxsize: int = 128) -> None:
+        self.cache_dir = cache_dir
+        """缓存目录，为 None 时仅缓存在内存中"""
+        self.maxsize = maxsize
+        """内存中至多缓存的响应数量"""
+
+        self.hits = 0
+        """服务器返回 304，使用缓存的次数"""
+        self.misses = 0
+        """需要重新下载的次数"""
+
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def clear(self) -> None:
+        """清除内存中的缓存与统计数据"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, url: str) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / hashlib.sha256(url.encode()).hexdigest()
+
+    def get(self, url: str) -> CacheEntry | None:
+        """获取缓存的响应
+
+        优先从内存中获取，不存在时再从磁盘中读取
+        """
+        if url in self._entries:
+            self._entries.move_to_end(url)
+            return self._entries[url]
+
+        path = self._path(url)
+        if path is None or not path.exists():
+            return None
+        try:
+            entry = CacheEntry.load(path.read_bytes())
+        except ValueError:
+            # 缓存文件损坏时当作不存在
+            return None
+        self._remember(entry)
+        return entry
+
+    def set(self, entry: CacheEntry) -> None:
+        """保存响应"""
+        self._remember(entry)
+
+        path = self._path(entry.url)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写入临时文件再替换，避免其他进程读取到不完整的文件
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(entry.dump())
+        tmp_path.replace(path)
+
+    def _remember(self, entry: CacheEntry) -> None:
+        self._entries[entry.url] = entry
+        self._entries.move_to_end(entry.url)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def prepare(self, request: httpx.Request) -> CacheEntry | None:
+        """为请求添加验证缓存所需的请求头"""
+        if request.method != "GET":
+            return None
+        entry = self.get(str(request.url))
+        if entry is None:
+            return None
+        if entry.etag:
+            request.headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            request.headers["If-Modified-Since"] = entry.last_modified
+        return entry
+
+    def resolve(
+        self,
+        request: httpx.Request,
+        response: httpx.Response,
+        entry: CacheEntry | None,
+    ) -> httpx.Response:
+        """根据服务器的响应决定是否使用缓存
+
+        响应内容需要已经读取
+        """
+        if request.method != "GET":
+            return response
+
+        if response.status_code == 304 and entry is not None:
+            self.hits += 1
+            return httpx.Response(
+                200,
+                headers=entry.headers,
+                content=entry.content,
+                request=request,
+                extensions=response.extensions,
+            )
+
+        self.misses += 1
+        if response.status_code == 200 and (
+            "etag" in response.headers or "last-modified" in response.headers
+        ):
+            self.set(
+                CacheEntry(
+                    url=str(request.url),
+                    headers=[
+                        (key, value)
+                        for key, value in response.headers.multi_items()
+                        if key.lower() not in TRANSFER_HEADERS
+                    ],
+                    content=response.content,
+                )
+            )
+        return response
+
+    def summary(self) -> str:
+        return f"HTTP 缓存命中 {self.hits} 次，未命中 {self.misses} 次"
+
+
+class CacheTransport(httpx.BaseTransport):
+    """带缓存的同步传输"""
+
+    def __init__(
+        self, cache: HTTPCache, transport: httpx.BaseTransport | None = None
+    ) -> None:
+        self.cache = cache
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.cache.prepare(request)
+        response = self.transport.handle_request(request)
+        response.read()
+        return self.cache.resolve(request, response, entry)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncCacheTransport(httpx.AsyncBaseTransport):
+    """带缓存的异步传输"""
+
+    def __init__(
+        self, cache: HTTPCache, transport: httpx.AsyncBaseTransport | None = None
+    ) -> None:
+        self.cache = cache
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.cache.prepare(request)
+        response = await self.transport.handle_async_request(request)
+        await response.aread()
+        return self.cache.resolve(request, response, entry)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+http_cache = HTTPCache()
+"""全局共用的 HTTP 缓存"""
+
+
+def cached_client(**kwargs: Any) -> httpx.Client:
+    """创建使用全局缓存的同步客户端"""
+    return httpx.Client(transport=CacheTransport(http_cache), **kwargs)
+
+
+def cached_async_client(**kwargs: Any) -> httpx.AsyncClient:
+    """创建使用全局缓存的异步客户端"""
+    return httpx.AsyncClient(transport=AsyncCacheTransport(http_cache), **kwargs)
@@ -18,6 +18,9 @@ REGISTRY_BOTS_URL = f"{REGISTRY_BASE_URL}/bots.json"
 REGISTRY_DRIVERS_URL = f"{REGISTRY_BASE_URL}/drivers.json"
 REGISTRY_PLUGINS_URL = f"{REGISTRY_BASE_URL}/plugins.json"
 REGISTRY_PLUGIN_CONFIG_URL = f"{REGISTRY_BASE_URL}/plugin_configs.json"
+REGISTRY_SCHEDULER_URL = f"{REGISTRY_BASE_URL}/scheduler.json"
+REGISTRY_AUTHORS_URL = f"{REGISTRY_BASE_URL}/authors.json"
+REGISTRY_CHECKPOINT_URL = f"{REGISTRY_BASE_URL}/checkpoint.jsonl"
 
 # NoneBot 插件商店
 # https://github.com/nonebot/nonebot2/tree/master/assets
@@ -30,7 +33,43 @@ STORE_BOTS_URL = f"{STORE_BASE_URL}/bots.json5"
 STORE_DRIVERS_URL = f"{STORE_BASE_URL}/drivers.json5"
 STORE_PLUGINS_URL = f"{STORE_BASE_URL}/plugins.json5"
 
+# PyPI
+# 可以替换为本地的 PyPI 镜像，需要支持 JSON API 与 XML-RPC
+PYPI_BASE_URL = os.environ.get("PYPI_BASE_URL") or "https://pypi.org"
+PYPI_XMLRPC_URL = f"{PYPI_BASE_URL}/pypi"
+# 通过 pypi-proxy 命令启动的 PyPI 代理，需要是测试容器能够访问的地址，例如 http://172.17.0.1:3141
+# 设置后测试容器会将其作为主要的软件包索引
+PYPI_PROXY_URL = os.environ.get("PYPI_PROXY_URL")
+# 测试容器创建测试项目使用的依赖管理工具，可选 poetry 与 uv，未设置时使用 poetry
+PLUGIN_TEST_BACKEND = os.environ.get("PLUGIN_TEST_BACKEND")
+
+# GitHub API
+# 设置令牌后才能通过 GraphQL 批量获取作者信息
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL") or "https://api.github.com"
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+AUTHOR_CACHE_DAYS = 30
+""" 作者用户名的有效期，单位为天 """
+
 # 商店测试镜像
 # https://github.com/orgs/nonebot/packages/container/package/nonetest
 DOCKER_IMAGES_VERSION = os.environ.get("DOCKER_IMAGES_VERSION") or "latest"
 DOCKER_IMAGES = f"ghcr.io/nonebot/nonetest:{{}}-{DOCKER_IMAGES_VERSION}"
+
+# 插件测试的 Python 版本，以空格分隔，例如 3.10 3.11 3.12 3.13
+# 同一插件在各个版本中的测试同时进行
+PYTHON_VERSIONS = (os.environ.get("PYTHON_VERSIONS") or "3.12").split()
+DEFAULT_PYTHON_VERSION = os.environ.get("DEFAULT_PYTHON_VERSION") or "3.12"
+""" 默认的 Python 版本，不在测试版本中时也会测试 """
+LOAD_POLICY = os.environ.get("LOAD_POLICY") or "default"
+""" 插件是否加载成功的判定方式
+
+default: 在默认版本中加载成功
+any: 在任一版本中加载成功
+all: 在所有版本中都加载成功
+"""
+
+# 插件测试容器共用的软件包缓存
+# 为宿主机上的目录，设置后会挂载到每个测试容器中，供 pip 与 Poetry 使用
+PACKAGE_CACHE_DIR = os.environ.get("PACKAGE_CACHE_DIR")
+PACKAGE_CACHE_MAX_SIZE = int(os.environ.get("PACKAGE_CACHE_MAX_SIZE") or 10 * 1024**3)
+""" 软件包缓存的大小上限，单位为字节，超过后按照最近使用时间清理 """
@@ -1,10 +1,33 @@
+import asyncio
 import json
+import time
+import uuid
+from functools import cache
 from typing import TypedDict
 
 import docker
+from docker.errors import ContainerError, NotFound
+from docker.models.containers import Container
 from pydantic import BaseModel, Field, SkipValidation, field_validator
 
-from src.providers.constants import DOCKER_IMAGES, REGISTRY_PLUGINS_URL
+from src.providers.constants import (
+    DEFAULT_PYTHON_VERSION,
+    DOCKER_IMAGES,
+    LOAD_POLICY,
+    PLUGIN_TEST_BACKEND,
+    PYPI_PROXY_URL,
+    PYTHON_VERSIONS,
+    REGISTRY_PLUGINS_URL,
+)
+
+from .package_cache import package_cache
+
+UNKNOWN_TEST_ENV = "unknown"
+""" 容器没有输出测试环境时的默认值 """
+CONTAINER_POLL_INTERVAL = 1
+""" 查询容器是否运行结束的间隔，单位为秒 """
+CONTAINER_LOG_TAIL = 20
+""" 容器运行出错时附带的错误输出行数 """
 
 
 class Metadata(TypedDict):
@@ -17,6 +40,17 @@ class Metadata(TypedDict):
     supported_adapters: list[str] | None
 
 
+class PluginTestStats(BaseModel):
+    """插件测试的耗时与资源占用"""
+
+    timings: dict[str, float] = {}
+    """ 各个测试阶段的耗时，单位为秒 """
+    runtime: float | None = None
+    """ 容器运行的总耗时，单位为秒 """
+    peak_memory: int | None = None
+    """ 容器内存占用峰值，单位为字节 """
+
+
 class DockerTestResult(BaseModel):
     """Docker 测试结果"""
 
@@ -28,7 +62,7 @@ class DockerTestResult(BaseModel):
     """ 测试版本 """
     config: str = ""
     """ 测试配置 """
-    test_env: str = Field(default="unknown")
+    test_env: str = Field(default=UNKNOWN_TEST_ENV)
     """测试环境
 
     python==3.12 nonebot2==2.4.0 pydantic==2.10.0
@@ -37,12 +71,96 @@ class DockerTestResult(BaseModel):
     """ 插件元数据 """
     outputs: list[str]
     """ 测试输出 """
+    deps: dict[str, str] = {}
+    """ 依赖的商店插件与版本，键为模块名 """
+    test_envs: dict[str, bool] = {}
+    """ 各个测试环境中是否加载成功，由多个 Python 版本的测试结果合并而来 """
+    timings: dict[str, float] = {}
+    """ 各个测试阶段的耗时，单位为秒 """
+    peak_memory: int | None = None
+    """ 容器内存占用峰值，单位为字节 """
+    runtime: float | None = None
+    """ 容器运行的总耗时，单位为秒，由运行容器的一方记录 """
 
     @field_validator("config", mode="before")
     @classmethod
     def config_validator(cls, v: str | None):
         return v or ""
 
+    @property
+    def stats(self) -> PluginTestStats | None:
+        """测试耗时与资源占用，没有任何记录时为 None"""
+        if not self.timings and self.runtime is None and self.peak_memory is None:
+            return None
+        return PluginTestStats(
+            timings=self.timings, runtime=self.runtime, peak_memory=self.peak_memory
+        )
+
+
+def merge_results(
+    results: dict[str, DockerTestResult], default: str, policy: str
+) -> DockerTestResult:
+    """合并多个 Python 版本的测试结果
+
+    测试输出、元数据与插件版本等以默认版本的结果为准
+    是否加载成功由判定方式决定，各个版本的结果记录在 test_envs 中
+
+    Args:
+        results (dict[str, DockerTestResult]): Python 版本与对应的测试结果
+        default (str): 默认的 Python 版本
+        policy (str): 是否加载成功的判定方式，可选 default、any 与 all
+    """
+    test_envs: dict[str, bool] = {}
+    for version, result in results.items():
+        test_env = result.test_env
+        # 没有获取到测试环境时（默认为 unknown），只能用 Python 版本区分
+        if test_env in ("", UNKNOWN_TEST_ENV) or test_env in test_envs:
+            test_env = f"python=={version}"
+        test_envs[test_env] = result.load
+
+    match policy:
+        case "default":
+            load = results[default].load
+        case "any":
+            load = any(result.load for result in results.values())
+        case "all":
+            load = all(result.load for result in results.values())
+        case _:
+            raise ValueError(f"未知的加载判定方式：{policy}")
+
+    return results[default].model_copy(update={"load": load, "test_envs": test_envs})
+
+
+@cache
+def get_docker_client() -> docker.DockerClient:
+    """获取 Docker 客户端
+
+    同一进程内共用一个客户端与其连接池
+    """
+    return docker.DockerClient(base_url="unix://var/run/docker.sock")
+
+
+async def wait_container(container: Container) -> int:
+    """等待容器运行结束，返回退出码
+
+    定时查询容器的状态，而不是在线程中一直阻塞等待，
+    避免同时运行多个容器时占满默认线程池，使其他需要线程的操作无法执行
+    """
+    while True:
+        await asyncio.to_thread(container.reload)
+        if container.status in ("exited", "dead"):
+            return container.attrs["State"]["ExitCode"]
+        await asyncio.sleep(CONTAINER_POLL_INTERVAL)
+
+
+async def remove_container(client: docker.DockerClient, name: str) -> None:
+    """按照名称强制删除容器，容器不存在时忽略"""
+    try:
+        container = await asyncio.to_thread(client.containers.get, name)
+        await asyncio.to_thread(container.remove, force=True)
+    except NotFound:
+        pass
+
 
 class DockerPluginTest:
     def __init__(self, project_link: str, module_name: str, config: str = ""):
@@ -67,23 +185,111 @@ class DockerPluginTest:
 
         Returns:
             DockerTestResult: 测试结果
+
+        Raises:
+            ContainerError: 容器运行出错时抛出，附带最后几行错误输出
         """
         image_name = DOCKER_IMAGES.format(version)
         # 连接 Docker 环境
-        client = docker.DockerClient(base_url="unix://var/run/docker.sock")
-
-        # 运行 Docker 容器，捕获输出。 容器内运行的代码拥有超时设限，此处无需设置超时
-        output = client.containers.run(
-            image_name,
-            environment={
-                "PLUGIN_INFO": self.key,
-                "PLUGIN_CONFIG": self.config,
-                # 插件测试需要用到的插件列表来验证插件依赖是否正确加载
-                "PLUGINS_URL": REGISTRY_PLUGINS_URL,
-            },
-            detach=False,
-            remove=True,
-        ).decode()
-
-        data = json.loads(output)
+        client = get_docker_client()
+
+        environment = {
+            "PLUGIN_INFO": self.key,
+            "PLUGIN_CONFIG": self.config,
+            # 插件测试需要用到的插件列表来验证插件依赖是否正确加载
+            "PLUGINS_URL": REGISTRY_PLUGINS_URL,
+            **package_cache.environment,
+        }
+        if PYPI_PROXY_URL:
+            # 使用 PyPI 代理作为主要的软件包索引
+            environment["PYPI_INDEX_URL"] = f"{PYPI_PROXY_URL.rstrip('/')}/simple/"
+        if PLUGIN_TEST_BACKEND:
+            # 使用指定的依赖管理工具创建测试项目
+            environment["PLUGIN_TEST_BACKEND"] = PLUGIN_TEST_BACKEND
+
+        # 容器名称唯一，创建容器时被取消也能找到并删除容器
+        name = f"noneflow-plugin-test-{uuid.uuid4().hex}"
+        start = time.perf_counter()
+        # 在后台运行 Docker 容器，避免阻塞事件循环
+        creating = asyncio.ensure_future(
+            asyncio.to_thread(
+                client.containers.run,
+                image_name,
+                name=name,
+                environment=environment,
+                # 挂载共用的软件包缓存，未设置缓存目录时为空
+                volumes=package_cache.volumes,
+                detach=True,
+            )
+        )
+        try:
+            container = await asyncio.shield(creating)
+        except asyncio.CancelledError:
+            # 后台线程仍在创建容器，等待创建结束后删除，避免留下无人管理的容器
+            await asyncio.wait([creating])
+            await remove_container(client, name)
+            raise
+        try:
+            # 等待容器运行结束，捕获输出。容器内运行的代码拥有超时设限，此处无需设置超时
+            exit_code = await wait_container(container)
+            runtime = time.perf_counter() - start
+            if exit_code != 0:
+                stderr = await asyncio.to_thread(
+                    container.logs, stdout=False, stderr=True, tail=CONTAINER_LOG_TAIL
+                )
+                raise ContainerError(
+                    container,
+                    exit_code,
+                    None,
+                    image_name,
+                    stderr.decode(errors="replace"),
+                )
+            output = await asyncio.to_thread(container.logs, stdout=True, stderr=False)
+        finally:
+            # 强制删除容器，测试被取消时也会停止仍在运行的容器
+            await asyncio.to_thread(container.remove, force=True)
+
+        data = json.loads(output.decode())
+        data["runtime"] = round(runtime, 3)
         return DockerTestResult(**data)
+
+    async def run_matrix(
+        self,
+        versions: list[str] | None = None,
+        default: str | None = None,
+        policy: str | None = None,
+    ) -> DockerTestResult:
+        """同时在多个 Python 版本的 Docker 容器中测试插件
+
+        Args:
+            versions (list[str] | None): Python 版本，默认为 PYTHON_VERSIONS
+            default (str | None): 默认的 Python 版本，默认为 DEFAULT_PYTHON_VERSION
+            policy (str | None): 是否加载成功的判定方式，默认为 LOAD_POLICY
+
+        Returns:
+            DockerTestResult: 合并后的测试结果
+        """
+        versions = versions or PYTHON_VERSIONS
+        default = default or DEFAULT_PYTHON_VERSION
+        policy = policy or LOAD_POLICY
+        if default not in versions:
+            versions = [default, *versions]
+
+        outcomes = await asyncio.gather(
+            *(self.run(version) for version in versions), return_exceptions=True
+        )
+        results: dict[str, DockerTestResult] = {}
+        for version, outcome in zip(versions, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                # 默认版本的结果不可缺少，其他版本出错时视为未能运行
+                if version == default:
+                    raise outcome
+                outcome = DockerTestResult(
+                    run=False,
+                    load=False,
+                    metadata=None,
+                    outputs=[f"Python {version} 测试出错：{outcome}"],
+                    test_env=f"python=={version}",
+                )
+            results[version] = outcome
+        return merge_results(results, default, policy)
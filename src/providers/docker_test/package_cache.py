@@ -0,0 +1,249 @@
+"""插件测试容器共用的软件包缓存
+
+宿主机上的缓存目录会挂载到每个测试容器中，避免每个插件都重新下载 nonebot2、pydantic 等依赖
+
+目录结构如下，每个工具使用各自的子目录：
+
+- pip/: pip 的 HTTP 缓存与构建好的 wheel
+- poetry/: Poetry 的软件包元数据与下载的文件
+- uv/: uv 的软件包元数据与解压后的软件包
+- envs/: 测试过的虚拟环境，按照文件内容去重保存
+
+pip、Poetry、uv 与测试环境仓库都以地址或内容的哈希值作为缓存文件的路径，并且先写入临时文件再重命名，
+多个容器同时读写同一个缓存目录是安全的
+
+缓存的总大小超过上限时，按照最近使用的时间从旧到新删除缓存条目，而不是单个文件，避免留下不完整的缓存：
+
+- pip/、poetry/：同一个目录中的文件为一个条目，例如 pip 的响应头与响应内容、Poetry 下载的一个文件
+- uv/：每个缓存类别中的一级目录或文件为一个条目，例如 archive-v0 中一个解压后的软件包。
+  uv 会直接链接解压后的软件包中的文件，删除其中的单个文件会导致安装的软件包缺少模块
+- envs/：一个测试环境为一个条目，删除测试环境时同时删除只被它使用的文件，
+  没有被使用的文件与被强制停止的容器留下的测试目录也会被清理
+
+访问时间在 relatime/noatime 挂载下不可靠，最近使用的时间为条目中最新的修改时间。
+测试环境在还原时会更新修改时间，工具的缓存在读取时不会更新，以最后写入的时间为准
+"""
+
+import json
+import os
+import shutil
+import time
+from collections import Counter
+from pathlib import Path
+from stat import S_ISREG
+
+from src.providers.constants import PACKAGE_CACHE_DIR, PACKAGE_CACHE_MAX_SIZE
+
+CONTAINER_CACHE_DIR = "/root/.cache/noneflow"
+""" 缓存目录在容器中的挂载位置 """
+CACHE_TOOLS = ("pip", "poetry", "uv", "envs")
+""" 缓存目录中的子目录，分别供 pip、Poetry、uv 与测试环境仓库使用 """
+EVICT_GRACE_PERIOD = 60 * 60
+""" 最近一小时内使用过的文件可能正在被容器使用，清理时跳过，单位为秒 """
+CACHE_ENTRY_DEPTHS = {"uv": 2}
+""" 按照目录深度划分条目的工具，其他工具以同一个目录中的文件为一个条目 """
+
+
+class CacheItem:
+    """缓存条目，清理时整个删除"""
+
+    def __init__(
+        self,
+        paths: list[Path],
+        used: float,
+        size: int,
+        objects: list[Path] | None = None,
+    ) -> None:
+        self.paths = paths
+        """条目中需要删除的文件或目录"""
+        self.used = used
+        """最近使用的时间"""
+        self.size = size
+        """条目占用的空间，不包括 objects"""
+        self.objects = objects or []
+        """测试环境使用的文件，可能与其他测试环境共用，没有测试环境使用时才删除"""
+
+
+def _walk(root: Path) -> list[tuple[Path, os.stat_result]]:
+    """遍历目录中的文件与子目录"""
+    results = []
+    for path in root.rglob("*"):
+        try:
+            results.append((path, path.lstat()))
+        except FileNotFoundError:
+            # 文件在遍历时被其他容器删除或重命名
+            continue
+    return results
+
+
+def _tool_items(root: Path, depth: int | None = None) -> list[CacheItem]:
+    """工具缓存中的条目
+
+    Args:
+        root (Path): 工具的缓存目录
+        depth (int | None): 条目所在的目录深度，为 None 时同一个目录中的文件为一个条目
+    """
+    groups: dict[Path, list[tuple[Path, os.stat_result]]] = {}
+    for path, stat in _walk(root):
+        if not S_ISREG(stat.st_mode):
+            continue
+        if depth is None:
+            groups.setdefault(path.parent, []).append((path, stat))
+            continue
+        parts = path.relative_to(root).parts
+        # 缓存目录中的锁文件等不属于任何条目
+        if len(parts) >= depth:
+            groups.setdefault(root.joinpath(*parts[:depth]), []).append((path, stat))
+    return [
+        CacheItem(
+            # 按照深度划分时整个目录一起删除
+            [entry] if depth is not None else [path for path, _ in files],
+            max(stat.st_mtime for _, stat in files),
+            sum(stat.st_size for _, stat in files),
+        )
+        for entry, files in groups.items()
+    ]
+
+
+def _env_items(root: Path) -> tuple[list[CacheItem], dict[Path, int]]:
+    """测试环境仓库中的条目
+
+    每个测试环境为一个条目，没有被任何测试环境使用的文件与被强制停止的容器留下的测试目录也各为一个条目。
+    这两种条目可能正在被容器写入，硬链接会保留文件原来的修改时间，所以同时使用状态改变的时间判断
+
+    Returns:
+        tuple[list[CacheItem], dict[Path, int]]: 条目，与测试环境使用的文件的大小
+    """
+    objects = {
+        path: stat.st_size
+        for path, stat in _walk(root / "objects")
+        if S_ISREG(stat.st_mode)
+    }
+    items: list[CacheItem] = []
+    used_objects: set[Path] = set()
+    for path, stat in _walk(root / "envs"):
+        if path.suffix != ".json":
+            continue
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+            digests = {digest for _, digest, _ in manifest["files"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            # 已经损坏的测试环境，只删除自身
+            digests = set()
+        env_objects = [root / "objects" / digest[:2] / digest for digest in digests]
+        used_objects.update(env_objects)
+        items.append(CacheItem([path], stat.st_mtime, stat.st_size, env_objects))
+
+    for path, size in objects.items():
+        if path in used_objects:
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        items.append(CacheItem([path], max(stat.st_mtime, stat.st_ctime), size))
+
+    tmp_dir = root / "tmp"
+    for workspace in tmp_dir.iterdir() if tmp_dir.is_dir() else []:
+        stats = [stat for _, stat in _walk(workspace)]
+        try:
+            stats.append(workspace.lstat())
+        except FileNotFoundError:
+            continue
+        items.append(
+            CacheItem(
+                [workspace],
+                max(max(stat.st_mtime, stat.st_ctime) for stat in stats),
+                sum(stat.st_size for stat in stats if S_ISREG(stat.st_mode)),
+            )
+        )
+    return items, {path: objects[path] for path in used_objects if path in objects}
+
+
+class PackageCache:
+    """软件包缓存"""
+
+    def __init__(self, root: Path | None = None, max_size: int = 0) -> None:
+        self.root = root
+        """宿主机上的缓存目录，为 None 时不使用缓存"""
+        self.max_size = max_size
+        """缓存的大小上限，单位为字节"""
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    @property
+    def volumes(self) -> dict[str, dict[str, str]]:
+        """挂载到容器中的目录
+
+        Docker 只接受绝对路径，并且需要提前创建好各个工具的子目录，
+        否则 Docker 会以 root 身份创建目录
+        """
+        if self.root is None:
+            return {}
+        root = self.root.resolve()
+        for tool in CACHE_TOOLS:
+            (root / tool).mkdir(parents=True, exist_ok=True)
+        return {str(root): {"bind": CONTAINER_CACHE_DIR, "mode": "rw"}}
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """传递给容器的环境变量，告诉容器中的测试缓存目录的位置"""
+        if self.root is None:
+            return {}
+        return {
+            "PACKAGE_CACHE_DIR": CONTAINER_CACHE_DIR,
+            "ENV_STORE_DIR": f"{CONTAINER_CACHE_DIR}/envs",
+        }
+
+    def evict(self) -> tuple[int, int]:
+        """按照最近使用的时间清理缓存条目，直到总大小不超过上限
+
+        Returns:
+            tuple[int, int]: 删除的条目数量与释放的空间
+        """
+        if self.root is None or not self.root.exists():
+            return 0, 0
+
+        items: list[CacheItem] = []
+        for tool in CACHE_TOOLS:
+            if tool != "envs":
+                items.extend(
+                    _tool_items(self.root / tool, CACHE_ENTRY_DEPTHS.get(tool))
+                )
+        env_items, objects = _env_items(self.root / "envs")
+        items.extend(env_items)
+
+        # 多个测试环境共用的文件只计算一次
+        total = sum(item.size for item in items) + sum(objects.values())
+        refs = Counter(path for item in items for path in item.objects)
+
+        removed = freed = 0
+        now = time.time()
+        for item in sorted(items, key=lambda item: item.used):
+            if total <= self.max_size:
+                break
+            if now - item.used < EVICT_GRACE_PERIOD:
+                continue
+            paths, size = list(item.paths), item.size
+            for path in item.objects:
+                refs[path] -= 1
+                if refs[path] == 0:
+                    paths.append(path)
+                    size += objects.get(path, 0)
+            for path in paths:
+                if path.is_dir() and not path.is_symlink():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+
+package_cache = PackageCache(
+    Path(PACKAGE_CACHE_DIR) if PACKAGE_CACHE_DIR else None, PACKAGE_CACHE_MAX_SIZE
+)
+"""全局共用的软件包缓存"""
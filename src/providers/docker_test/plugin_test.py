@@ -6,21 +6,48 @@
 
 当前会输出 RESULT, OUTPUT, METADATA 三个数据，分别对应测试结果、测试输出、插件元数据。
 
+同时会记录各个测试阶段的耗时与容器的内存占用峰值。
+
+默认使用 Poetry 创建测试项目，设置 PLUGIN_TEST_BACKEND 环境变量为 uv 时使用 uv。
+
 经测试可以直接在 Python 3.10+ 环境下运行，无需额外依赖。
 """
 # ruff: noqa: T201, ASYNC109
 
 import asyncio
+import hashlib
 import json
 import os
 import re
+import resource
+import shutil
+import stat
 import sys
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
 from asyncio import create_subprocess_shell, subprocess
+from collections.abc import Awaitable
 from pathlib import Path
+from typing import TypeVar
+from urllib.parse import urlparse
 from urllib.request import urlopen
 
+T = TypeVar("T")
+
 # NoneBot Store
 PLUGINS_URL = os.environ.get("PLUGINS_URL")
+# 共用的软件包缓存目录
+PACKAGE_CACHE_DIR = os.environ.get("PACKAGE_CACHE_DIR")
+# 作为主要软件包索引的 PyPI 代理
+PYPI_INDEX_URL = os.environ.get("PYPI_INDEX_URL")
+# 测试镜像中预先安装好 nonebot2 的基础环境
+BASE_ENV_DIR = os.environ.get("BASE_ENV_DIR")
+# 保存测试过的虚拟环境的仓库
+ENV_STORE_DIR = os.environ.get("ENV_STORE_DIR")
+# 创建测试项目使用的依赖管理工具，可选 poetry 与 uv
+PLUGIN_TEST_BACKEND = os.environ.get("PLUGIN_TEST_BACKEND") or "poetry"
 # 匹配信息的正则表达式
 ISSUE_PATTERN = r"### {}\s+([^\s#].*?)(?=(?:\s+###|$))"
 
@@ -208,9 +235,11 @@ def parse_requirements(requirements: str) -> dict[str, str]:
     """解析 requirements.txt 文件"""
     # anyio==3.6.2 ; python_version >= "3.11" and python_version < "4.0"
     # pydantic[dotenv]==1.10.6 ; python_version >= "3.10" and python_version < "4.0"
+    # uv 导出的依赖在没有环境标记时不包含分号
+    # nonebot2==2.4.0
     results = {}
     for line in requirements.strip().splitlines():
-        match = re.match(r"^(.+?)(?:\[.+\])?==(.+) ;", line)
+        match = re.match(r"^(.+?)(?:\[.+\])?==([^\s;]+)", line)
         if match:
             package_name = match.group(1)
             version = match.group(2)
@@ -218,6 +247,370 @@ def parse_requirements(requirements: str) -> dict[str, str]:
     return results
 
 
+def get_peak_memory() -> int | None:
+    """获取内存占用峰值，单位为字节
+
+    优先读取容器的 cgroup 数据，不存在时使用子进程的最大常驻内存
+    """
+    for path in [
+        # cgroup v2
+        "/sys/fs/cgroup/memory.peak",
+        # cgroup v1
+        "/sys/fs/cgroup/memory/memory.max_usage_in_bytes",
+    ]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+
+    # Linux 下单位为 KB
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return usage * 1024 if usage else None
+
+
+class Backend(ABC):
+    """依赖管理工具
+
+    负责生成创建测试项目、获取插件信息、导出依赖与运行插件的命令，
+    不同工具的输出通过 extract_version 与 parse_requirements 转换为相同的测试结果
+    """
+
+    name = ""
+    """工具名称"""
+
+    def environment(self) -> dict[str, str]:
+        """工具需要的环境变量"""
+        return {}
+
+    @abstractmethod
+    def create_command(self, project_link: str, base_env: Path | None) -> str:
+        """创建测试项目并安装插件"""
+
+    @abstractmethod
+    def lock_command(self, project_link: str) -> str:
+        """创建测试项目并解析依赖，只生成锁文件不安装"""
+
+    @abstractmethod
+    def install_command(self, base_env: Path | None) -> str:
+        """按照锁文件安装依赖"""
+
+    @abstractmethod
+    def show_command(self, project_link: str) -> str:
+        """获取插件信息"""
+
+    @abstractmethod
+    def export_command(self) -> str:
+        """导出 requirements.txt 格式的依赖"""
+
+    @abstractmethod
+    def run_command(self, script: str) -> str:
+        """在测试项目的虚拟环境中运行脚本"""
+
+    @abstractmethod
+    def extract_version(self, output: str, project_link: str) -> str | None:
+        """从插件信息或者创建失败的输出中提取插件版本"""
+
+
+class PoetryBackend(Backend):
+    """Poetry"""
+
+    name = "poetry"
+
+    def environment(self) -> dict[str, str]:
+        env = {
+            # https://python-poetry.org/docs/configuration/#virtualenvsin-project
+            "POETRY_VIRTUALENVS_IN_PROJECT": "true",
+            # https://python-poetry.org/docs/configuration/#virtualenvsprefer-active-python-experimental
+            "POETRY_VIRTUALENVS_PREFER_ACTIVE_PYTHON": "true",
+        }
+        if PACKAGE_CACHE_DIR:
+            # https://python-poetry.org/docs/configuration/#cache-dir
+            env["POETRY_CACHE_DIR"] = f"{PACKAGE_CACHE_DIR}/poetry"
+        return env
+
+    def _init_command(self) -> str:
+        """创建测试项目，设置 PyPI 代理时将其添加为主要的软件源"""
+        source = (
+            f" && poetry source add --priority=primary pypi-proxy {PYPI_INDEX_URL}"
+            if PYPI_INDEX_URL
+            else ""
+        )
+        return f"""poetry init -n && sed -i "s/\\^/~/g" pyproject.toml{source}"""
+
+    def create_command(self, project_link: str, base_env: Path | None) -> str:
+        # 存在基础环境时只复制虚拟环境，已经安装的软件包版本与解析结果相同时不需要重新安装
+        # 不复制基础环境的锁文件，依赖仍然解析为最新的版本，不会固定在构建镜像时的版本
+        # 基础环境中有但插件不需要的软件包会在最后删除，避免影响测试结果
+        base, sync = "", ""
+        if base_env is not None:
+            base = f"cp -a --reflink=auto {base_env}/.venv .venv && "
+            sync = " && poetry install --sync --no-root"
+        return f"{self._init_command()} && {base}poetry env info --ansi && poetry add {project_link}{sync}"
+
+    def lock_command(self, project_link: str) -> str:
+        return f"{self._init_command()} && poetry add --lock {project_link}"
+
+    def install_command(self, base_env: Path | None) -> str:
+        # 解析依赖时可能已经创建了虚拟环境，需要先删除再复制基础环境
+        base, sync = "", ""
+        if base_env is not None:
+            base = f"rm -rf .venv && cp -a --reflink=auto {base_env}/.venv .venv && "
+            sync = " --sync"
+        return f"{base}poetry env info --ansi && poetry install --no-root{sync}"
+
+    def show_command(self, project_link: str) -> str:
+        return f"poetry show {project_link}"
+
+    def export_command(self) -> str:
+        return "poetry export --without-hashes"
+
+    def run_command(self, script: str) -> str:
+        return f"poetry run python {script}"
+
+    def extract_version(self, output: str, project_link: str) -> str | None:
+        return extract_version(output, project_link)
+
+
+class UvBackend(Backend):
+    """uv
+
+    解析与安装依赖的速度比 Poetry 快很多，创建项目时同样限制 Python 的版本范围，
+    使依赖解析的结果与 Poetry 一致
+    """
+
+    name = "uv"
+
+    def environment(self) -> dict[str, str]:
+        env = {
+            # 使用运行测试的 Python，不下载其他版本
+            # https://docs.astral.sh/uv/configuration/environment/
+            "UV_PYTHON": sys.executable,
+            "UV_PYTHON_PREFERENCE": "only-system",
+            "UV_NO_PROGRESS": "true",
+        }
+        if PACKAGE_CACHE_DIR:
+            env["UV_CACHE_DIR"] = f"{PACKAGE_CACHE_DIR}/uv"
+        if PYPI_INDEX_URL:
+            env["UV_DEFAULT_INDEX"] = PYPI_INDEX_URL
+        return env
+
+    def _init_command(self) -> str:
+        """创建测试项目，只使用运行测试的 Python 版本解析依赖"""
+        python = f"{sys.version_info.major}.{sys.version_info.minor}"
+        return f"""uv init --app --no-readme --no-pin-python --no-workspace --vcs none && sed -i 's/^requires-python = .*/requires-python = "=={python}.*"/' pyproject.toml"""
+
+    def create_command(self, project_link: str, base_env: Path | None) -> str:
+        # 基础环境为 Poetry 项目，只复制虚拟环境，uv 会复用其中版本相同的软件包
+        # 最后删除插件不需要的软件包，避免影响测试结果
+        base, sync = "", ""
+        if base_env is not None:
+            base = f"cp -a --reflink=auto {base_env}/.venv .venv && "
+            sync = " && uv sync"
+        # uv 将进度信息输出到标准错误，合并到标准输出中记录
+        return f"({self._init_command()} && {base}uv add {project_link}{sync}) 2>&1"
+
+    def lock_command(self, project_link: str) -> str:
+        return f"({self._init_command()} && uv add --no-sync {project_link}) 2>&1"
+
+    def install_command(self, base_env: Path | None) -> str:
+        base = ""
+        if base_env is not None:
+            base = f"rm -rf .venv && cp -a --reflink=auto {base_env}/.venv .venv && "
+        return f"({base}uv sync --frozen) 2>&1"
+
+    def show_command(self, project_link: str) -> str:
+        # 未指定时 uv pip show 会使用 UV_PYTHON，也就是没有安装插件的系统 Python
+        return f"uv pip show --python .venv/bin/python {project_link}"
+
+    def export_command(self) -> str:
+        return "uv export --frozen --no-hashes --no-header --no-emit-project"
+
+    def run_command(self, script: str) -> str:
+        return f"uv run --no-sync python {script}"
+
+    def extract_version(self, output: str, project_link: str) -> str | None:
+        # 匹配 uv pip show 的输出
+        match = re.search(r"^Version:\s*(\S+)", strip_ansi(output), re.MULTILINE)
+        if match:
+            return match.group(1).strip()
+        # 匹配版本解析失败的情况
+        # Because project-link==0.5.0 depends on nonebot2>=2.5.0 ...
+        project_link = canonicalize_name(project_link)
+        match = re.search(
+            rf"\b{re.escape(project_link)}==(\S+) depends on", strip_ansi(output)
+        )
+        if match:
+            return match.group(1).strip()
+
+
+BACKENDS: dict[str, type[Backend]] = {"poetry": PoetryBackend, "uv": UvBackend}
+
+
+def get_backend(name: str) -> Backend:
+    """根据名称获取依赖管理工具"""
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的依赖管理工具 {name}")
+    return BACKENDS[name]()
+
+
+def file_digest(path: Path) -> str:
+    """文件内容的 SHA256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EnvStore:
+    """测试环境仓库
+
+    虚拟环境中的文件按照内容的 SHA256 保存在 objects 中，每个测试环境只记录文件与哈希值的对应关系，
+    以解析出的依赖（导出的 requirements.txt）的哈希值作为标识保存在 envs 中。
+    还原测试环境时通过硬链接使用仓库中的文件，依赖相同或者相近的测试环境几乎不占用额外的空间。
+
+    硬链接要求测试目录与仓库在同一个文件系统中，所以测试目录通过 workspace 创建在仓库的 tmp 中，
+    无法创建硬链接时则复制文件。
+
+    测试时先解析依赖，只有解析结果与保存的测试环境完全相同时才直接还原，
+    插件的依赖（例如 nonebot2、pydantic）发布新版本后会重新安装，不会继续使用旧版本的测试环境。
+
+    仓库中的文件是只读的，可执行文件与普通文件分开保存，硬链接共用同一份文件时权限也相同。
+    以 root 身份运行时只读权限无法阻止原地修改，所以还原时会重新校验文件内容，被修改过的测试环境不会再被使用。
+
+    所有文件都先写入名称唯一的临时文件再链接或重命名，各个容器中的测试进程号都相同，不能用来区分临时文件。
+    多个测试同时使用同一个仓库是安全的。
+    """
+
+    def __init__(self, root: Path, backend: Backend | None = None) -> None:
+        self.root = root
+        self.backend = backend or PoetryBackend()
+
+    def env_key(self, requirements: str) -> str:
+        """测试环境的标识，不同 Python 版本与依赖管理工具的环境不能共用"""
+        python = f"{sys.version_info.major}.{sys.version_info.minor}"
+        return hashlib.sha256(
+            f"{python}\n{self.backend.name}\n{requirements}".encode()
+        ).hexdigest()[:16]
+
+    @staticmethod
+    def _object_name(digest: str, mode: int) -> str:
+        """仓库中的文件名，可执行文件带有 .x 后缀"""
+        return f"{digest}.x" if mode & 0o111 else digest
+
+    def _object_path(self, name: str) -> Path:
+        return self.root / "objects" / name[:2] / name
+
+    def _manifest_path(self, key: str) -> Path:
+        return self.root / "envs" / f"{key}.json"
+
+    @staticmethod
+    def _tmp_path(path: Path) -> Path:
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def _write_json(self, path: Path, data: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._tmp_path(path)
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def workspace(self) -> Path:
+        """在仓库所在的文件系统中创建测试目录，测试结束后需要删除"""
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(dir=tmp_dir))
+
+    def _store_object(self, path: Path, mode: int) -> str:
+        """将文件保存到仓库中，并用仓库中的文件替换原文件，使相同内容的文件共用一份
+
+        Returns:
+            str: 仓库中的文件名
+        """
+        name = self._object_name(file_digest(path), mode)
+        object_path = self._object_path(name)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        if not object_path.exists():
+            tmp_path = self._tmp_path(object_path)
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                shutil.copy2(path, tmp_path)
+            # 仓库中的文件只读，原地修改共用的文件时直接报错
+            os.chmod(tmp_path, 0o555 if mode & 0o111 else 0o444)
+            try:
+                os.link(tmp_path, object_path)
+            except FileExistsError:
+                # 其他测试已经保存了相同内容的文件
+                pass
+            finally:
+                tmp_path.unlink()
+        tmp_path = self._tmp_path(path)
+        try:
+            os.link(object_path, tmp_path)
+            tmp_path.replace(path)
+        except OSError:
+            # 无法创建硬链接时保留原文件
+            tmp_path.unlink(missing_ok=True)
+        return name
+
+    def save(self, project: Path, requirements: str) -> str:
+        """保存测试项目的虚拟环境
+
+        Returns:
+            str: 测试环境的标识
+        """
+        key = self.env_key(requirements)
+        files: list[tuple[str, str, int]] = []
+        links: list[tuple[str, str]] = []
+        for path in sorted((project / ".venv").rglob("*")):
+            name = path.relative_to(project).as_posix()
+            if path.is_symlink():
+                links.append((name, os.readlink(path)))
+            elif path.is_file():
+                mode = stat.S_IMODE(path.stat().st_mode)
+                files.append((name, self._store_object(path, mode), mode))
+        self._write_json(self._manifest_path(key), {"files": files, "links": links})
+        return key
+
+    def exists(self, key: str) -> bool:
+        """仓库中是否保存了对应的测试环境"""
+        return self._manifest_path(key).exists()
+
+    def restore(self, key: str, project: Path) -> None:
+        """将测试环境的虚拟环境还原到测试项目中
+
+        还原时会更新测试环境的修改时间，清理缓存时优先删除最久没有使用的测试环境
+
+        Raises:
+            OSError: 测试环境不存在，或者仓库中的文件已经被清理或修改
+        """
+        manifest_path = self._manifest_path(key)
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest_path.touch()
+        for name, object_name, mode in manifest["files"]:
+            object_path = self._object_path(object_name)
+            if not object_path.exists():
+                raise FileNotFoundError(f"文件 {name} 已被清理")
+            if file_digest(object_path) != object_name.removesuffix(".x"):
+                # 删除被修改的文件与测试环境，重新安装后会保存新的测试环境
+                object_path.unlink(missing_ok=True)
+                manifest_path.unlink(missing_ok=True)
+                raise OSError(f"文件 {name} 已被修改")
+            path = project / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(object_path, path)
+            except OSError:
+                shutil.copy2(object_path, path)
+                os.chmod(path, mode)
+        for name, target in manifest["links"]:
+            path = project / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.symlink(target, path)
+
+
 class PluginTest:
     def __init__(self, project_info: str, config: str | None = None) -> None:
         """插件测试构造函数
@@ -234,7 +627,8 @@ class PluginTest:
 
         self._create = False
         self._run = False
-        self._deps = []
+        # 依赖的商店插件与版本，键为模块名
+        self._deps: dict[str, str] = {}
 
         self._lines_output = []
 
@@ -242,6 +636,14 @@ class PluginTest:
         self._test_dir = Path("plugin_test")
         self._test_env = []
 
+        # 各个测试阶段的耗时
+        self._timings: dict[str, float] = {}
+
+        # 导出的依赖
+        self._requirements = ""
+        # 从测试环境仓库中还原的测试环境
+        self._env_key: str | None = None
+
     @property
     def key(self) -> str:
         """插件的标识符
@@ -258,19 +660,61 @@ class PluginTest:
         key = self.key.replace(":", "-")
         return self._test_dir / f"{key}"
 
+    @property
+    def base_env(self) -> Path | None:
+        """测试镜像中的基础环境，不存在时为 None
+
+        基础环境为已经安装好 nonebot2 及其依赖的 Poetry 项目
+        """
+        if not BASE_ENV_DIR:
+            return None
+        base_env = Path(BASE_ENV_DIR)
+        if (
+            not (base_env / ".venv").is_dir()
+            or not (base_env / "poetry.lock").is_file()
+        ):
+            return None
+        return base_env
+
+    @property
+    def base_fingerprint(self) -> str | None:
+        """基础环境的指纹，为锁文件的哈希值"""
+        if self.base_env is None:
+            return None
+        lock = (self.base_env / "poetry.lock").read_bytes()
+        return hashlib.sha256(lock).hexdigest()[:12]
+
+    @property
+    def backend(self) -> Backend:
+        """创建测试项目使用的依赖管理工具"""
+        return get_backend(PLUGIN_TEST_BACKEND)
+
+    @property
+    def env_store(self) -> EnvStore | None:
+        """测试环境仓库，未设置时为 None"""
+        if not ENV_STORE_DIR:
+            return None
+        return EnvStore(Path(ENV_STORE_DIR), self.backend)
+
     @property
     def env(self) -> dict[str, str]:
         """获取环境变量"""
         env = os.environ.copy()
-        # 删除虚拟环境变量，防止 poetry 使用运行当前脚本的虚拟环境
+        # 删除虚拟环境变量，防止依赖管理工具使用运行当前脚本的虚拟环境
         env.pop("VIRTUAL_ENV", None)
         # 启用 LOGURU 的颜色输出
         env["LOGURU_COLORIZE"] = "true"
-        # Poetry 配置
-        # https://python-poetry.org/docs/configuration/#virtualenvsin-project
-        env["POETRY_VIRTUALENVS_IN_PROJECT"] = "true"
-        # https://python-poetry.org/docs/configuration/#virtualenvsprefer-active-python-experimental
-        env["POETRY_VIRTUALENVS_PREFER_ACTIVE_PYTHON"] = "true"
+        # 依赖管理工具的配置，包括共用的软件包缓存与 PyPI 代理
+        env.update(self.backend.environment())
+        # 使用共用的软件包缓存，避免每次测试都重新下载依赖
+        if PACKAGE_CACHE_DIR:
+            # https://pip.pypa.io/en/stable/topics/caching/
+            env["PIP_CACHE_DIR"] = f"{PACKAGE_CACHE_DIR}/pip"
+        # 使用 PyPI 代理安装软件包，Poetry 的软件源在创建项目时添加
+        if PYPI_INDEX_URL:
+            env["PIP_INDEX_URL"] = PYPI_INDEX_URL
+            # 代理使用 HTTP，需要信任代理的地址
+            env["PIP_TRUSTED_HOST"] = urlparse(PYPI_INDEX_URL).hostname or ""
         return env
 
     def _log_output(self, msg: str):
@@ -280,24 +724,35 @@ class PluginTest:
     async def run(self):
         """插件测试入口"""
 
+        # 使用测试环境仓库时，测试目录需要与仓库在同一个文件系统中才能创建硬链接
+        env_store = self.env_store
+        if env_store is not None:
+            self._test_dir = env_store.workspace()
+
         # 创建测试目录
         if not self._test_dir.exists():
             self._test_dir.mkdir()
 
         # 创建插件测试项目
-        await self.create_poetry_project()
+        await self._timed("create_poetry_project", self.create_poetry_project())
         if self._create:
             await asyncio.gather(
-                self.show_package_info(),
-                self.show_plugin_dependencies(),
+                self._timed("show_package_info", self.show_package_info()),
+                self._timed(
+                    "show_plugin_dependencies", self.show_plugin_dependencies()
+                ),
             )
-            await self.run_poetry_project()
+            await self._timed("run_poetry_project", self.run_poetry_project())
+            self.save_env()
 
         metadata = None
         metadata_path = self.path / "metadata.json"
         if metadata_path.exists():
             with open(self.path / "metadata.json", encoding="utf-8") as f:
                 metadata = json.load(f)
+        if env_store is not None:
+            # 测试目录在挂载的缓存目录中，不会随容器一起删除
+            shutil.rmtree(self._test_dir, ignore_errors=True)
 
         result = {
             "metadata": metadata,
@@ -307,11 +762,22 @@ class PluginTest:
             "version": self._version,
             "config": self.config,
             "test_env": " ".join(self._test_env),
+            "deps": self._deps,
+            "timings": self._timings,
+            "peak_memory": get_peak_memory(),
         }
         # 输出测试结果
         print(json.dumps(result, ensure_ascii=False))
         return result
 
+    async def _timed(self, name: str, coro: Awaitable[T]) -> T:
+        """记录测试阶段的耗时，单位为秒"""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self._timings[name] = round(time.perf_counter() - start, 3)
+
     async def command(self, cmd: str, timeout: int = 300) -> tuple[bool, str, str]:
         """执行命令
 
@@ -345,23 +811,80 @@ class PluginTest:
 
         return not code, stdout.decode(), stderr.decode()
 
+    async def create_from_env_store(self, env_store: EnvStore) -> tuple[bool, str, str]:
+        """先解析依赖，仓库中有依赖完全相同的测试环境时直接还原，否则再安装依赖
+
+        Returns:
+            tuple[bool, str, str]: 命令执行返回值，标准输出，标准错误
+        """
+        code, stdout, stderr = await self.command(
+            self.backend.lock_command(self.project_link)
+        )
+        if not code:
+            return code, stdout, stderr
+
+        exported, requirements, _ = await self.command(self.backend.export_command())
+        if exported:
+            key = env_store.env_key(requirements)
+            if env_store.exists(key):
+                # 解析依赖时可能已经创建了空的虚拟环境
+                shutil.rmtree(self.path / ".venv", ignore_errors=True)
+                try:
+                    env_store.restore(key, self.path)
+                except OSError as e:
+                    # 仓库中的文件可能已经被清理，重新安装依赖
+                    self._log_output(f"测试环境 {key} 还原失败：{e}")
+                    shutil.rmtree(self.path / ".venv", ignore_errors=True)
+                else:
+                    self._env_key = key
+                    return True, stdout, stderr
+
+        install_code, install_stdout, install_stderr = await self.command(
+            self.backend.install_command(self.base_env)
+        )
+        return install_code, stdout + install_stdout, stderr + install_stderr
+
+    def save_env(self) -> None:
+        """将新创建的测试环境保存到测试环境仓库中"""
+        if (
+            self.env_store is None
+            or self._env_key is not None
+            or not self._requirements
+        ):
+            return
+        try:
+            self.env_store.save(self.path, self._requirements)
+        except OSError as e:
+            self._log_output(f"测试环境保存失败：{e}")
+
     async def create_poetry_project(self):
-        """创建 poetry 项目用来测试插件"""
+        """创建项目用来测试插件"""
         if not self.path.exists():
             self.path.mkdir()
 
-            code, stdout, stderr = await self.command(
-                f"""poetry init -n && sed -i "s/\\^/~/g" pyproject.toml && poetry env info --ansi && poetry add {self.project_link}"""
-            )
+            env_store = self.env_store
+            if env_store is not None:
+                code, stdout, stderr = await self.create_from_env_store(env_store)
+            else:
+                code, stdout, stderr = await self.command(
+                    self.backend.create_command(self.project_link, self.base_env)
+                )
 
             self._create = code
 
             if self._create:
-                self._log_output(f"项目 {self.project_link} 创建成功。")
+                if self._env_key is not None:
+                    self._log_output(
+                        f"项目 {self.project_link} 使用已有的测试环境 {self._env_key} 创建成功。"
+                    )
+                else:
+                    self._log_output(f"项目 {self.project_link} 创建成功。")
                 self._std_output(stdout)
             else:
                 # 创建失败时尝试从报错中获取插件版本号
-                self._version = extract_version(stdout + stderr, self.project_link)
+                self._version = self.backend.extract_version(
+                    stdout + stderr, self.project_link
+                )
 
                 self._log_output(f"项目 {self.project_link} 创建失败：")
                 self._std_output(stdout, stderr)
@@ -374,11 +897,11 @@ class PluginTest:
         """获取插件的版本与插件信息"""
         if self.path.exists():
             code, stdout, stderr = await self.command(
-                f"poetry show {self.project_link}"
+                self.backend.show_command(self.project_link)
             )
             if code:
                 # 获取插件版本
-                self._version = extract_version(stdout, self.project_link)
+                self._version = self.backend.extract_version(stdout, self.project_link)
 
                 # 记录插件信息至输出
                 self._log_output(f"插件 {self.project_link} 的信息如下：")
@@ -410,7 +933,7 @@ class PluginTest:
                 )
 
             code, stdout, stderr = await self.command(
-                "poetry run python runner.py", timeout=600
+                self.backend.run_command("runner.py"), timeout=600
             )
 
             self._run = code
@@ -425,10 +948,11 @@ class PluginTest:
     async def show_plugin_dependencies(self) -> None:
         """获取插件的依赖"""
         if self.path.exists():
-            code, stdout, stderr = await self.command("poetry export --without-hashes")
+            code, stdout, stderr = await self.command(self.backend.export_command())
 
             if code:
                 self._log_output(f"插件 {self.project_link} 依赖的插件如下：")
+                self._requirements = stdout
                 requirements = parse_requirements(stdout)
                 self._deps = self._get_deps(requirements)
                 self._test_env = self._get_test_env(requirements)
@@ -454,17 +978,20 @@ class PluginTest:
         for i in _err:
             self._log_output(f"    {i}")
 
-    def _get_deps(self, requirements: dict[str, str]) -> list[str]:
-        """获取插件依赖"""
-        deps = []
-        for package_name in requirements:
+    def _get_deps(self, requirements: dict[str, str]) -> dict[str, str]:
+        """获取插件依赖
+
+        返回依赖的商店插件的模块名与版本
+        """
+        deps = {}
+        for package_name, version in requirements.items():
             if (
                 package_name in self.plugin_list
                 # 不用包括插件自己
                 and package_name != canonicalize_name(self.project_link)
             ):
                 module_name = self.plugin_list[package_name]
-                deps.append(module_name)
+                deps[module_name] = version
         return deps
 
     def _get_test_env(self, requirements: dict[str, str]) -> list[str]:
@@ -479,6 +1006,9 @@ class PluginTest:
             envs.append(f"nonebot2=={requirements['nonebot2']}")
         if "pydantic" in requirements:
             envs.append(f"pydantic=={requirements['pydantic']}")
+        # 使用的基础环境
+        if self.base_fingerprint:
+            envs.append(f"base=={self.base_fingerprint}")
         return envs
 
 
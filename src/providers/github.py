@@ -0,0 +1,209 @@
+"""GitHub 作者信息
+
+通过 GraphQL 的 nodes 查询批量获取作者的用户名，每次至多查询 100 个用户
+
+获取到的用户名与获取时间会保存下来，在有效期内不会重新获取
+没有设置 GITHUB_TOKEN 时无法使用 GraphQL，只能逐个通过 REST 接口获取
+"""
+
+import asyncio
+import base64
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import httpx
+from pydantic import BaseModel
+
+from src.providers.constants import AUTHOR_CACHE_DAYS, GITHUB_API_URL, GITHUB_TOKEN
+from src.providers.utils import load_json_bytes
+
+NODES_QUERY = """
+query ($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on User {
+      databaseId
+      login
+    }
+    ... on Organization {
+      databaseId
+      login
+    }
+  }
+}
+"""
+NODES_BATCH_SIZE = 100
+""" 单次 nodes 查询的节点数量上限 """
+
+
+def user_node_id(user_id: int) -> str:
+    """用户 ID 对应的 GraphQL 节点 ID
+
+    节点 ID 为 U_ 加上 [0, user_id] 的 MessagePack 编码的 base64url
+    """
+    if user_id < 0x80:
+        packed = user_id.to_bytes(1)
+    elif user_id <= 0xFF:
+        packed = b"\xcc" + user_id.to_bytes(1)
+    elif user_id <= 0xFFFF:
+        packed = b"\xcd" + user_id.to_bytes(2)
+    elif user_id <= 0xFFFFFFFF:
+        packed = b"\xce" + user_id.to_bytes(4)
+    else:
+        packed = b"\xcf" + user_id.to_bytes(8)
+    encoded = base64.urlsafe_b64encode(b"\x92\x00" + packed).rstrip(b"=")
+    return f"U_{encoded.decode()}"
+
+
+class AuthorRecord(BaseModel):
+    """作者信息"""
+
+    login: str
+    """用户名"""
+    time: datetime
+    """获取时间"""
+
+
+class AuthorState(BaseModel):
+    """作者信息缓存"""
+
+    users: dict[int, AuthorRecord] = {}
+    """作者 ID 与用户名"""
+    keys: dict[str, int] = {}
+    """商店中各项的作者 ID，用于发现作者 ID 的变化"""
+
+
+class AuthorResolver:
+    """作者用户名解析器"""
+
+    def __init__(
+        self,
+        state: AuthorState | None = None,
+        ttl: timedelta = timedelta(days=AUTHOR_CACHE_DAYS),
+        now: datetime | None = None,
+    ) -> None:
+        self.state = state or AuthorState()
+        self.ttl = ttl
+        """用户名的有效期"""
+        self._now = now
+
+        self.requests = 0
+        """本次运行中请求 GitHub API 的次数"""
+
+    @property
+    def now(self) -> datetime:
+        return self._now or datetime.now(ZoneInfo("Asia/Shanghai"))
+
+    def clear(self) -> None:
+        """清除缓存的作者信息与统计数据"""
+        self.state = AuthorState()
+        self.requests = 0
+
+    def get(self, author_id: int) -> str | None:
+        """获取有效期内的用户名"""
+        record = self.state.users.get(author_id)
+        if record is None or self.now - record.time > self.ttl:
+            return None
+        return record.login
+
+    def track(self, key: str, author_id: int) -> bool:
+        """记录商店中某一项的作者 ID
+
+        作者 ID 变化时，原来的用户名不再可信，需要重新获取
+
+        Returns:
+            bool: 作者 ID 是否发生了变化
+        """
+        previous = self.state.keys.get(key)
+        self.state.keys[key] = author_id
+        return previous is not None and previous != author_id
+
+    async def prefetch(self, author_ids: Iterable[int]) -> None:
+        """预先批量获取作者的用户名
+
+        只有能够使用 GraphQL 时才有意义，获取失败的作者会在之后使用时重新获取
+        """
+        if not GITHUB_TOKEN:
+            return
+        try:
+            await self.resolve(*author_ids)
+        except ValueError:
+            pass
+
+    async def resolve(self, *author_ids: int) -> dict[int, str]:
+        """批量获取作者的用户名
+
+        已经缓存且在有效期内的不会重新获取
+
+        Raises:
+            ValueError: 获取用户名失败
+        """
+        missing = sorted({i for i in author_ids if self.get(i) is None})
+        if missing:
+            async with httpx.AsyncClient(
+                base_url=GITHUB_API_URL, headers=self.headers
+            ) as client:
+                if GITHUB_TOKEN:
+                    for start in range(0, len(missing), NODES_BATCH_SIZE):
+                        await self._query_nodes(
+                            client, missing[start : start + NODES_BATCH_SIZE]
+                        )
+                # 没有令牌或者节点查询未找到的用户，逐个通过 REST 接口获取
+                errors = await asyncio.gather(
+                    *(
+                        self._fetch_user(client, author_id)
+                        for author_id in missing
+                        if self.get(author_id) is None
+                    ),
+                    return_exceptions=True,
+                )
+            for error in errors:
+                if isinstance(error, BaseException):
+                    raise error
+        return {
+            author_id: self.state.users[author_id].login for author_id in author_ids
+        }
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"Accept": "application/vnd.github+json"}
+        if GITHUB_TOKEN:
+            headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+        return headers
+
+    def _remember(self, author_id: int, login: str) -> None:
+        self.state.users[author_id] = AuthorRecord(login=login, time=self.now)
+
+    async def _query_nodes(self, client: httpx.AsyncClient, author_ids: list[int]):
+        self.requests += 1
+        try:
+            r = await client.post(
+                "/graphql",
+                json={
+                    "query": NODES_QUERY,
+                    "variables": {"ids": [user_node_id(i) for i in author_ids]},
+                },
+            )
+            r.raise_for_status()
+            # 不存在的节点为 null，并在 errors 中说明
+            nodes = load_json_bytes(r.content)["data"]["nodes"]
+        except Exception:
+            # 批量查询失败时交给 REST 接口逐个获取
+            return
+        for node in nodes:
+            if node and "databaseId" in node:
+                self._remember(node["databaseId"], node["login"])
+
+    async def _fetch_user(self, client: httpx.AsyncClient, author_id: int):
+        self.requests += 1
+        try:
+            r = await client.get(f"/user/{author_id}")
+        except Exception as e:
+            raise ValueError(f"获取作者 {author_id} 的用户名失败：{e}")
+        if r.status_code != 200:
+            raise ValueError(f"获取作者 {author_id} 的用户名失败：{r.text}")
+        self._remember(author_id, load_json_bytes(r.content)["login"])
+
+
+author_resolver = AuthorResolver()
+"""全局共用的作者用户名解析器"""
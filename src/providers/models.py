@@ -3,11 +3,18 @@ from datetime import datetime
 from typing import Any, Literal, Self, TypeAlias
 from zoneinfo import ZoneInfo
 
-from pydantic import BaseModel, Field, field_serializer
+from pydantic import (
+    BaseModel,
+    Field,
+    SerializerFunctionWrapHandler,
+    TypeAdapter,
+    field_serializer,
+    model_serializer,
+)
 from pydantic_extra_types.color import Color
 
 from src.providers.constants import BOT_KEY_TEMPLATE, PYPI_KEY_TEMPLATE
-from src.providers.docker_test import Metadata
+from src.providers.docker_test import Metadata, PluginTestStats
 from src.providers.validation.models import (
     AdapterPublishInfo,
     BotPublishInfo,
@@ -336,13 +343,28 @@ class StoreTestResult(BaseModel):
     """
     results: dict[Literal["validation", "load", "metadata"], bool]
     outputs: dict[Literal["validation", "load", "metadata"], Any]
+    stats: PluginTestStats | None = None
+    """测试耗时与资源占用，未记录时为 None"""
+    deps: dict[str, str] = {}
+    """依赖的商店插件与测试时的版本，键为模块名"""
+
+    @model_serializer(mode="wrap")
+    def _exclude_empty(self, handler: SerializerFunctionWrapHandler):
+        # 未记录时不输出，保持以前的测试结果不变
+        data = handler(self)
+        if self.stats is None:
+            data.pop("stats", None)
+        if not self.deps:
+            data.pop("deps", None)
+        return data
 
     @classmethod
     def from_info(cls, info: PluginPublishInfo) -> Self:
         return cls(
             config=info.test_config,
             version=info.version,
-            test_env={"python==3.12": True},
+            # 跳过测试时没有测试环境，沿用之前记录的默认环境
+            test_env=info.test_env or {"python==3.12": True},
             results={"validation": True, "load": True, "metadata": True},
             outputs={
                 "validation": None,
@@ -384,3 +406,18 @@ class RegistryUpdatePayload(BaseModel):
                 result = StoreTestResult.from_info(info)
 
         return cls(type=type, registry=registry, result=result)
+
+
+# region 批量验证
+# 整个文件一次性交给 pydantic-core 解析与验证，不需要逐个构造模型
+StoreAdapterList = TypeAdapter(list[StoreAdapter])
+StoreBotList = TypeAdapter(list[StoreBot])
+StoreDriverList = TypeAdapter(list[StoreDriver])
+StorePluginList = TypeAdapter(list[StorePlugin])
+RegistryAdapterList = TypeAdapter(list[RegistryAdapter])
+RegistryBotList = TypeAdapter(list[RegistryBot])
+RegistryDriverList = TypeAdapter(list[RegistryDriver])
+RegistryPluginList = TypeAdapter(list[RegistryPlugin])
+StoreTestResultDict = TypeAdapter(dict[str, StoreTestResult])
+PluginConfigDict = TypeAdapter(dict[str, str])
+# endregion
@@ -1,22 +1,60 @@
 import asyncio
 import os
+from pathlib import Path
 
 import click
 
+from src.providers.cache import http_cache
+from src.providers.docker_test.package_cache import package_cache
 from src.providers.models import RegistryUpdatePayload
 
-from .store import StoreTest
+from .pypi_proxy import PyPIProxy, PyPIProxyServer
+from .shard import merge_shards, parse_shard
+
+
+def validate_shard(ctx: click.Context, param: click.Parameter, value: str | None):
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as err:
+        raise click.BadParameter(str(err))
 
 
 @click.group()
 @click.option("--debug/--no-debug", default=False)
-def cli(debug: bool):
+@click.option(
+    "--cache-dir",
+    default=None,
+    type=click.Path(file_okay=False, path_type=Path),
+    help="HTTP 缓存目录，不设置时不会保存缓存",
+)
+@click.option(
+    "--package-cache-dir",
+    default=None,
+    type=click.Path(file_okay=False, path_type=Path),
+    help="插件测试容器共用的软件包缓存目录，默认使用 PACKAGE_CACHE_DIR 环境变量",
+)
+def cli(debug: bool, cache_dir: Path | None, package_cache_dir: Path | None):
     click.echo(f"调试模式已{'开启' if debug else '关闭'}")
+    http_cache.cache_dir = cache_dir
+    if package_cache_dir is not None:
+        package_cache.root = package_cache_dir
+
+
+@cli.result_callback()
+def report_cache(*args, **kwargs):
+    click.echo(http_cache.summary())
+    if package_cache.enabled:
+        removed, freed = package_cache.evict()
+        click.echo(f"软件包缓存清理了 {removed} 个条目，释放 {freed / 1024**2:.1f} MB")
 
 
 @cli.command()
 def registry_update():
     """商店更新"""
+    from .store import StoreTest
+
     # 通过环境变量传递插件配置
     payload = os.environ.get("REGISTRY_UPDATE_PAYLOAD")
     if not payload:
@@ -25,8 +63,11 @@ def registry_update():
 
     payload = RegistryUpdatePayload.model_validate_json(payload)
 
-    test = StoreTest()
-    asyncio.run(test.registry_update(payload))
+    async def main():
+        test = await StoreTest.create()
+        await test.registry_update(payload)
+
+    asyncio.run(main())
 
 
 @cli.command()
@@ -34,16 +75,189 @@ def registry_update():
 @click.option("-o", "--offset", default=0, show_default=True, help="测试插件偏移量")
 @click.option("-f", "--force", default=False, is_flag=True, help="强制重新测试")
 @click.option("-k", "--key", default=None, show_default=True, help="测试插件标识符")
-def plugin_test(limit: int, offset: int, force: bool, key: str | None):
+@click.option(
+    "-c",
+    "--concurrency",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="同时测试插件数量",
+)
+@click.option(
+    "-r", "--resume", default=False, is_flag=True, help="从上次中断的检查点恢复测试"
+)
+@click.option(
+    "-s",
+    "--schedule",
+    default=False,
+    is_flag=True,
+    help="按照测试优先级调度，忽略测试插件偏移量",
+)
+@click.option(
+    "--shard",
+    default=None,
+    callback=validate_shard,
+    help="只测试指定分片中的插件，格式为 i/n，i 从 1 开始",
+)
+@click.option(
+    "-i",
+    "--incremental",
+    default=False,
+    is_flag=True,
+    help="只测试上次运行后在 PyPI 上有变化的插件",
+)
+@click.option(
+    "-t",
+    "--time-budget",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="时间预算（分钟），根据插件上次测试的耗时选择测试插件，忽略测试插件数量",
+)
+@click.option(
+    "--plan", default=False, is_flag=True, help="只输出测试计划与预计耗时，不实际测试"
+)
+@click.option(
+    "-d",
+    "--dependents",
+    default=False,
+    is_flag=True,
+    help="重新测试依赖的商店插件有新版本的插件",
+)
+@click.option(
+    "--frameworks",
+    default=False,
+    is_flag=True,
+    help="重新测试上次测试后 nonebot2 或 pydantic 有新版本的插件",
+)
+def plugin_test(
+    limit: int,
+    offset: int,
+    force: bool,
+    key: str | None,
+    concurrency: int,
+    resume: bool,
+    schedule: bool,
+    shard: tuple[int, int] | None,
+    incremental: bool,
+    time_budget: float | None,
+    plan: bool,
+    dependents: bool,
+    frameworks: bool,
+):
     """插件测试"""
     from .store import StoreTest
 
-    test = StoreTest()
+    async def main():
+        test = await StoreTest.create()
+        if key:
+            await test.run_single_plugin(key, force)
+        else:
+            await test.run(
+                limit,
+                offset,
+                force,
+                concurrency,
+                resume,
+                schedule,
+                shard,
+                incremental,
+                time_budget,
+                plan,
+                dependents,
+                frameworks,
+            )
+
+    asyncio.run(main())
+
+
+@cli.command()
+@click.option(
+    "-s",
+    "--signature",
+    "signatures",
+    multiple=True,
+    help="失败特征的指纹，可以只写前缀，可以指定多个",
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="同时测试插件数量",
+)
+def retest(signatures: tuple[str, ...], concurrency: int):
+    """重新测试失败特征相同的插件
+
+    不指定失败特征时列出所有失败特征与对应的插件数量
+    """
+    from .store import StoreTest
+
+    async def main():
+        test = await StoreTest.create()
+        if signatures:
+            await test.retest(list(signatures), concurrency)
+        else:
+            test.print_signatures()
+
+    asyncio.run(main())
+
+
+@cli.command()
+@click.argument(
+    "shard_dirs",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+def merge_results(shard_dirs: tuple[Path, ...]):
+    """合并各个分片的测试结果"""
+    merge_shards(list(shard_dirs))
+
+
+@cli.command()
+@click.option(
+    "--host",
+    default="172.17.0.1",
+    show_default=True,
+    help="监听地址，默认为 Docker 网桥的地址，只有测试容器与本机可以访问",
+)
+@click.option("-p", "--port", default=3141, show_default=True, help="监听端口")
+@click.option(
+    "--storage",
+    default=Path("pypi_cache"),
+    show_default=True,
+    type=click.Path(file_okay=False, path_type=Path),
+    help="缓存目录，可以在多次运行之间保留",
+)
+@click.option(
+    "--index-url", default="https://pypi.org", show_default=True, help="上游索引地址"
+)
+@click.option(
+    "--files-url",
+    default="https://files.pythonhosted.org",
+    show_default=True,
+    help="上游软件包文件地址",
+)
+@click.option("--offline", default=False, is_flag=True, help="只使用缓存，不访问上游")
+def pypi_proxy(
+    host: str, port: int, storage: Path, index_url: str, files_url: str, offline: bool
+):
+    """启动带缓存的 PyPI 代理
 
-    if key:
-        asyncio.run(test.run_single_plugin(key, force))
-    else:
-        asyncio.run(test.run(limit, offset, force))
+    测试容器通过 PYPI_PROXY_URL 环境变量使用
+    """
+    proxy = PyPIProxy(storage, index_url, files_url, offline)
+    server = PyPIProxyServer((host, port), proxy)
+    click.echo(f"PyPI 代理已启动：http://{host}:{port}/simple/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        proxy.close()
+        click.echo(proxy.summary())
 
 
 if __name__ == "__main__":
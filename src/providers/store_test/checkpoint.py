@@ -0,0 +1,72 @@
+"""商店测试检查点
+
+每个插件测试完成后立即追加到检查点文件中，测试中断后可以从检查点恢复
+
+检查点与测试结果一起上传，下次运行时本地没有检查点则从上次上传的测试结果中下载
+"""
+
+from pathlib import Path
+
+import click
+from pydantic import BaseModel, ValidationError
+
+from src.providers.models import RegistryPlugin, StoreTestResult
+from src.providers.utils import download_files
+
+
+class CheckpointRecord(BaseModel):
+    """检查点中的一条记录"""
+
+    key: str
+    result: StoreTestResult
+    plugin: RegistryPlugin
+
+
+class Checkpoint:
+    """检查点文件
+
+    每行为一条 JSON 格式的记录，只会追加写入
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    async def download(self, url: str) -> None:
+        """本地没有检查点时，下载上次运行上传的检查点"""
+        if self.path.exists():
+            return
+        try:
+            (content,) = await download_files(url)
+        except ValueError:
+            click.echo("未找到上次运行的检查点")
+            return
+        self.path.write_bytes(content)
+
+    def load(self) -> dict[str, tuple[StoreTestResult, RegistryPlugin]]:
+        """读取检查点中已完成的测试
+
+        中断时可能写入了不完整的记录，直接忽略
+        """
+        records: dict[str, tuple[StoreTestResult, RegistryPlugin]] = {}
+        if not self.path.exists():
+            return records
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = CheckpointRecord.model_validate_json(line)
+                except ValidationError:
+                    click.echo(f"检查点记录不完整，已忽略：{line.strip()}")
+                    continue
+                records[record.key] = (record.result, record.plugin)
+        return records
+
+    def append(self, key: str, result: StoreTestResult, plugin: RegistryPlugin) -> None:
+        """追加一条记录"""
+        record = CheckpointRecord(key=key, result=result, plugin=plugin)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(record.model_dump_json() + "\n")
+
+    def clear(self) -> None:
+        """删除检查点文件"""
+        self.path.unlink(missing_ok=True)
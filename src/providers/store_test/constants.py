@@ -23,3 +23,45 @@ PLUGINS_PATH = TEST_DIR / "plugins.json"
 
 PLUGIN_CONFIG_PATH = TEST_DIR / "plugin_configs.json"
 """ 生成的插件配置保存路径 """
+
+CHECKPOINT_PATH = TEST_DIR / "checkpoint.jsonl"
+""" 测试检查点保存路径 """
+
+RETEST_CHECKPOINT_PATH = TEST_DIR / "retest_checkpoint.jsonl"
+""" 按失败特征重新测试时的检查点保存路径，不影响被中断的全量测试的检查点 """
+
+SCHEDULER_PATH = TEST_DIR / "scheduler.json"
+""" 测试调度状态保存路径 """
+
+AUTHORS_PATH = TEST_DIR / "authors.json"
+""" 作者信息缓存保存路径 """
+
+# 测试调度优先级权重
+FIRST_TIME_WEIGHT = 1000.0
+""" 从未测试过的插件 """
+NEW_VERSION_WEIGHT = 100.0
+""" PyPI 上有新版本的插件 """
+DEPENDENCY_UPDATED_WEIGHT = 50.0
+""" 依赖的商店插件在 PyPI 上有新版本的插件 """
+FRAMEWORK_UPDATED_WEIGHT = 200.0
+""" 上次测试后 nonebot2 或 pydantic 有新版本的插件 """
+FRAMEWORK_FAILED_WEIGHT = 200.0
+""" 框架有新版本且上次加载失败的插件额外增加，保证排在加载成功的插件之前 """
+LOAD_FAILED_WEIGHT = 10.0
+""" 上次加载失败的插件 """
+STALENESS_WEIGHT = 1.0
+""" 距离上次测试每过一天 """
+MAX_STALE_DAYS = 30
+""" 计算优先级时距离上次测试的最大天数，超过后与其他插件轮流测试 """
+
+DEFAULT_TEST_DURATION = 300.0
+""" 没有测试耗时记录的插件的预计测试耗时，单位为秒 """
+
+# 确定性失败的退避时间
+BACKOFF_BASE_DAYS = 1
+""" 第一次失败后的退避天数，之后每次失败翻倍 """
+BACKOFF_MAX_DAYS = 30
+""" 最大退避天数 """
+
+FRAMEWORK_PACKAGES = ("nonebot2", "pydantic")
+""" 新版本发布后需要重新测试插件的框架 """
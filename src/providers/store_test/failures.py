@@ -0,0 +1,160 @@
+"""插件测试失败的分类
+
+确定性失败（依赖解析失败、模块不存在等）在插件与 NoneBot 都没有更新时重新测试也不会通过，
+按照指数退避延后重试；临时性失败（网络错误、超时等）则在同一次运行中立即重试一次
+
+大量插件的失败往往只有少数几种原因，从测试输出中提取出错误信息并去掉路径、版本号等差异后，
+得到的失败特征可以用来把原因相同的插件归为一类，并统一重新测试
+"""
+
+import hashlib
+import re
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+from src.providers.models import StoreTestResult
+
+FailureKind = Literal["deterministic", "transient"]
+
+TRANSIENT_PATTERNS = re.compile(
+    r"执行命令超时"
+    r"|timed out"
+    r"|TimeoutError"
+    r"|Max retries exceeded"
+    r"|Connection (?:reset|refused|aborted)"
+    r"|ConnectionError"
+    r"|Temporary failure in name resolution"
+    r"|Remote end closed connection"
+    r"|HTTP Error 50[234]",
+    re.IGNORECASE,
+)
+""" 网络错误与超时 """
+
+DETERMINISTIC_PATTERNS = re.compile(
+    r"version solving failed"
+    r"|Could not find a matching version"
+    r"|doesn't match any versions"
+    r"|No module named"
+    r"|ModuleNotFoundError",
+)
+""" 依赖解析失败与模块不存在 """
+
+RUNTIME_PATTERN = re.compile(r"^插件 \S+ 加载(?:出错|正常)：", re.MULTILINE)
+""" 插件运行日志的开头，之前为创建项目与安装依赖等工具的输出 """
+
+ANSI_PATTERN = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+EXCEPTION_PATTERN = re.compile(
+    r"^(?:[A-Za-z_]\w*\.)*[A-Z]\w*(?:Error|Exception|Exit|Interrupt)(?::.*)?$"
+)
+""" Python 异常的最后一行，例如 ModuleNotFoundError: No module named 'abc' """
+NORMALIZE_PATTERNS = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"(?<![\w.<])/[^\s'\"():,]+"), "<path>"),
+    (re.compile(r"\bline \d+"), "line <n>"),
+    (re.compile(r"\bv?\d+(?:\.\d+)+(?:[.-]?(?:a|b|rc|post|dev)\d*)*\b"), "<version>"),
+    (re.compile(r"\s+"), " "),
+]
+""" 失败特征中需要去掉的差异，依次为内存地址、文件路径、行号、版本号与连续的空白 """
+
+
+class FailureRecord(BaseModel):
+    """确定性失败的记录"""
+
+    attempts: int = 1
+    """连续失败的次数"""
+    retry_at: datetime
+    """退避结束的时间"""
+    version: str | None = None
+    """失败时插件在 PyPI 上的最新版本"""
+    nonebot_version: str | None = None
+    """失败时 nonebot2 的最新版本"""
+
+
+def classify_failure(result: StoreTestResult) -> FailureKind | None:
+    """根据测试输出判断失败的类型
+
+    加载成功或者无法判断时返回 None
+    临时性错误可能导致依赖解析失败，所以优先判断是否为临时性失败
+    插件运行日志中的网络错误多由插件自身导致，只在工具的输出中查找临时性错误
+    """
+    if result.results.get("load"):
+        return None
+    output = result.outputs.get("load") or ""
+    if not isinstance(output, str):
+        return None
+    match = RUNTIME_PATTERN.search(output)
+    tool_output = output[: match.start()] if match else output
+    if TRANSIENT_PATTERNS.search(tool_output):
+        return "transient"
+    if DETERMINISTIC_PATTERNS.search(output):
+        return "deterministic"
+    return None
+
+
+class FailureCluster(BaseModel):
+    """失败特征相同的插件"""
+
+    signature: str
+    """去掉差异后的错误信息"""
+    keys: list[str] = []
+    """插件标识符"""
+
+
+def extract_signature(output: str, key: str | None = None) -> str | None:
+    """从测试输出中提取失败特征
+
+    优先使用最后一个异常，其次为依赖解析失败的原因，最后为超时
+    插件自身的项目名与模块名会被替换为 <plugin>，使不同插件的相同错误得到相同的特征
+
+    Returns:
+        str | None: 无法提取时返回 None
+    """
+    lines = [line.strip() for line in ANSI_PATTERN.sub("", output).splitlines()]
+    line = (
+        next((i for i in reversed(lines) if EXCEPTION_PATTERN.match(i)), None)
+        or next((i for i in lines if DETERMINISTIC_PATTERNS.search(i)), None)
+        or next((i for i in lines if TRANSIENT_PATTERNS.search(i)), None)
+    )
+    if line is None:
+        return None
+
+    for pattern, repl in NORMALIZE_PATTERNS:
+        line = pattern.sub(repl, line)
+    if key:
+        project_link, _, module_name = key.rpartition(":")
+        for name in (project_link, module_name):
+            if name:
+                line = re.sub(
+                    rf"(?<![\w-]){re.escape(name)}(?![\w-])", "<plugin>", line
+                )
+    return line.strip()
+
+
+def fingerprint(signature: str) -> str:
+    """失败特征的指纹"""
+    return hashlib.sha256(signature.encode()).hexdigest()[:12]
+
+
+def signature_index(results: dict[str, StoreTestResult]) -> dict[str, FailureCluster]:
+    """按照失败特征对加载失败的插件分组
+
+    Returns:
+        dict[str, FailureCluster]: 指纹与对应的插件，按插件数量从多到少排序
+    """
+    index: dict[str, FailureCluster] = {}
+    for key, result in results.items():
+        if result.results.get("load"):
+            continue
+        output = result.outputs.get("load")
+        if not isinstance(output, str):
+            continue
+        signature = extract_signature(output, key)
+        if signature is None:
+            continue
+        cluster = index.setdefault(
+            fingerprint(signature), FailureCluster(signature=signature)
+        )
+        cluster.keys.append(key)
+    return dict(sorted(index.items(), key=lambda item: -len(item[1].keys)))
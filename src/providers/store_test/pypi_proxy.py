@@ -0,0 +1,272 @@
+"""带缓存的 PyPI 代理
+
+为插件测试容器提供 PyPI 的 Simple API、JSON API 与软件包文件，第一次请求时从上游获取并保存到缓存目录中
+
+- /simple/...、/pypi/...：索引页面，缓存一段时间后通过 ETag/Last-Modified 向上游验证，上游无法访问时使用过期的缓存
+- /packages/...：软件包文件，内容不会改变，下载后一直使用缓存
+
+索引页面中软件包文件的地址会被替换为代理的地址，使容器通过代理下载软件包
+同一个文件同时被多个容器请求时只会下载一次，其他请求等待下载完成后直接使用缓存
+
+离线模式下不会访问上游，只使用缓存的内容，可以在固定的数据上运行商店测试
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import cast
+
+import click
+import httpx
+
+from src.providers.cache import CacheEntry
+
+INDEX_TTL = 5 * 60
+""" 索引页面在这段时间内不向上游验证，单位为秒 """
+PROXY_HEADERS = {"content-type", "etag", "last-modified"}
+""" 需要转发给客户端的响应头 """
+
+
+def is_unsafe_path(path: str) -> bool:
+    """请求路径中是否包含 .. 等可以访问上级目录的部分"""
+    if "\0" in path or "\\" in path or "%2e" in path.lower():
+        return True
+    return ".." in path.split("/")
+
+
+class PyPIProxy:
+    """带缓存的 PyPI 代理"""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        index_url: str = "https://pypi.org",
+        files_url: str = "https://files.pythonhosted.org",
+        offline: bool = False,
+    ) -> None:
+        self.cache_dir = cache_dir
+        """缓存目录，索引页面与软件包文件分别保存在 index 与 files 中"""
+        self.index_url = index_url.rstrip("/")
+        """上游的索引地址"""
+        self.files_url = files_url.rstrip("/")
+        """上游的软件包文件地址"""
+        self.offline = offline
+        """是否只使用缓存"""
+
+        self.hits = 0
+        """直接使用缓存的次数"""
+        self.misses = 0
+        """需要请求上游的次数"""
+
+        self._client = httpx.Client(follow_redirects=True, timeout=60)
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, hit: bool) -> None:
+        """记录一次缓存命中或者未命中，请求由多个线程同时处理"""
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _lock(self, key: str) -> threading.Lock:
+        """同一个地址共用一个锁，保证只有一个请求在访问上游"""
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _index_path(self, url: str, accept: str) -> Path:
+        # Simple API 根据 Accept 返回 HTML 或 JSON，需要分开缓存
+        key = hashlib.sha256(f"{url}\n{accept}".encode()).hexdigest()
+        return self.cache_dir / "index" / key
+
+    def _file_path(self, path: str) -> Path | None:
+        """软件包文件的缓存路径，路径不在缓存目录中时返回 None"""
+        if is_unsafe_path(path):
+            return None
+        # 上游的文件路径中已经包含了内容的哈希值
+        root = (self.cache_dir / "files").resolve()
+        file_path = (root / path.lstrip("/")).resolve()
+        if root not in file_path.parents:
+            return None
+        return file_path
+
+    @staticmethod
+    def _write(path: Path, content: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写入临时文件再替换，避免其他请求读取到不完整的文件
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(content)
+        tmp_path.replace(path)
+
+    def get_index(self, path: str, accept: str = "") -> CacheEntry | None:
+        """获取索引页面
+
+        Args:
+            path (str): 请求路径，例如 /simple/nonebot2/
+            accept (str): 客户端请求的格式
+
+        Returns:
+            CacheEntry | None: 上游返回 404 或者没有可用的缓存时返回 None
+        """
+        url = f"{self.index_url}{path}"
+        cache_path = self._index_path(url, accept)
+        with self._lock(str(cache_path)):
+            entry = None
+            if cache_path.exists():
+                try:
+                    entry = CacheEntry.load(cache_path.read_bytes())
+                except ValueError:
+                    # 缓存文件损坏时当作不存在
+                    entry = None
+            if entry is not None and (
+                self.offline or time.time() - cache_path.stat().st_mtime < INDEX_TTL
+            ):
+                self._count(hit=True)
+                return entry
+            if self.offline:
+                return None
+
+            headers = {"Accept": accept} if accept else {}
+            if entry is not None and entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry is not None and entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+            try:
+                r = self._client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                click.echo(f"请求 {url} 失败：{e}")
+                # 上游无法访问时使用过期的缓存
+                return entry
+
+            if r.status_code == 304 and entry is not None:
+                self._count(hit=True)
+                # 更新修改时间，重新开始计算有效期
+                cache_path.touch()
+                return entry
+            self._count(hit=False)
+            if r.status_code != 200:
+                return entry if r.status_code >= 500 else None
+            entry = CacheEntry(
+                url=url,
+                headers=[
+                    (key, value)
+                    for key, value in r.headers.multi_items()
+                    if key.lower() in PROXY_HEADERS
+                ],
+                content=r.content,
+            )
+            self._write(cache_path, entry.dump())
+            return entry
+
+    def get_file(self, path: str) -> Path | None:
+        """获取软件包文件
+
+        Args:
+            path (str): 请求路径，例如 /packages/ab/cd/.../nonebot2-2.4.0-py3-none-any.whl
+
+        Returns:
+            Path | None: 缓存文件的路径，上游不存在或者离线时没有缓存则返回 None
+        """
+        file_path = self._file_path(path)
+        if file_path is None:
+            return None
+        if file_path.exists():
+            self._count(hit=True)
+            return file_path
+        if self.offline:
+            return None
+
+        with self._lock(str(file_path)):
+            # 等待锁的期间其他请求可能已经下载完成
+            if file_path.exists():
+                self._count(hit=True)
+                return file_path
+            self._count(hit=False)
+            url = f"{self.files_url}{path}"
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+            try:
+                with self._client.stream("GET", url) as r:
+                    if r.status_code != 200:
+                        return None
+                    with tmp_path.open("wb") as f:
+                        for chunk in r.iter_bytes():
+                            f.write(chunk)
+            except httpx.HTTPError as e:
+                click.echo(f"下载 {url} 失败：{e}")
+                tmp_path.unlink(missing_ok=True)
+                return None
+            tmp_path.replace(file_path)
+            return file_path
+
+    def rewrite(self, content: bytes, base_url: str) -> bytes:
+        """将索引页面中软件包文件的地址替换为代理的地址"""
+        return content.replace(self.files_url.encode(), base_url.encode())
+
+    def summary(self) -> str:
+        return f"PyPI 代理命中缓存 {self.hits} 次，请求上游 {self.misses} 次"
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class PyPIProxyHandler(BaseHTTPRequestHandler):
+    """PyPI 代理的请求处理"""
+
+    def do_GET(self):
+        server = cast("PyPIProxyServer", self.server)
+        proxy = server.proxy
+        if is_unsafe_path(self.path):
+            self.send_error(400)
+            return
+        if self.path.startswith("/packages/"):
+            file_path = proxy.get_file(self.path)
+            if file_path is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(file_path.stat().st_size))
+            self.end_headers()
+            with file_path.open("rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+        elif self.path.startswith(("/simple/", "/pypi/")):
+            entry = proxy.get_index(self.path, self.headers.get("Accept", ""))
+            if entry is None:
+                self.send_error(404)
+                return
+            host = self.headers.get("Host") or "{}:{}".format(
+                *server.server_address[:2]
+            )
+            content = proxy.rewrite(entry.content, f"http://{host}")
+            self.send_response(200)
+            for key, value in entry.headers:
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        else:
+            self.send_error(404)
+
+    def log_message(self, format: str, *args) -> None:
+        # 每个请求都输出日志太多，只在出错时输出
+        pass
+
+    def log_error(self, format: str, *args) -> None:
+        click.echo(f"{self.address_string()} - {format % args}")
+
+
+class PyPIProxyServer(ThreadingHTTPServer):
+    """PyPI 代理服务器"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], proxy: PyPIProxy) -> None:
+        super().__init__(address, PyPIProxyHandler)
+        self.proxy = proxy
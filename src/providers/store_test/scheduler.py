@@ -0,0 +1,347 @@
+"""商店测试调度
+
+根据插件上次测试的情况计算优先级，优先测试最需要测试的插件
+
+优先级相同的插件按照商店中的顺序轮流测试，每次运行后游标都会向后移动，保证所有插件最终都会被测试
+
+设置时间预算时，根据插件上次测试的耗时选择能在预算内完成的插件
+
+插件依赖的商店插件发布新版本后，插件本身没有更新也可能无法加载，需要重新测试
+
+确定性失败的插件按照指数退避延后重试，插件或 nonebot2 发布新版本时立即重试
+
+nonebot2 或 pydantic 发布新版本后，使用旧版本测试的插件需要尽快重新测试，其中上次加载失败的插件最优先
+"""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from pydantic import BaseModel
+
+from src.providers.models import StoreTestResult
+
+from .constants import (
+    BACKOFF_BASE_DAYS,
+    BACKOFF_MAX_DAYS,
+    DEFAULT_TEST_DURATION,
+    DEPENDENCY_UPDATED_WEIGHT,
+    FIRST_TIME_WEIGHT,
+    FRAMEWORK_FAILED_WEIGHT,
+    FRAMEWORK_UPDATED_WEIGHT,
+    LOAD_FAILED_WEIGHT,
+    MAX_STALE_DAYS,
+    NEW_VERSION_WEIGHT,
+    STALENESS_WEIGHT,
+)
+from .failures import FailureRecord
+
+
+class FrameworkRelease(BaseModel):
+    """框架的最新版本"""
+
+    version: str
+    """版本号"""
+    time: datetime | None = None
+    """发现该版本的时间，第一次记录时为 None"""
+
+
+class SchedulerState(BaseModel):
+    """调度状态"""
+
+    cursor: str | None = None
+    """轮流测试的起点，为插件标识符"""
+    serial: int | None = None
+    """增量测试时已经处理到的 PyPI 变更序号"""
+    cursors: dict[str, str] = {}
+    """分片测试时各个分片的游标，键为分片 i/n"""
+    serials: dict[str, int] = {}
+    """分片测试时各个分片已经处理到的 PyPI 变更序号，键为分片 i/n"""
+    shard: str | None = None
+    """写入该状态的分片，合并分片时只采用各个分片自己的游标与变更序号"""
+    durations: dict[str, float] = {}
+    """插件上次测试的耗时，单位为秒"""
+    failures: dict[str, FailureRecord] = {}
+    """确定性失败的插件与退避记录"""
+    frameworks: dict[str, FrameworkRelease] = {}
+    """nonebot2 与 pydantic 的最新版本"""
+
+
+class Scheduler:
+    """商店测试调度器"""
+
+    def __init__(
+        self, state: SchedulerState | None = None, now: datetime | None = None
+    ) -> None:
+        self.state = state or SchedulerState()
+        self.now = now or datetime.now(ZoneInfo("Asia/Shanghai"))
+
+    def use_shard(self, shard: tuple[int, int] | None) -> None:
+        """设置当前分片，分片测试时游标与变更序号按分片分别记录"""
+        self.state.shard = "{}/{}".format(*shard) if shard else None
+
+    @property
+    def cursor(self) -> str | None:
+        """当前分片的游标"""
+        if self.state.shard is None:
+            return self.state.cursor
+        return self.state.cursors.get(self.state.shard)
+
+    @cursor.setter
+    def cursor(self, value: str) -> None:
+        if self.state.shard is None:
+            self.state.cursor = value
+        else:
+            self.state.cursors[self.state.shard] = value
+
+    @property
+    def serial(self) -> int | None:
+        """当前分片已经处理到的 PyPI 变更序号"""
+        if self.state.shard is None:
+            return self.state.serial
+        return self.state.serials.get(self.state.shard)
+
+    @serial.setter
+    def serial(self, value: int | None) -> None:
+        if self.state.shard is None:
+            self.state.serial = value
+        elif value is None:
+            self.state.serials.pop(self.state.shard, None)
+        else:
+            self.state.serials[self.state.shard] = value
+
+    def stale_days(self, result: StoreTestResult) -> int:
+        """距离上次测试的天数，至多为 MAX_STALE_DAYS"""
+        try:
+            tested_at = datetime.fromisoformat(result.time)
+        except ValueError:
+            return MAX_STALE_DAYS
+        if tested_at.tzinfo is None:
+            tested_at = tested_at.replace(tzinfo=self.now.tzinfo)
+        days = (self.now - tested_at).days
+        return max(0, min(days, MAX_STALE_DAYS))
+
+    def priority(
+        self,
+        result: StoreTestResult | None,
+        latest_version: str | None = None,
+        dependency_updated: bool = False,
+        framework_updated: bool = False,
+    ) -> float:
+        """计算插件的测试优先级
+
+        Args:
+            result (StoreTestResult | None): 上次测试的结果，为 None 时说明从未测试过
+            latest_version (str | None): PyPI 上的最新版本，为 None 时说明未知
+            dependency_updated (bool): 依赖的商店插件是否有新版本
+            framework_updated (bool): 上次测试后 nonebot2 或 pydantic 是否有新版本
+        """
+        if result is None:
+            return FIRST_TIME_WEIGHT
+
+        score = self.stale_days(result) * STALENESS_WEIGHT
+        if latest_version is not None and latest_version != result.version:
+            score += NEW_VERSION_WEIGHT
+        if dependency_updated:
+            score += DEPENDENCY_UPDATED_WEIGHT
+        failed = not result.results.get("load", True)
+        if failed:
+            score += LOAD_FAILED_WEIGHT
+        if framework_updated:
+            score += FRAMEWORK_UPDATED_WEIGHT
+            if failed:
+                score += FRAMEWORK_FAILED_WEIGHT
+        return score
+
+    def _rotated(self, keys: list[str]) -> dict[str, int]:
+        """以游标为起点时各个插件的位置"""
+        start = keys.index(self.cursor) if self.cursor in keys else 0
+        return {key: (i - start) % len(keys) for i, key in enumerate(keys)}
+
+    def order(
+        self,
+        keys: list[str],
+        results: dict[str, StoreTestResult],
+        latest_versions: dict[str, str | None],
+        dependency_updated: set[str] | None = None,
+        framework_updated: set[str] | None = None,
+    ) -> list[str]:
+        """按照优先级从高到低排序插件
+
+        Args:
+            keys (list[str]): 商店中的插件标识符，按商店中的顺序排列
+            results (dict[str, StoreTestResult]): 上次测试的结果
+            latest_versions (dict[str, str | None]): 插件在 PyPI 上的最新版本
+            dependency_updated (set[str] | None): 依赖的商店插件有新版本的插件
+            framework_updated (set[str] | None): 使用旧版本 nonebot2 或 pydantic 测试的插件
+        """
+        dependency_updated = dependency_updated or set()
+        framework_updated = framework_updated or set()
+        rotated = self._rotated(keys)
+        return sorted(
+            keys,
+            key=lambda key: (
+                -self.priority(
+                    results.get(key),
+                    latest_versions.get(key),
+                    key in dependency_updated,
+                    key in framework_updated,
+                ),
+                rotated[key],
+            ),
+        )
+
+    @staticmethod
+    def reverse_dependencies(
+        results: dict[str, StoreTestResult], modules: dict[str, str]
+    ) -> dict[str, dict[str, str]]:
+        """根据上次测试时记录的依赖构建反向依赖索引
+
+        Args:
+            results (dict[str, StoreTestResult]): 上次测试的结果
+            modules (dict[str, str]): 商店插件的模块名与插件标识符
+
+        Returns:
+            dict[str, dict[str, str]]: 被依赖的插件，以及依赖它的插件与测试时使用的版本
+        """
+        index: dict[str, dict[str, str]] = {}
+        for key, result in results.items():
+            for module_name, version in result.deps.items():
+                upstream = modules.get(module_name)
+                # 只关心商店中的插件，也不用包括插件自己
+                if upstream is None or upstream == key:
+                    continue
+                index.setdefault(upstream, {})[key] = version
+        return index
+
+    def detect_releases(self, versions: dict[str, str]) -> list[str]:
+        """记录框架的最新版本，返回发布了新版本的框架
+
+        第一次记录时无法知道插件是否使用旧版本测试，只作为之后比较的基准
+
+        Args:
+            versions (dict[str, str]): 框架名称与最新版本
+        """
+        released: list[str] = []
+        for name, version in versions.items():
+            previous = self.state.frameworks.get(name)
+            if previous is None:
+                self.state.frameworks[name] = FrameworkRelease(version=version)
+            elif previous.version != version:
+                self.state.frameworks[name] = FrameworkRelease(
+                    version=version, time=self.now
+                )
+                released.append(name)
+        return released
+
+    def framework_outdated(self, result: StoreTestResult) -> bool:
+        """插件上次测试时使用的框架是否比最新版本旧
+
+        只比较在发现新版本之前的测试结果，测试环境中没有记录框架版本时无法判断，视为没有过期
+        """
+        try:
+            tested_at = datetime.fromisoformat(result.time)
+        except ValueError:
+            tested_at = None
+        if tested_at is not None and tested_at.tzinfo is None:
+            tested_at = tested_at.replace(tzinfo=self.now.tzinfo)
+
+        # 测试环境的格式为 python==3.12.7 nonebot2==2.3.3 pydantic==2.9.2
+        tested: dict[str, set[str]] = {}
+        for env in result.test_env or {}:
+            for requirement in env.split():
+                name, _, version = requirement.partition("==")
+                tested.setdefault(name, set()).add(version)
+
+        for name, release in self.state.frameworks.items():
+            if release.time is None:
+                continue
+            if tested_at is not None and tested_at >= release.time:
+                continue
+            versions = tested.get(name)
+            if versions and release.version not in versions:
+                return True
+        return False
+
+    def advance(self, keys: list[str], visited: int) -> None:
+        """根据本次运行检查过的插件数量移动游标"""
+        if not keys:
+            return
+        start = keys.index(self.cursor) if self.cursor in keys else 0
+        self.cursor = keys[(start + visited) % len(keys)]
+
+    def record(self, key: str, duration: float) -> None:
+        """记录插件的测试耗时"""
+        self.state.durations[key] = round(duration, 1)
+
+    def estimate(self, key: str) -> float:
+        """预计插件的测试耗时，没有记录时使用默认值"""
+        return self.state.durations.get(key, DEFAULT_TEST_DURATION)
+
+    def record_failure(
+        self, key: str, version: str | None, nonebot_version: str | None
+    ) -> FailureRecord:
+        """记录确定性失败，每次连续失败退避时间翻倍
+
+        Args:
+            key (str): 插件标识符
+            version (str | None): 插件在 PyPI 上的最新版本
+            nonebot_version (str | None): nonebot2 的最新版本
+        """
+        previous = self.state.failures.get(key)
+        attempts = previous.attempts + 1 if previous else 1
+        days = min(BACKOFF_BASE_DAYS * 2 ** (attempts - 1), BACKOFF_MAX_DAYS)
+        record = FailureRecord(
+            attempts=attempts,
+            retry_at=self.now + timedelta(days=days),
+            version=version,
+            nonebot_version=nonebot_version,
+        )
+        self.state.failures[key] = record
+        return record
+
+    def clear_failure(self, key: str) -> None:
+        """插件不再是确定性失败时清除记录"""
+        self.state.failures.pop(key, None)
+
+    def backoff(
+        self,
+        key: str,
+        latest_version: str | None,
+        nonebot_version: str | None,
+    ) -> FailureRecord | None:
+        """插件是否仍在退避中
+
+        插件或 nonebot2 发布了新版本，或者退避时间已过时可以重试
+
+        Returns:
+            FailureRecord | None: 仍在退避中时返回失败记录，否则返回 None
+        """
+        record = self.state.failures.get(key)
+        if record is None or self.now >= record.retry_at:
+            return None
+        if latest_version is not None and latest_version != record.version:
+            return None
+        if nonebot_version is not None and nonebot_version != record.nonebot_version:
+            return None
+        return record
+
+    def pack(self, keys: list[str], budget: float, concurrency: int = 1) -> list[str]:
+        """按照顺序选择能在时间预算内完成测试的插件
+
+        耗时过长放不下的插件会被跳过，继续尝试之后的插件
+        单个插件只能在一个测试位中运行，耗时超过预算的插件无论如何都放不下
+
+        Args:
+            keys (list[str]): 需要测试的插件，按优先级从高到低排列
+            budget (float): 时间预算，单位为秒
+            concurrency (int): 同时测试插件数量，默认为 1
+        """
+        capacity = budget * concurrency
+        used = 0.0
+        packed: list[str] = []
+        for key in keys:
+            cost = self.estimate(key)
+            if cost <= budget and used + cost <= capacity:
+                packed.append(key)
+                used += cost
+        return packed
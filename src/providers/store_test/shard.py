@@ -0,0 +1,192 @@
+"""商店测试分片
+
+通过插件标识符的哈希值将插件分配到不同的分片中，多个分片可以同时在不同的机器上测试，
+最后再合并各个分片的测试结果
+"""
+
+import hashlib
+from datetime import datetime
+from pathlib import Path
+
+import click
+
+from src.providers.github import AuthorState
+from src.providers.models import (
+    PluginConfigDict,
+    RegistryAdapterList,
+    RegistryBotList,
+    RegistryDriverList,
+    RegistryPlugin,
+    RegistryPluginList,
+    StoreTestResult,
+    StoreTestResultDict,
+)
+from src.providers.utils import dump_json, load_json_from_file
+
+from .constants import (
+    ADAPTERS_PATH,
+    AUTHORS_PATH,
+    BOTS_PATH,
+    DRIVERS_PATH,
+    PLUGIN_CONFIG_PATH,
+    PLUGINS_PATH,
+    RESULTS_PATH,
+    SCHEDULER_PATH,
+)
+from .failures import FailureRecord
+from .scheduler import FrameworkRelease, SchedulerState
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """解析分片参数
+
+    格式为 i/n，i 从 1 开始
+    """
+    try:
+        index, total = (int(i) for i in value.split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式不正确：{value}，应为 i/n")
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"分片序号 {index} 应在 1 到 {total} 之间")
+    return index, total
+
+
+def shard_of(key: str, total: int) -> int:
+    """插件所在的分片序号
+
+    使用稳定的哈希值，保证每次运行时都分配到同一个分片
+    """
+    digest = hashlib.sha256(key.encode()).digest()
+    return int.from_bytes(digest[:8]) % total + 1
+
+
+def _tested_at(result: StoreTestResult) -> datetime:
+    try:
+        return datetime.fromisoformat(result.time)
+    except ValueError:
+        return datetime.min
+
+
+def _is_newer(result: StoreTestResult, other: StoreTestResult) -> bool:
+    tested_at, other_tested_at = _tested_at(result), _tested_at(other)
+    # 时区信息不一致时无法比较，直接比较字符串
+    if (tested_at.tzinfo is None) != (other_tested_at.tzinfo is None):
+        return result.time > other.time
+    return tested_at > other_tested_at
+
+
+def merge_shards(shard_dirs: list[Path]) -> None:
+    """合并各个分片的测试结果
+
+    同一插件以测试时间最新的结果为准，插件数据、配置、测试耗时与失败记录也使用同一分片中的数据
+    适配器、机器人与驱动器每个分片都相同，直接使用第一个分片的数据
+    各个分片的调度游标与变更序号分别记录，使用各个分片自己写入的数据
+    作者信息合并所有分片的数据，同一作者以获取时间最新的为准
+    """
+    if not shard_dirs:
+        raise ValueError("至少需要一个分片")
+
+    results: dict[str, StoreTestResult] = {}
+    plugins: dict[str, RegistryPlugin] = {}
+    plugin_configs: dict[str, str] = {}
+    states: list[SchedulerState] = []
+    durations: dict[str, float] = {}
+    failures: dict[str, FailureRecord] = {}
+    frameworks: dict[str, FrameworkRelease] = {}
+    authors = AuthorState()
+
+    for shard_dir in shard_dirs:
+        shard_results = load_json_from_file(
+            shard_dir / RESULTS_PATH.name, StoreTestResultDict
+        )
+        shard_plugins = {
+            plugin.key: plugin
+            for plugin in load_json_from_file(
+                shard_dir / PLUGINS_PATH.name, RegistryPluginList
+            )
+        }
+        shard_configs = load_json_from_file(
+            shard_dir / PLUGIN_CONFIG_PATH.name, PluginConfigDict
+        )
+        shard_state = SchedulerState()
+        if (shard_dir / SCHEDULER_PATH.name).exists():
+            shard_state = SchedulerState(
+                **load_json_from_file(shard_dir / SCHEDULER_PATH.name)
+            )
+            states.append(shard_state)
+            # 各个分片发现新版本的时间不同，使用最后发现的版本
+            for name, release in shard_state.frameworks.items():
+                current = frameworks.get(name)
+                if current is None or (
+                    release.time is not None
+                    and (current.time is None or release.time > current.time)
+                ):
+                    frameworks[name] = release
+        if (shard_dir / AUTHORS_PATH.name).exists():
+            shard_authors = AuthorState(
+                **load_json_from_file(shard_dir / AUTHORS_PATH.name)
+            )
+            for author_id, record in shard_authors.users.items():
+                if (
+                    author_id not in authors.users
+                    or record.time > authors.users[author_id].time
+                ):
+                    authors.users[author_id] = record
+            authors.keys.update(shard_authors.keys)
+
+        for key, result in shard_results.items():
+            if key in results and not _is_newer(result, results[key]):
+                continue
+            results[key] = result
+            if key in shard_plugins:
+                plugins[key] = shard_plugins[key]
+            if key in shard_configs:
+                plugin_configs[key] = shard_configs[key]
+            if key in shard_state.durations:
+                durations[key] = shard_state.durations[key]
+            # 测试成功后失败记录会被清除，所以也需要删除其他分片中的记录
+            if key in shard_state.failures:
+                failures[key] = shard_state.failures[key]
+            else:
+                failures.pop(key, None)
+        # 没有测试结果的插件与配置
+        for key, plugin in shard_plugins.items():
+            plugins.setdefault(key, plugin)
+        for key, config in shard_configs.items():
+            plugin_configs.setdefault(key, config)
+
+        click.echo(f"已合并分片 {shard_dir}")
+
+    first = shard_dirs[0]
+    adapters = load_json_from_file(first / ADAPTERS_PATH.name, RegistryAdapterList)
+    bots = load_json_from_file(first / BOTS_PATH.name, RegistryBotList)
+    drivers = load_json_from_file(first / DRIVERS_PATH.name, RegistryDriverList)
+
+    dump_json(ADAPTERS_PATH, adapters)
+    dump_json(BOTS_PATH, bots)
+    dump_json(DRIVERS_PATH, drivers)
+    dump_json(PLUGINS_PATH, list(plugins.values()))
+    dump_json(RESULTS_PATH, results)
+    # 插件配置不需要压缩
+    dump_json(PLUGIN_CONFIG_PATH, plugin_configs, False)
+    if states:
+        state = states[0]
+        for other in states[1:]:
+            durations = {**other.durations, **durations}
+        state.durations = {**state.durations, **durations}
+        state.failures = failures
+        state.frameworks = frameworks
+        # 每个分片只移动自己的游标，其他分片的游标保持不变
+        for other in states:
+            if other.shard is None:
+                continue
+            if other.shard in other.cursors:
+                state.cursors[other.shard] = other.cursors[other.shard]
+            if other.shard in other.serials:
+                state.serials[other.shard] = other.serials[other.shard]
+            else:
+                state.serials.pop(other.shard, None)
+        state.shard = None
+        dump_json(SCHEDULER_PATH, state)
+    if authors.users or authors.keys:
+        dump_json(AUTHORS_PATH, authors)
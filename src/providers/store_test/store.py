@@ -1,42 +1,74 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Self
+
 import click
 
 from src.providers.constants import (
-    BOT_KEY_TEMPLATE,
-    PYPI_KEY_TEMPLATE,
     REGISTRY_ADAPTERS_URL,
+    REGISTRY_AUTHORS_URL,
     REGISTRY_BOTS_URL,
+    REGISTRY_CHECKPOINT_URL,
     REGISTRY_DRIVERS_URL,
     REGISTRY_PLUGIN_CONFIG_URL,
     REGISTRY_PLUGINS_URL,
     REGISTRY_RESULTS_URL,
+    REGISTRY_SCHEDULER_URL,
     STORE_ADAPTERS_URL,
     STORE_BOTS_URL,
     STORE_DRIVERS_URL,
     STORE_PLUGINS_URL,
 )
+from src.providers.github import AuthorState, author_resolver
 from src.providers.models import (
+    PluginConfigDict,
     RegistryAdapter,
+    RegistryAdapterList,
     RegistryBot,
+    RegistryBotList,
     RegistryDriver,
+    RegistryDriverList,
     RegistryPlugin,
+    RegistryPluginList,
     RegistryUpdatePayload,
     StoreAdapter,
+    StoreAdapterList,
     StoreBot,
+    StoreBotList,
     StoreDriver,
+    StoreDriverList,
     StorePlugin,
+    StorePluginList,
     StoreTestResult,
+    StoreTestResultDict,
+)
+from src.providers.utils import (
+    canonicalize_name,
+    download_files,
+    dump_json,
+    load_json_bytes,
+    load_jsons_from_web,
+    pypi_client,
 )
-from src.providers.utils import dump_json, get_latest_version, load_json_from_web
-from src.providers.validation.utils import get_author_name
 
+from .checkpoint import Checkpoint
 from .constants import (
     ADAPTERS_PATH,
+    AUTHORS_PATH,
     BOTS_PATH,
+    CHECKPOINT_PATH,
     DRIVERS_PATH,
+    FRAMEWORK_PACKAGES,
     PLUGIN_CONFIG_PATH,
     PLUGINS_PATH,
     RESULTS_PATH,
+    RETEST_CHECKPOINT_PATH,
+    SCHEDULER_PATH,
 )
+from .failures import classify_failure, signature_index
+from .scheduler import Scheduler, SchedulerState
+from .shard import shard_of
 from .validation import validate_plugin
 
 
@@ -45,72 +77,116 @@ class StoreTest:
 
     def __init__(self) -> None:
         # 商店数据
-        self._store_adapters: dict[str, StoreAdapter] = {
-            PYPI_KEY_TEMPLATE.format(
-                project_link=adapter["project_link"],
-                module_name=adapter["module_name"],
-            ): StoreAdapter(**adapter)
-            for adapter in load_json_from_web(STORE_ADAPTERS_URL)
+        self._store_adapters: dict[str, StoreAdapter] = {}
+        self._store_bots: dict[str, StoreBot] = {}
+        self._store_drivers: dict[str, StoreDriver] = {}
+        self._store_plugins: dict[str, StorePlugin] = {}
+        # 上次测试的结果
+        self._previous_results: dict[str, StoreTestResult] = {}
+        self._previous_adapters: dict[str, RegistryAdapter] = {}
+        self._previous_bots: dict[str, RegistryBot] = {}
+        self._previous_drivers: dict[str, RegistryDriver] = {}
+        self._previous_plugins: dict[str, RegistryPlugin] = {}
+        # 插件配置文件
+        self._plugin_configs: dict[str, str] = {}
+        # 测试检查点
+        self._checkpoint = Checkpoint(CHECKPOINT_PATH)
+        # 测试调度
+        self._scheduler = Scheduler()
+        # 依赖的商店插件有新版本的插件，以及有新版本的依赖
+        self._dependency_updated: dict[str, list[str]] = {}
+        # 使用旧版本 nonebot2 或 pydantic 测试的插件
+        self._framework_updated: set[str] = set()
+        # nonebot2 与 pydantic 的最新版本
+        self._framework_versions: dict[str, str] | None = None
+
+    @classmethod
+    async def create(cls) -> Self:
+        """创建商店测试并加载数据"""
+        test = cls()
+        await test.load_data()
+        return test
+
+    async def load_data(self) -> None:
+        """加载商店数据与上次测试的结果
+
+        先并行下载所有文件，再统一验证数据
+        """
+        (
+            store_adapters,
+            store_bots,
+            store_drivers,
+            store_plugins,
+            previous_results,
+            previous_adapters,
+            previous_bots,
+            previous_drivers,
+            previous_plugins,
+            plugin_configs,
+        ) = await download_files(
+            STORE_ADAPTERS_URL,
+            STORE_BOTS_URL,
+            STORE_DRIVERS_URL,
+            STORE_PLUGINS_URL,
+            REGISTRY_RESULTS_URL,
+            REGISTRY_ADAPTERS_URL,
+            REGISTRY_BOTS_URL,
+            REGISTRY_DRIVERS_URL,
+            REGISTRY_PLUGINS_URL,
+            REGISTRY_PLUGIN_CONFIG_URL,
+        )
+
+        # 商店数据为 JSON5 格式
+        self._store_adapters = {
+            adapter.key: adapter
+            for adapter in load_json_bytes(store_adapters, StoreAdapterList, True)
         }
-        self._store_bots: dict[str, StoreBot] = {
-            BOT_KEY_TEMPLATE.format(
-                name=bot["name"],
-                homepage=bot["homepage"],
-            ): StoreBot(**bot)
-            for bot in load_json_from_web(STORE_BOTS_URL)
+        self._store_bots = {
+            bot.key: bot for bot in load_json_bytes(store_bots, StoreBotList, True)
         }
-        self._store_drivers: dict[str, StoreDriver] = {
-            PYPI_KEY_TEMPLATE.format(
-                project_link=driver["project_link"],
-                module_name=driver["module_name"],
-            ): StoreDriver(**driver)
-            for driver in load_json_from_web(STORE_DRIVERS_URL)
+        self._store_drivers = {
+            driver.key: driver
+            for driver in load_json_bytes(store_drivers, StoreDriverList, True)
         }
-        self._store_plugins: dict[str, StorePlugin] = {
-            PYPI_KEY_TEMPLATE.format(
-                project_link=plugin["project_link"],
-                module_name=plugin["module_name"],
-            ): StorePlugin(**plugin)
-            for plugin in load_json_from_web(STORE_PLUGINS_URL)
+        self._store_plugins = {
+            plugin.key: plugin
+            for plugin in load_json_bytes(store_plugins, StorePluginList, True)
         }
         # 上次测试的结果
-        self._previous_results: dict[str, StoreTestResult] = {
-            key: StoreTestResult(**value)
-            for key, value in load_json_from_web(REGISTRY_RESULTS_URL).items()
-        }
-        self._previous_adapters: dict[str, RegistryAdapter] = {
-            PYPI_KEY_TEMPLATE.format(
-                project_link=adapter["project_link"],
-                module_name=adapter["module_name"],
-            ): RegistryAdapter(**adapter)
-            for adapter in load_json_from_web(REGISTRY_ADAPTERS_URL)
+        self._previous_results = load_json_bytes(previous_results, StoreTestResultDict)
+        self._previous_adapters = {
+            adapter.key: adapter
+            for adapter in load_json_bytes(previous_adapters, RegistryAdapterList)
         }
-        self._previous_bots: dict[str, RegistryBot] = {
-            BOT_KEY_TEMPLATE.format(
-                name=bot["name"],
-                homepage=bot["homepage"],
-            ): RegistryBot(**bot)
-            for bot in load_json_from_web(url=REGISTRY_BOTS_URL)
+        self._previous_bots = {
+            bot.key: bot for bot in load_json_bytes(previous_bots, RegistryBotList)
         }
-        self._previous_drivers: dict[str, RegistryDriver] = {
-            PYPI_KEY_TEMPLATE.format(
-                project_link=driver["project_link"],
-                module_name=driver["module_name"],
-            ): RegistryDriver(**driver)
-            for driver in load_json_from_web(REGISTRY_DRIVERS_URL)
+        self._previous_drivers = {
+            driver.key: driver
+            for driver in load_json_bytes(previous_drivers, RegistryDriverList)
         }
-        self._previous_plugins: dict[str, RegistryPlugin] = {
-            PYPI_KEY_TEMPLATE.format(
-                project_link=plugin["project_link"], module_name=plugin["module_name"]
-            ): RegistryPlugin(**plugin)
-            for plugin in load_json_from_web(REGISTRY_PLUGINS_URL)
+        self._previous_plugins = {
+            plugin.key: plugin
+            for plugin in load_json_bytes(previous_plugins, RegistryPluginList)
         }
         # 插件配置文件
-        self._plugin_configs: dict[str, str] = load_json_from_web(
-            REGISTRY_PLUGIN_CONFIG_URL
-        )
+        self._plugin_configs = load_json_bytes(plugin_configs, PluginConfigDict)
 
-    def should_skip(self, key: str, force: bool = False) -> bool:
+        # 测试调度状态，不存在时从头开始
+        try:
+            (scheduler_state,) = await load_jsons_from_web(REGISTRY_SCHEDULER_URL)
+            self._scheduler = Scheduler(SchedulerState(**scheduler_state))
+        except ValueError:
+            click.echo("未找到测试调度状态，将从头开始调度")
+
+        # 作者信息缓存，不存在时重新获取
+        try:
+            (author_state,) = await load_jsons_from_web(REGISTRY_AUTHORS_URL)
+            author_resolver.state = AuthorState(**author_state)
+        except ValueError:
+            click.echo("未找到作者信息缓存，将重新获取作者信息")
+
+    async def should_skip(self, key: str, force: bool = False) -> bool:
         """是否跳过测试"""
         if key.startswith("git+http"):
             click.echo(f"插件 {key} 为 Git 插件，无法测试，已跳过")
@@ -120,6 +196,18 @@ class StoreTest:
         if force:
             return False
 
+        # 如果依赖的商店插件有新版本，则不跳过
+        if key in self._dependency_updated:
+            click.echo(
+                f"插件 {key} 依赖的插件 {', '.join(self._dependency_updated[key])} 有新版本，重新测试"
+            )
+            return False
+
+        # 如果上次测试后 nonebot2 或 pydantic 有新版本，则不跳过
+        if key in self._framework_updated:
+            click.echo(f"插件 {key} 上次测试后 nonebot2 或 pydantic 有新版本，重新测试")
+            return False
+
         # 如果插件不在上次测试的结果中，则不跳过
         previous_result: StoreTestResult | None = self._previous_results.get(key)
         previous_plugin: RegistryPlugin | None = self._previous_plugins.get(key)
@@ -128,15 +216,170 @@ class StoreTest:
 
         # 如果插件为最新版本，则跳过测试
         try:
-            latest_version = get_latest_version(previous_plugin.project_link)
+            latest_version = await pypi_client.latest_version(
+                previous_plugin.project_link
+            )
         except ValueError as e:
             click.echo(f"插件 {key} 获取最新版本失败：{e}，跳过测试")
             return True
         if latest_version == previous_result.version:
             click.echo(f"插件 {key} 为最新版本（{latest_version}），跳过测试")
             return True
+
+        # 如果上次为确定性失败且仍在退避中，则跳过测试
+        if key in self._scheduler.state.failures:
+            failure = self._scheduler.backoff(
+                key, latest_version, await self.nonebot_version()
+            )
+            if failure is not None:
+                click.echo(
+                    f"插件 {key} 已连续 {failure.attempts} 次无法安装或导入，"
+                    f"将在 {failure.retry_at:%Y-%m-%d %H:%M} 后重试，跳过测试"
+                )
+                return True
         return False
 
+    async def framework_versions(self) -> dict[str, str]:
+        """nonebot2 与 pydantic 的最新版本，不包括获取失败的框架
+
+        同时获取所有框架的版本，只在第一次调用时获取
+        """
+        if self._framework_versions is None:
+            results = await asyncio.gather(
+                *(pypi_client.latest_version(name) for name in FRAMEWORK_PACKAGES),
+                return_exceptions=True,
+            )
+            self._framework_versions = {}
+            for name, result in zip(FRAMEWORK_PACKAGES, results, strict=True):
+                if isinstance(result, BaseException):
+                    click.echo(f"获取 {name} 的最新版本失败：{result}")
+                else:
+                    self._framework_versions[name] = result
+        return self._framework_versions
+
+    async def nonebot_version(self) -> str | None:
+        """nonebot2 的最新版本，获取失败时为 None"""
+        return (await self.framework_versions()).get("nonebot2")
+
+    async def framework_outdated(self, keys: list[str]) -> set[str]:
+        """上次测试时使用的 nonebot2 或 pydantic 不是最新版本的插件
+
+        同时记录框架的最新版本，发现新版本时输出提示
+        """
+        versions = await self.framework_versions()
+        for name in self._scheduler.detect_releases(versions):
+            click.echo(f"{name} 发布了新版本 {versions[name]}，将优先重新测试插件")
+        return {
+            key
+            for key in keys
+            if key in self._previous_results
+            and self._scheduler.framework_outdated(self._previous_results[key])
+        }
+
+    async def record_failure(self, key: str, result: StoreTestResult) -> bool:
+        """根据测试结果更新失败记录
+
+        Returns:
+            bool: 是否为临时性失败
+        """
+        match classify_failure(result):
+            case "transient":
+                return True
+            case "deterministic":
+                project_link = self._store_plugins[key].project_link
+                try:
+                    latest_version = await pypi_client.latest_version(project_link)
+                except ValueError:
+                    latest_version = result.version
+                failure = self._scheduler.record_failure(
+                    key, latest_version, await self.nonebot_version()
+                )
+                click.echo(
+                    f"插件 {key} 无法安装或导入，将在 {failure.retry_at:%Y-%m-%d %H:%M} 后重试"
+                )
+            case None:
+                self._scheduler.clear_failure(key)
+        return False
+
+    async def latest_versions(self, keys: list[str]) -> dict[str, str | None]:
+        """获取插件在 PyPI 上的最新版本
+
+        获取失败或者没有上次的插件数据时为 None
+        """
+
+        async def latest_version(key: str) -> str | None:
+            previous_plugin = self._previous_plugins.get(key)
+            if previous_plugin is None or key.startswith("git+http"):
+                return None
+            try:
+                return await pypi_client.latest_version(previous_plugin.project_link)
+            except ValueError:
+                return None
+
+        versions = await asyncio.gather(*(latest_version(key) for key in keys))
+        return dict(zip(keys, versions, strict=True))
+
+    async def outdated_dependents(self, keys: list[str]) -> dict[str, list[str]]:
+        """筛选出依赖的商店插件在 PyPI 上有新版本的插件
+
+        通过反向依赖索引，只需要获取被依赖的插件的最新版本
+
+        Returns:
+            dict[str, list[str]]: 插件与其有新版本的依赖
+        """
+        modules = {
+            plugin.module_name: key for key, plugin in self._store_plugins.items()
+        }
+        index = self._scheduler.reverse_dependencies(self._previous_results, modules)
+        await pypi_client.prefetch(
+            self._previous_plugins[upstream].project_link
+            for upstream in index
+            if upstream in self._previous_plugins
+        )
+        latest_versions = await self.latest_versions(list(index))
+
+        targets = set(keys)
+        outdated: dict[str, list[str]] = {}
+        for upstream, dependents in index.items():
+            latest_version = latest_versions[upstream]
+            if latest_version is None:
+                continue
+            for key, version in dependents.items():
+                if key in targets and version != latest_version:
+                    outdated.setdefault(key, []).append(upstream)
+        click.echo(f"共有 {len(outdated)} 个插件依赖的商店插件有新版本")
+        return outdated
+
+    async def changed_plugins(self, keys: list[str]) -> tuple[list[str], int | None]:
+        """筛选出上次增量测试之后在 PyPI 上有变化的插件
+
+        从未测试过的插件始终需要检查，获取变更失败时检查所有插件
+
+        Returns:
+            tuple[list[str], int | None]: 需要检查的插件与最新的变更序号
+        """
+        serial = self._scheduler.serial
+        try:
+            if serial is None:
+                click.echo("未找到 PyPI 变更序号，将检查所有插件")
+                return keys, await pypi_client.last_serial()
+            changed, last_serial = await pypi_client.changelog_since(serial)
+        except ValueError as e:
+            click.echo(f"{e}，将检查所有插件")
+            return keys, serial
+
+        changed_keys = [
+            key
+            for key in keys
+            if key not in self._previous_results
+            or canonicalize_name(self._store_plugins[key].project_link) in changed
+        ]
+        click.echo(
+            f"PyPI 变更序号 {serial} 之后共有 {len(changed)} 个项目发生变化，"
+            f"需要检查 {len(changed_keys)} 个插件"
+        )
+        return changed_keys, last_serial
+
     def read_plugin_config(self, key: str) -> str:
         """获取插件配置
 
@@ -167,43 +410,238 @@ class StoreTest:
         )
         return new_result, new_plugin
 
-    async def test_plugins(self, limit: int, offset: int, force: bool):
+    async def test_plugins(
+        self,
+        limit: int,
+        offset: int,
+        force: bool,
+        concurrency: int = 1,
+        resume: bool = False,
+        schedule: bool = False,
+        shard: tuple[int, int] | None = None,
+        incremental: bool = False,
+        time_budget: float | None = None,
+        dry_run: bool = False,
+        dependents: bool = False,
+        frameworks: bool = False,
+        keys: list[str] | None = None,
+    ):
         """批量测试插件
 
+        至多同时运行 concurrency 个测试，测试失败的插件不计入测试数量
+
+        每个插件测试完成后都会写入检查点，恢复时跳过检查点中已完成的插件
+
+        启用调度时忽略 offset，按照插件的测试优先级决定测试顺序
+
+        启用分片时只测试分配到当前分片的插件，偏移量与调度也只针对这些插件
+
+        启用增量测试时只检查上次运行后在 PyPI 上有变化的插件，所有插件都检查过后才会记录新的变更序号
+
+        设置时间预算时忽略 limit，根据插件上次测试的耗时选择能在预算内完成的插件
+
+        启用调度时使用旧版本 nonebot2 或 pydantic 测试的插件优先测试，
+        只有设置 frameworks 时才会重新测试其中已是最新版本的插件
+
         Args:
             limit (int): 至多有效测试插件数量
             offset (int): 测试插件偏移量
             force (bool): 是否强制测试
+            concurrency (int): 同时测试插件数量，默认为 1
+            resume (bool): 是否从检查点恢复，默认为 False
+            schedule (bool): 是否按照优先级调度测试，默认为 False
+            shard (tuple[int, int] | None): 当前分片序号与分片总数，默认不分片
+            incremental (bool): 是否只测试 PyPI 上有变化的插件，默认为 False
+            time_budget (float | None): 时间预算，单位为分钟，默认不限制
+            dry_run (bool): 是否只输出测试计划而不实际测试，默认为 False
+            dependents (bool): 是否重新测试依赖的商店插件有新版本的插件，默认为 False
+            frameworks (bool): 是否重新测试上次测试后 nonebot2 或 pydantic 有新版本的插件，默认为 False
+            keys (list[str] | None): 只测试指定的插件，默认测试所有插件
         """
         new_results: dict[str, StoreTestResult] = {}
         new_plugins: dict[str, RegistryPlugin] = {}
-        i = 1
-        test_plugins = list(self._store_plugins.keys())[offset:]
-
-        for key in test_plugins:
-            if i > limit:
-                click.echo(f"已达到测试上限 {limit}，测试停止")
-                break
 
-            # 是否需要跳过测试
-            if self.should_skip(key, force):
-                continue
+        # 测试成功的插件数据，按开始测试的顺序储存
+        tested: list[str] = []
+        finished: dict[str, tuple[StoreTestResult, RegistryPlugin]] = {}
+        if resume:
+            await self._checkpoint.download(REGISTRY_CHECKPOINT_URL)
+            finished = self._checkpoint.load()
+            tested = list(finished)
+            click.echo(f"已从检查点恢复 {len(finished)} 个插件的测试结果")
+        elif not dry_run:
+            self._checkpoint.clear()
+
+        store_keys = list(self._store_plugins.keys())
+        if keys is not None:
+            store_keys = [key for key in store_keys if key in keys]
+        self._scheduler.use_shard(shard)
+        if shard:
+            index, total = shard
+            store_keys = [key for key in store_keys if shard_of(key, total) == index]
+            click.echo(f"当前为第 {index}/{total} 个分片，共 {len(store_keys)} 个插件")
+        test_plugins = [
+            key
+            for key in (store_keys if schedule else store_keys[offset:])
+            if key not in finished
+        ]
+        serial = self._scheduler.serial
+        if dependents:
+            self._dependency_updated = await self.outdated_dependents(test_plugins)
+        framework_updated: set[str] = set()
+        if schedule or frameworks:
+            framework_updated = await self.framework_outdated(test_plugins)
+        if frameworks:
+            self._framework_updated = framework_updated
+        if incremental:
+            changed, serial = await self.changed_plugins(test_plugins)
+            # 插件本身没有变化，但依赖或框架有新版本时也需要测试
+            changed = (
+                set(changed) | set(self._dependency_updated) | self._framework_updated
+            )
+            test_plugins = [key for key in test_plugins if key in changed]
+
+        # 一次性获取所有需要比较版本号的插件的最新版本
+        if not force or schedule:
+            await pypi_client.prefetch(
+                self._previous_plugins[key].project_link
+                for key in test_plugins
+                if not key.startswith("git+http")
+                and key in self._previous_results
+                and key in self._previous_plugins
+            )
+        if schedule:
+            test_plugins = self._scheduler.order(
+                test_plugins,
+                self._previous_results,
+                await self.latest_versions(test_plugins),
+                set(self._dependency_updated),
+                framework_updated,
+            )
+        candidates = len(test_plugins)
+        # 检查过是否需要测试的插件数量
+        visited = 0
+        # 是否已经提前检查过需要测试的插件
+        prechecked = time_budget is not None or dry_run
+
+        if prechecked:
+            # 需要提前确定测试哪些插件
+            test_plugins = [
+                key for key in test_plugins if not await self.should_skip(key, force)
+            ]
+            visited = candidates - len(test_plugins)
+            if time_budget is not None:
+                test_plugins = self._scheduler.pack(
+                    test_plugins, time_budget * 60, concurrency
+                )
+                limit = len(finished) + len(test_plugins)
+            else:
+                test_plugins = test_plugins[: max(limit - len(finished), 0)]
+
+        if dry_run:
+            self.print_plan(test_plugins, concurrency)
+            return new_results, new_plugins
+        if prechecked:
+            # 一次性获取所有计划测试的插件的作者
+            await author_resolver.prefetch(
+                self._store_plugins[key].author_id for key in test_plugins
+            )
+
+        test_plugins = iter(test_plugins)
+        # 插件开始测试的时间
+        started: dict[str, float] = {}
+
+        # 正在运行的测试任务
+        pending: dict[asyncio.Task[tuple[StoreTestResult, RegistryPlugin]], str] = {}
+        # 因临时性失败重试过的插件
+        retried: set[str] = set()
+        # 测试出错的插件，下次增量测试时仍需检查
+        errored: set[str] = set()
+
+        async def next_plugin() -> str | None:
+            """获取下一个需要测试的插件"""
+            nonlocal visited
+            for key in test_plugins:
+                visited += 1
+                # 是否需要跳过测试，提前检查过的插件无需再次检查
+                if prechecked or not await self.should_skip(key, force):
+                    return key
+
+        while True:
+            # 测试数量未达到上限时，继续添加测试任务
+            batch: list[str] = []
+            while (
+                len(pending) + len(batch) < concurrency
+                and len(finished) + len(pending) + len(batch) < limit
+            ):
+                key = await next_plugin()
+                if key is None:
+                    break
+                batch.append(key)
+            # 一次性获取这一批插件的作者，已经获取过的不会重复请求
+            await author_resolver.prefetch(
+                self._store_plugins[key].author_id for key in batch
+            )
+            for key in batch:
+                click.echo(
+                    f"{len(finished) + len(pending) + 1}/{limit} 正在测试插件 {key} ..."
+                )
+                tested.append(key)
+                started[key] = time.perf_counter()
+                pending[asyncio.create_task(self.test_plugin(key))] = key
 
-            async def worker():
-                new_result, new_plugin = await self.test_plugin(key)
-                new_results[key] = new_result
-                new_plugins[key] = new_plugin
+            if not pending:
+                break
 
-            try:
-                click.echo(f"{i}/{limit} 正在测试插件 {key} ...")
-                await worker()  # TODO: 修改为并行
-                i += 1
-            except Exception as err:
-                click.echo(err)
-                continue
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                key = pending.pop(task)
+                self._scheduler.record(key, time.perf_counter() - started[key])
+                try:
+                    finished[key] = task.result()
+                except Exception as err:
+                    click.echo(err)
+                    errored.add(key)
+                    continue
+                transient = await self.record_failure(key, finished[key][0])
+                # 临时性失败在本次运行中立即重试一次
+                if transient and key not in retried:
+                    click.echo(f"插件 {key} 测试时遇到网络错误或超时，重新测试")
+                    retried.add(key)
+                    del finished[key]
+                    started[key] = time.perf_counter()
+                    pending[asyncio.create_task(self.test_plugin(key))] = key
+                    continue
+                self._checkpoint.append(key, *finished[key])
+
+        if len(finished) >= limit:
+            click.echo(f"已达到测试上限 {limit}，测试停止")
+
+        if schedule:
+            self._scheduler.advance(store_keys, visited)
+        # 未检查完或者测试出错的插件下次仍需检查，不能更新变更序号
+        if incremental and visited == candidates and not errored:
+            self._scheduler.serial = serial
+
+        # 统一按照开始测试的顺序写入结果，保证结果稳定
+        for key in tested:
+            if key in finished:
+                new_results[key], new_plugins[key] = finished[key]
 
         return new_results, new_plugins
 
+    def print_plan(self, keys: list[str], concurrency: int = 1) -> None:
+        """输出测试计划与预计耗时"""
+        total = 0.0
+        for i, key in enumerate(keys, 1):
+            estimate = self._scheduler.estimate(key)
+            total += estimate
+            click.echo(f"{i}. {key}（预计 {estimate:.0f} 秒）")
+        click.echo(
+            f"计划测试 {len(keys)} 个插件，"
+            f"预计耗时 {total / concurrency / 60:.1f} 分钟（同时测试 {concurrency} 个）"
+        )
+
     def merge_plugin_data(
         self,
         new_results: dict[str, StoreTestResult],
@@ -233,27 +671,84 @@ class StoreTest:
         self._previous_plugins = plugins
 
     def dump_data(self):
-        """储存数据到仓库中"""
-        dump_json(ADAPTERS_PATH, list(self._previous_adapters.values()))
-        dump_json(BOTS_PATH, list(self._previous_bots.values()))
-        dump_json(DRIVERS_PATH, list(self._previous_drivers.values()))
-        dump_json(PLUGINS_PATH, list(self._previous_plugins.values()))
-        dump_json(RESULTS_PATH, self._previous_results)
-        # 插件配置不需要压缩
-        dump_json(PLUGIN_CONFIG_PATH, self._plugin_configs, False)
-
-    async def run(self, limit: int, offset: int = 0, force: bool = False):
+        """储存数据到仓库中
+
+        内容没有变化的文件不会重新写入
+        """
+        files: list[tuple[Path, Any, bool]] = [
+            (ADAPTERS_PATH, list(self._previous_adapters.values()), True),
+            (BOTS_PATH, list(self._previous_bots.values()), True),
+            (DRIVERS_PATH, list(self._previous_drivers.values()), True),
+            (PLUGINS_PATH, list(self._previous_plugins.values()), True),
+            (RESULTS_PATH, self._previous_results, True),
+            # 插件配置不需要压缩
+            (PLUGIN_CONFIG_PATH, self._plugin_configs, False),
+            (SCHEDULER_PATH, self._scheduler.state, True),
+            (AUTHORS_PATH, author_resolver.state, True),
+        ]
+        unchanged = [
+            path.name
+            for path, data, minify in files
+            if not dump_json(path, data, minify)
+        ]
+        if unchanged:
+            click.echo(f"以下文件内容没有变化，跳过写入：{', '.join(unchanged)}")
+
+    async def run(
+        self,
+        limit: int,
+        offset: int = 0,
+        force: bool = False,
+        concurrency: int = 1,
+        resume: bool = False,
+        schedule: bool = False,
+        shard: tuple[int, int] | None = None,
+        incremental: bool = False,
+        time_budget: float | None = None,
+        dry_run: bool = False,
+        dependents: bool = False,
+        frameworks: bool = False,
+        keys: list[str] | None = None,
+    ):
         """运行商店测试
 
         Args:
             limit (int): 至多有效测试插件数量
             offset (int): 测试插件偏移量
             force (bool): 是否强制测试，默认为 False
+            concurrency (int): 同时测试插件数量，默认为 1
+            resume (bool): 是否从检查点恢复，默认为 False
+            schedule (bool): 是否按照优先级调度测试，默认为 False
+            shard (tuple[int, int] | None): 当前分片序号与分片总数，默认不分片
+            incremental (bool): 是否只测试 PyPI 上有变化的插件，默认为 False
+            time_budget (float | None): 时间预算，单位为分钟，默认不限制
+            dry_run (bool): 是否只输出测试计划而不实际测试，默认为 False
+            dependents (bool): 是否重新测试依赖的商店插件有新版本的插件，默认为 False
+            frameworks (bool): 是否重新测试上次测试后 nonebot2 或 pydantic 有新版本的插件，默认为 False
+            keys (list[str] | None): 只测试指定的插件，默认测试所有插件
         """
-        new_results, new_plugins = await self.test_plugins(limit, offset, force)
+        new_results, new_plugins = await self.test_plugins(
+            limit,
+            offset,
+            force,
+            concurrency,
+            resume,
+            schedule,
+            shard,
+            incremental,
+            time_budget,
+            dry_run,
+            dependents,
+            frameworks,
+            keys,
+        )
+        if dry_run:
+            return
         self.merge_plugin_data(new_results, new_plugins)
         await self.sync_store()
         self.dump_data()
+        # 数据已经保存，不再需要检查点
+        self._checkpoint.clear()
 
     async def run_single_plugin(self, key: str, force: bool = False):
         """
@@ -263,7 +758,7 @@ class StoreTest:
             key (str): 插件标识符
             forece (bool): 是否强制测试，默认为 False
         """
-        if self.should_skip(key, force):
+        if await self.should_skip(key, force):
             return
 
         new_plugin: RegistryPlugin | None = None
@@ -277,6 +772,37 @@ class StoreTest:
 
         self.dump_data()
 
+    def print_signatures(self) -> None:
+        """输出上次测试中加载失败的插件的失败特征"""
+        clusters = signature_index(self._previous_results)
+        for fp, cluster in clusters.items():
+            click.echo(f"{fp}（{len(cluster.keys)} 个插件）：{cluster.signature}")
+        click.echo(f"共 {len(clusters)} 种失败特征")
+
+    async def retest(self, signatures: list[str], concurrency: int = 1):
+        """重新测试具有指定失败特征的插件
+
+        失败特征的指纹可以只写前缀，对应的插件会被强制重新测试
+
+        使用单独的检查点，不会清除被中断的全量测试的检查点
+
+        Args:
+            signatures (list[str]): 失败特征的指纹
+            concurrency (int): 同时测试插件数量，默认为 1
+        """
+        keys = [
+            key
+            for fp, cluster in signature_index(self._previous_results).items()
+            if any(fp.startswith(signature) for signature in signatures)
+            for key in cluster.keys
+        ]
+        if not keys:
+            click.echo(f"没有找到失败特征为 {', '.join(signatures)} 的插件")
+            return
+        click.echo(f"共有 {len(keys)} 个插件具有指定的失败特征，重新测试")
+        self._checkpoint = Checkpoint(RETEST_CHECKPOINT_PATH)
+        await self.run(len(keys), force=True, concurrency=concurrency, keys=keys)
+
     async def registry_update(self, payload: RegistryUpdatePayload):
         """商店更新
 
@@ -305,13 +831,33 @@ class StoreTest:
     async def sync_store(self):
         """同步商店数据
 
-        以商店数据为准，更新商店数据到仓库中，如果仓库中不存在则获取用户名后存储
+        以商店数据为准，更新商店数据到仓库中
+        如果仓库中不存在或者作者 ID 发生变化，则批量获取用户名后存储
         """
+        # 需要获取用户名的项与对应的作者 ID
+        outdated: dict[str, int] = {}
+        for store, registry in (
+            (self._store_adapters, self._previous_adapters),
+            (self._store_bots, self._previous_bots),
+            (self._store_drivers, self._previous_drivers),
+        ):
+            for key, item in store.items():
+                # 每一项的作者 ID 都需要记录，不能短路
+                changed = author_resolver.track(key, item.author_id)
+                if changed or key not in registry:
+                    outdated[key] = item.author_id
+        for key, plugin in self._store_plugins.items():
+            # 插件只会在测试后加入仓库
+            changed = author_resolver.track(key, plugin.author_id)
+            if changed and key in self._previous_plugins:
+                outdated[key] = plugin.author_id
+        authors = await author_resolver.resolve(*outdated.values())
+
         for key in self._store_adapters:
-            if key not in self._previous_adapters:
-                author = get_author_name(self._store_adapters[key].author_id)
+            if key in outdated:
                 self._previous_adapters[key] = RegistryAdapter(
-                    **self._store_adapters[key].model_dump(), author=author
+                    **self._store_adapters[key].model_dump(),
+                    author=authors[outdated[key]],
                 )
             else:
                 self._previous_adapters[key] = RegistryAdapter(
@@ -319,10 +865,10 @@ class StoreTest:
                     author=self._previous_adapters[key].author,
                 )
         for key in self._store_bots:
-            if key not in self._previous_bots:
-                author = get_author_name(self._store_bots[key].author_id)
+            if key in outdated:
                 self._previous_bots[key] = RegistryBot(
-                    **self._store_bots[key].model_dump(), author=author
+                    **self._store_bots[key].model_dump(),
+                    author=authors[outdated[key]],
                 )
             else:
                 self._previous_bots[key] = RegistryBot(
@@ -330,10 +876,10 @@ class StoreTest:
                     author=self._previous_bots[key].author,
                 )
         for key in self._store_drivers:
-            if key not in self._previous_drivers:
-                author = get_author_name(self._store_drivers[key].author_id)
+            if key in outdated:
                 self._previous_drivers[key] = RegistryDriver(
-                    **self._store_drivers[key].model_dump(), author=author
+                    **self._store_drivers[key].model_dump(),
+                    author=authors[outdated[key]],
                 )
             else:
                 self._previous_drivers[key] = RegistryDriver(
@@ -344,6 +890,9 @@ class StoreTest:
             if key in self._previous_plugins:
                 plugin_data = self._previous_plugins[key].model_dump()
                 # 更新插件数据，假设商店数据的数据没有问题的
-                # TODO: 如果 author_id 变化，应该重新获取 author
                 plugin_data.update(self._store_plugins[key].model_dump())
+                if key in outdated:
+                    plugin_data["author"] = authors[outdated[key]]
                 self._previous_plugins[key] = RegistryPlugin(**plugin_data)
+        if author_resolver.requests:
+            click.echo(f"获取作者信息共请求了 {author_resolver.requests} 次 GitHub API")
@@ -5,14 +5,16 @@ from typing import Any
 import click
 
 from src.providers.docker_test import DockerPluginTest
+from src.providers.github import author_resolver
 from src.providers.models import RegistryPlugin, StorePlugin, StoreTestResult
+from src.providers.utils import pypi_client
 from src.providers.validation import (
     PluginPublishInfo,
     PublishType,
     ValidationDict,
     validate_info,
 )
-from src.providers.validation.utils import get_author_name, get_upload_time
+from src.providers.validation.utils import get_upload_time
 
 
 async def validate_plugin(
@@ -32,18 +34,19 @@ async def validate_plugin(
     project_link = store_plugin.project_link
     module_name = store_plugin.module_name
 
-    # 从 PyPI 获取信息
+    # 从 PyPI 获取信息，之后验证插件信息时也会直接使用缓存的数据
+    await pypi_client.prefetch([project_link])
     pypi_time = get_upload_time(project_link)
 
     # 测试插件
-    plugin_test_result = await DockerPluginTest(project_link, module_name, config).run(
-        "3.12"
-    )
+    # 同时测试多个 Python 版本时，以默认版本的结果为准
+    plugin_test_result = await DockerPluginTest(
+        project_link, module_name, config
+    ).run_matrix()
 
     plugin_test_load = plugin_test_result.load
     plugin_test_output = "\n".join(plugin_test_result.outputs)
     plugin_test_version = plugin_test_result.version
-    plugin_test_env = plugin_test_result.test_env
     plugin_metadata = plugin_test_result.metadata
 
     # 输出插件测试相关信息
@@ -82,9 +85,10 @@ async def validate_plugin(
     if plugin_metadata:
         raw_data.update(plugin_metadata)
 
-    # 通过 Github API 获取插件作者名称
+    # 通过 Github API 获取插件作者名称，批量获取过的直接使用缓存
     try:
-        author_name = get_author_name(store_plugin.author_id)
+        authors = await author_resolver.resolve(store_plugin.author_id)
+        author_name = authors[store_plugin.author_id]
     except Exception:
         # 若无法请求，试图从上次的插件数据中获取
         author_name = previous_plugin.author if previous_plugin else ""
@@ -130,7 +134,9 @@ async def validate_plugin(
             "load": plugin_test_output,
             "metadata": plugin_metadata,
         },
-        test_env={plugin_test_env: True},
+        test_env=plugin_test_result.test_envs,
+        stats=plugin_test_result.stats,
+        deps=plugin_test_result.deps,
     )
 
     return test_result, new_plugin
@@ -1,25 +1,122 @@
+import asyncio
+import hashlib
 import json
-from functools import cache
+import os
+import re
+import xmlrpc.client
+from collections.abc import Iterable
 from pathlib import Path
-from typing import Any
+from typing import Any, ClassVar, overload
 
 import httpx
 import pyjson5
-from pydantic_core import to_jsonable_python
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import from_json, to_json
 
+from src.providers.cache import cached_async_client, cached_client
+from src.providers.constants import PYPI_BASE_URL, PYPI_XMLRPC_URL
 
-def load_json_from_file(file_path: str | Path):
-    """从文件加载 JSON5 文件"""
-    with open(file_path, encoding="utf-8") as file:
-        return pyjson5.decode_io(file)  # type: ignore
 
+def is_json5(name: str | Path) -> bool:
+    """是否为 JSON5 文件"""
+    return str(name).endswith(".json5")
 
-def load_json_from_web(url: str):
-    """从网络加载 JSON5 文件"""
-    r = httpx.get(url)
+
+@overload
+def load_json_bytes(
+    content: bytes, adapter: None = None, json5: bool = False
+) -> Any: ...
+
+
+@overload
+def load_json_bytes[T](
+    content: bytes, adapter: TypeAdapter[T], json5: bool = False
+) -> T: ...
+
+
+def load_json_bytes(
+    content: bytes, adapter: TypeAdapter[Any] | None = None, json5: bool = False
+) -> Any:
+    """解析 JSON 或 JSON5 内容
+
+    严格的 JSON 直接交给 pydantic-core 解析，提供 adapter 时在解析的同时完成验证，不再生成中间的字典
+    只有 JSON5 或者无法按照 JSON 解析的内容才使用 pyjson5
+    """
+    if not json5:
+        try:
+            if adapter is None:
+                return from_json(content)
+            return adapter.validate_json(content)
+        except ValidationError as e:
+            # 只有 JSON 格式错误时才需要尝试 JSON5，数据验证失败直接报错
+            if e.errors()[0]["type"] != "json_invalid":
+                raise
+        except ValueError:
+            pass
+
+    data = pyjson5.decode(content.decode("utf-8"))
+    if adapter is None:
+        return data
+    return adapter.validate_python(data)
+
+
+@overload
+def load_json_from_file(file_path: str | Path, adapter: None = None) -> Any: ...
+
+
+@overload
+def load_json_from_file[T](file_path: str | Path, adapter: TypeAdapter[T]) -> T: ...
+
+
+def load_json_from_file(
+    file_path: str | Path, adapter: TypeAdapter[Any] | None = None
+) -> Any:
+    """从文件加载 JSON 或 JSON5 文件"""
+    content = Path(file_path).read_bytes()
+    return load_json_bytes(content, adapter, is_json5(file_path))
+
+
+@overload
+def load_json_from_web(url: str, adapter: None = None) -> Any: ...
+
+
+@overload
+def load_json_from_web[T](url: str, adapter: TypeAdapter[T]) -> T: ...
+
+
+def load_json_from_web(url: str, adapter: TypeAdapter[Any] | None = None) -> Any:
+    """从网络加载 JSON 或 JSON5 文件"""
+    with cached_client() as client:
+        r = client.get(url)
     if r.status_code != 200:
         raise ValueError(f"下载文件失败：{r.text}")
-    return pyjson5.decode(r.text)
+    return load_json_bytes(r.content, adapter, is_json5(url))
+
+
+async def download_files(*urls: str) -> list[bytes]:
+    """从网络并行下载多个文件
+
+    所有请求共用同一个连接池，返回结果的顺序与传入的网址一致
+    """
+    async with cached_async_client() as client:
+        responses = await asyncio.gather(*(client.get(url) for url in urls))
+
+    for r in responses:
+        if r.status_code != 200:
+            raise ValueError(f"下载文件失败：{r.text}")
+    return [r.content for r in responses]
+
+
+async def load_jsons_from_web(*urls: str) -> list[Any]:
+    """从网络并行加载多个 JSON 或 JSON5 文件
+
+    返回结果的顺序与传入的网址一致
+    """
+    contents = await download_files(*urls)
+    return [
+        load_json_bytes(content, json5=is_json5(url))
+        for url, content in zip(urls, contents, strict=True)
+    ]
 
 
 def load_json(text: str):
@@ -36,49 +133,249 @@ def dumps_json(data: Any, minify: bool = True) -> str:
     return data
 
 
-def dump_json(path: str | Path, data: Any, minify: bool = True) -> None:
-    """保存 JSON 文件"""
-    data = to_jsonable_python(data)
+def write_file(path: str | Path, *chunks: bytes | memoryview) -> bool:
+    """将内容写入文件
+
+    文件内容没有变化时跳过写入，否则先写入临时文件再替换，避免进程中断时留下不完整的文件
+
+    Returns:
+        bool: 是否写入了文件
+    """
+    path = Path(path)
+    size = sum(len(chunk) for chunk in chunks)
+    if path.exists() and path.stat().st_size == size:
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk)
+        with open(path, "rb") as f:
+            if hashlib.file_digest(f, "sha256").digest() == digest.digest():
+                return False
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return True
+
+
+def dump_json(path: str | Path, data: Any, minify: bool = True) -> bool:
+    """保存 JSON 文件
 
-    with open(path, "w", encoding="utf-8") as f:
-        if minify:
-            # 为减少文件大小，还需手动设置 separators
-            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
-        else:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    直接由 pydantic-core 将数据序列化为字节，不再生成中间的对象
+
+    Returns:
+        bool: 文件内容是否有变化
+    """
+    # 压缩时不包含任何空白字符，以减少文件大小
+    content = to_json(data, indent=None if minify else 2)
+    return write_file(path, content)
 
 
-def dump_json5(path: Path, data: Any) -> None:
+def dump_json5(path: Path, data: Any) -> bool:
     """保存 JSON5 文件
 
     手动添加末尾的逗号和换行符
+
+    Returns:
+        bool: 文件内容是否有变化
     """
-    data = to_jsonable_python(data)
+    content = to_json(data, indent=2)
 
-    content = json.dumps(data, ensure_ascii=False, indent=2)
-    # 手动添加末尾的逗号和换行符
-    # 避免合并时出现冲突
-    content = content.replace("}\n]", "},\n]")
-    content += "\n"
+    # 在列表最后一项的末尾添加逗号，避免合并时出现冲突
+    # 只有顶层列表的结束括号没有缩进
+    if content.endswith(b"}\n]"):
+        return write_file(path, memoryview(content)[:-2], b",\n]\n")
+    return write_file(path, content, b"\n")
 
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(content)
 
+CACHEABLE_STATUS_CODES = (200, 404)
+""" PyPI 客户端会缓存的响应状态码 """
 
-@cache
-def get_pypi_data(project_link: str) -> dict[str, Any]:
-    """获取 PyPI 数据"""
-    headers = {
+
+class PyPIClient:
+    """PyPI 元数据客户端
+
+    同步与异步请求共用同一份缓存，同一项目在一次运行中只会请求一次
+
+    只缓存成功（200）与项目不存在（404）的响应，服务器错误或者被限流（例如 5xx、429）时不缓存，
+    之后使用时会重新请求
+
+    异步请求共用同一个连接池，并限制每个域名同时进行的请求数量
+    """
+
+    headers: ClassVar[dict[str, str]] = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/83.0.4103.116 Safari/537.36"
     }
-    url = f"https://pypi.org/pypi/{project_link}/json"
-    try:
-        r = httpx.get(url, headers=headers)
-    except Exception as e:
-        raise ValueError(f"获取 PyPI 数据失败：{e}")
-    if r.status_code != 200:
-        raise ValueError(f"获取 PyPI 数据失败：{r.text}")
-    return load_json(r.text)
+
+    def __init__(self, max_connections: int = 10) -> None:
+        self.max_connections = max_connections
+        """每个域名同时进行的请求数量上限"""
+
+        self._responses: dict[str, httpx.Response] = {}
+        self._pending: dict[str, asyncio.Future[httpx.Response]] = {}
+        self._client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @staticmethod
+    def url(project_link: str) -> str:
+        """项目对应的 PyPI JSON API 网址"""
+        return f"{PYPI_BASE_URL}/pypi/{project_link}/json"
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = cached_client(headers=self.headers, follow_redirects=True)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # 异步客户端与信号量都绑定在事件循环上，事件循环变化时需要重新创建
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._loop is not loop:
+            self._async_client = cached_async_client(
+                headers=self.headers, follow_redirects=True
+            )
+            self._semaphores = {}
+            self._pending = {}
+            self._loop = loop
+        return self._async_client
+
+    def clear(self) -> None:
+        """清除缓存"""
+        self._responses.clear()
+        self._pending.clear()
+
+    def _store(self, project_link: str, r: httpx.Response) -> None:
+        """缓存结果不会改变的响应"""
+        if r.status_code in CACHEABLE_STATUS_CODES:
+            self._responses[project_link] = r
+
+    def get_response_sync(self, project_link: str) -> httpx.Response:
+        """同步获取 PyPI 响应"""
+        if project_link in self._responses:
+            return self._responses[project_link]
+        r = self.client.get(self.url(project_link))
+        self._store(project_link, r)
+        return r
+
+    async def get_response(self, project_link: str) -> httpx.Response:
+        """异步获取 PyPI 响应
+
+        同时请求同一项目时，只会发送一次请求
+        """
+        if project_link in self._responses:
+            return self._responses[project_link]
+
+        client = self.async_client
+        if project_link not in self._pending:
+            self._pending[project_link] = asyncio.ensure_future(
+                self._fetch(client, project_link)
+            )
+        try:
+            return await asyncio.shield(self._pending[project_link])
+        finally:
+            self._pending.pop(project_link, None)
+
+    async def _fetch(self, client: httpx.AsyncClient, project_link: str):
+        url = httpx.URL(self.url(project_link))
+        semaphore = self._semaphores.setdefault(
+            url.host, asyncio.Semaphore(self.max_connections)
+        )
+        async with semaphore:
+            r = await client.get(url)
+        self._store(project_link, r)
+        return r
+
+    async def prefetch(self, project_links: Iterable[str]) -> None:
+        """并行预先获取多个项目的数据
+
+        请求失败的项目不会被缓存，之后使用时会重新请求
+        """
+        await asyncio.gather(
+            *(self.get_response(link) for link in set(project_links)),
+            return_exceptions=True,
+        )
+
+    @staticmethod
+    def _parse(r: httpx.Response) -> dict[str, Any]:
+        if r.status_code != 200:
+            raise ValueError(f"获取 PyPI 数据失败：{r.text}")
+        return load_json_bytes(r.content)
+
+    def get_data_sync(self, project_link: str) -> dict[str, Any]:
+        """同步获取 PyPI 数据"""
+        try:
+            r = self.get_response_sync(project_link)
+        except Exception as e:
+            raise ValueError(f"获取 PyPI 数据失败：{e}")
+        return self._parse(r)
+
+    async def get_data(self, project_link: str) -> dict[str, Any]:
+        """异步获取 PyPI 数据"""
+        try:
+            r = await self.get_response(project_link)
+        except Exception as e:
+            raise ValueError(f"获取 PyPI 数据失败：{e}")
+        return self._parse(r)
+
+    async def latest_version(self, project_link: str) -> str:
+        """异步获取项目的最新版本号"""
+        data = await self.get_data(project_link)
+        return data["info"]["version"]
+
+    async def call(self, method: str, *params: Any) -> Any:
+        """调用 PyPI 的 XML-RPC 接口"""
+        try:
+            r = await self.async_client.post(
+                PYPI_XMLRPC_URL,
+                content=xmlrpc.client.dumps(params, method),
+                headers={"Content-Type": "text/xml"},
+            )
+            r.raise_for_status()
+            (result,), _ = xmlrpc.client.loads(r.content)
+        except Exception as e:
+            raise ValueError(f"调用 PyPI 接口 {method} 失败：{e}")
+        return result
+
+    async def last_serial(self) -> int:
+        """PyPI 最新的变更序号"""
+        return await self.call("changelog_last_serial")
+
+    async def changelog_since(self, serial: int) -> tuple[set[str], int]:
+        """获取指定变更序号之后发生变化的项目
+
+        Returns:
+            tuple[set[str], int]: 规范化后的项目名称与最新的变更序号
+        """
+        entries = await self.call("changelog_since_serial", serial)
+        # 每条记录为 (项目名称, 版本, 时间戳, 操作, 变更序号)
+        names = {canonicalize_name(entry[0]) for entry in entries}
+        last_serial = max((entry[4] for entry in entries), default=serial)
+        return names, last_serial
+
+
+pypi_client = PyPIClient()
+"""全局共用的 PyPI 元数据客户端"""
+
+
+def canonicalize_name(name: str) -> str:
+    """规范化项目名称
+
+    packaging.utils 中的 canonicalize_name 实现
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def get_pypi_data(project_link: str) -> dict[str, Any]:
+    """获取 PyPI 数据"""
+    return pypi_client.get_data_sync(project_link)
 
 
 def get_latest_version(project_link: str) -> str:
@@ -218,6 +218,8 @@ class PluginPublishInfo(PublishInfo, PyPIMixin):
     """插件测试配置"""
     test_output: str = ""
     """插件测试输出"""
+    test_env: dict[str, bool] = {}
+    """各个测试环境中是否加载成功，跳过测试时为空"""
 
     @field_validator("type", mode="before")
     @classmethod
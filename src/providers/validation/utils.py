@@ -3,8 +3,9 @@ from typing import TYPE_CHECKING
 
 import httpx
 
+from src.providers.cache import cached_client
 from src.providers.constants import STORE_ADAPTERS_URL
-from src.providers.utils import load_json, load_json_from_web
+from src.providers.utils import load_json, load_json_from_web, pypi_client
 
 from .constants import MESSAGE_TRANSLATIONS
 
@@ -15,13 +16,13 @@ if TYPE_CHECKING:
 @cache
 def get_url(url: str) -> httpx.Response:
     """获取网址"""
-    return httpx.get(url, follow_redirects=True)
+    with cached_client(follow_redirects=True) as client:
+        return client.get(url)
 
 
 def get_pypi_name(project_link: str) -> str:
     """获取 PyPI 项目名"""
-    url = f"https://pypi.org/pypi/{project_link}/json"
-    r = get_url(url)
+    r = pypi_client.get_response_sync(project_link)
     r.raise_for_status()
     data = load_json(r.text)
     return data["info"]["name"]
@@ -29,8 +30,10 @@ def get_pypi_name(project_link: str) -> str:
 
 def get_upload_time(project_link: str) -> str | None:
     """获取插件的上传时间"""
-    url = f"https://pypi.org/pypi/{project_link}/json"
-    r = get_url(url)
+    try:
+        r = pypi_client.get_response_sync(project_link)
+    except Exception:
+        return None
     if r.status_code != 200:
         return None
     try:
@@ -42,9 +45,11 @@ def get_upload_time(project_link: str) -> str | None:
 
 def check_pypi(project_link: str) -> bool:
     """检查项目是否存在"""
-    url = f"https://pypi.org/pypi/{project_link}/json"
-    status_code, _ = check_url(url)
-    return status_code == 200
+    try:
+        r = pypi_client.get_response_sync(project_link)
+    except Exception:
+        return False
+    return r.status_code == 200
 
 
 def check_url(url: str) -> tuple[int, str]:
@@ -59,13 +64,6 @@ def check_url(url: str) -> tuple[int, str]:
         return -1, str(e)
 
 
-@cache
-def get_author_name(author_id: int) -> str:
-    """通过作者的ID获取作者名字"""
-    url = f"https://api.github.com/user/{author_id}"
-    return load_json_from_web(url)["login"]
-
-
 def get_adapters() -> set[str]:
     """获取适配器列表"""
     adapters = load_json_from_web(STORE_ADAPTERS_URL)
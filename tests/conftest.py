@@ -99,19 +99,23 @@ async def app(app: App, tmp_path: Path, mocker: MockerFixture):
         plugin_config, "github_step_summary", tmp_path / "step_summary.txt"
     )
 
-    yield app
-
-    from src.providers.utils import get_pypi_data
-
-    get_pypi_data.cache_clear()
+    return app
 
 
 @pytest.fixture(autouse=True)
 def _clear_cache(app: App):
     """每次运行前都清除 cache"""
+    from src.providers.cache import http_cache
+    from src.providers.docker_test import get_docker_client
+    from src.providers.github import author_resolver
+    from src.providers.utils import pypi_client
     from src.providers.validation.utils import get_url
 
     get_url.cache_clear()
+    get_docker_client.cache_clear()
+    pypi_client.clear()
+    http_cache.clear()
+    author_resolver.clear()
 
 
 @pytest.fixture
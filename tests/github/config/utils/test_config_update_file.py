@@ -49,6 +49,7 @@ async def test_update_file(
         "test_output": "test_output",
         "time": "2023-01-01T00:00:00Z",
         "version": "1.0.0",
+        "test_env": {"python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0": True},
     }
     result = ValidationDict(
         type=PublishType.PLUGIN,
@@ -90,7 +91,9 @@ async def test_update_file(
                     "time": "2023-08-23T09:22:14.836035+08:00",
                     "config": "log_level=DEBUG",
                     "version": "1.0.0",
-                    "test_env": {"python==3.12": True},
+                    "test_env": {
+                        "python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0": True
+                    },
                     "results": {"validation": True, "load": True, "metadata": True},
                     "outputs": {
                         "validation": None,
@@ -52,8 +52,11 @@ async def test_process_pull_request(
         supported_adapters=["~onebot.v11"],
     )
     mock_test_result.load = True
+    mock_test_result.test_envs = {
+        "python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0": True
+    }
     mock_test_result.version = "1.0.0"
-    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run")
+    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run_matrix")
     mock_docker.return_value = mock_test_result
 
     async with app.test_matcher() as ctx:
@@ -105,7 +108,9 @@ async def test_process_pull_request(
                             "time": "2023-09-01T00:00:00+00:00Z",
                             "config": "log_level=DEBUG",
                             "version": "1.0.0",
-                            "test_env": {"python==3.12": True},
+                            "test_env": {
+                                "python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0": True
+                            },
                             "results": {
                                 "validation": True,
                                 "load": True,
@@ -320,7 +320,10 @@ async def test_resolve_conflict_pull_requests_plugin(
         supported_adapters=["~onebot.v11"],
     )
     mock_test_result.version = "1.0.0"
-    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run")
+    mock_test_result.test_envs = {
+        "python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0": True
+    }
+    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run_matrix")
     mock_docker.return_value = mock_test_result
 
     dump_json5(
@@ -460,8 +463,11 @@ async def test_resolve_conflict_pull_requests_plugin_not_valid(
 
     mock_test_result = mocker.MagicMock()
     mock_test_result.load = False
+    mock_test_result.test_envs = {
+        "python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0": False
+    }
     mock_test_result.metadata = None
-    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run")
+    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run_matrix")
     mock_docker.return_value = mock_test_result
 
     dump_json5(
@@ -80,8 +80,11 @@ async def test_validate_info_from_issue_plugin(
     )
     mock_test_result.version = "1.0.0"
     mock_test_result.load = True
+    mock_test_result.test_envs = {
+        "python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0": True
+    }
     mock_test_result.outputs = ['require("nonebot_plugin_alconna")', "test"]
-    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run")
+    mock_docker = mocker.patch("src.providers.docker_test.DockerPluginTest.run_matrix")
     mock_docker.return_value = mock_test_result
 
     async with app.test_api() as ctx:
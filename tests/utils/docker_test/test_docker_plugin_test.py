@@ -1,15 +1,22 @@
 import json
 
+import pytest
 from inline_snapshot import snapshot
 from pytest_mock import MockerFixture
 from respx import MockRouter
 
 
 async def test_docker_plugin_test(mocked_api: MockRouter, mocker: MockerFixture):
-    from src.providers.docker_test import DockerPluginTest, DockerTestResult
+    from src.providers.docker_test import (
+        DockerPluginTest,
+        DockerTestResult,
+        PluginTestStats,
+    )
 
-    mocked_run = mocker.Mock()
-    mocked_run.return_value = json.dumps(
+    mocked_container = mocker.Mock()
+    mocked_container.status = "exited"
+    mocked_container.attrs = {"State": {"ExitCode": 0}}
+    mocked_container.logs.return_value = json.dumps(
         {
             "metadata": None,
             "outputs": ["test"],
@@ -18,12 +25,17 @@ async def test_docker_plugin_test(mocked_api: MockRouter, mocker: MockerFixture)
             "version": "0.0.1",
             "config": "",
             "test_env": "python==3.12",
+            "timings": {"create_poetry_project": 10.0, "run_poetry_project": 1.5},
+            "peak_memory": 104857600,
         }
     ).encode()
+    mocked_run = mocker.Mock(return_value=mocked_container)
     mocked_client = mocker.Mock()
     mocked_client.containers.run = mocked_run
     mocked_docker = mocker.patch("docker.DockerClient")
     mocked_docker.return_value = mocked_client
+    mocked_time = mocker.patch("src.providers.docker_test.time")
+    mocked_time.perf_counter.side_effect = [0.0, 12.5]
 
     test = DockerPluginTest("project_link", "module_name")
     result = await test.run("3.12")
@@ -37,12 +49,23 @@ async def test_docker_plugin_test(mocked_api: MockRouter, mocker: MockerFixture)
             run=True,
             test_env="python==3.12",
             version="0.0.1",
+            timings={"create_poetry_project": 10.0, "run_poetry_project": 1.5},
+            peak_memory=104857600,
+            runtime=12.5,
+        )
+    )
+    assert result.stats == snapshot(
+        PluginTestStats(
+            timings={"create_poetry_project": 10.0, "run_poetry_project": 1.5},
+            runtime=12.5,
+            peak_memory=104857600,
         )
     )
 
     assert not mocked_api["store_plugins"].called
     mocked_run.assert_called_once_with(
         "ghcr.io/nonebot/nonetest:3.12-latest",
+        name=mocker.ANY,
         environment=snapshot(
             {
                 "PLUGIN_INFO": "project_link:module_name",
@@ -50,9 +73,12 @@ async def test_docker_plugin_test(mocked_api: MockRouter, mocker: MockerFixture)
                 "PLUGINS_URL": "https://raw.githubusercontent.com/nonebot/registry/results/plugins.json",
             }
         ),
-        detach=False,
-        remove=True,
+        volumes={},
+        detach=True,
     )
+    mocked_container.reload.assert_called_once_with()
+    mocked_container.logs.assert_called_once_with(stdout=True, stderr=False)
+    mocked_container.remove.assert_called_once_with(force=True)
 
 
 async def test_docker_plugin_test_metadata_some_fields_empty(
@@ -61,8 +87,10 @@ async def test_docker_plugin_test_metadata_some_fields_empty(
     """测试 metadata 的部分字段为空"""
     from src.providers.docker_test import DockerPluginTest, DockerTestResult
 
-    mocked_run = mocker.Mock()
-    mocked_run.return_value = json.dumps(
+    mocked_container = mocker.Mock()
+    mocked_container.status = "exited"
+    mocked_container.attrs = {"State": {"ExitCode": 0}}
+    mocked_container.logs.return_value = json.dumps(
         {
             "metadata": {
                 "name": "name",
@@ -79,10 +107,13 @@ async def test_docker_plugin_test_metadata_some_fields_empty(
             "test_env": "python==3.12",
         }
     ).encode()
+    mocked_run = mocker.Mock(return_value=mocked_container)
     mocked_client = mocker.Mock()
     mocked_client.containers.run = mocked_run
     mocked_docker = mocker.patch("docker.DockerClient")
     mocked_docker.return_value = mocked_client
+    mocked_time = mocker.patch("src.providers.docker_test.time")
+    mocked_time.perf_counter.side_effect = [0.0, 12.5]
 
     test = DockerPluginTest("project_link", "module_name")
     result = await test.run("3.12")
@@ -102,12 +133,14 @@ async def test_docker_plugin_test_metadata_some_fields_empty(
             run=True,
             test_env="python==3.12",
             version="0.0.1",
+            runtime=12.5,
         )
     )
 
     assert not mocked_api["store_plugins"].called
     mocked_run.assert_called_once_with(
         "ghcr.io/nonebot/nonetest:3.12-latest",
+        name=mocker.ANY,
         environment=snapshot(
             {
                 "PLUGIN_INFO": "project_link:module_name",
@@ -115,9 +148,12 @@ async def test_docker_plugin_test_metadata_some_fields_empty(
                 "PLUGINS_URL": "https://raw.githubusercontent.com/nonebot/registry/results/plugins.json",
             }
         ),
-        detach=False,
-        remove=True,
+        volumes={},
+        detach=True,
     )
+    mocked_container.reload.assert_called_once_with()
+    mocked_container.logs.assert_called_once_with(stdout=True, stderr=False)
+    mocked_container.remove.assert_called_once_with(force=True)
 
 
 async def test_docker_plugin_test_metadata_some_fields_invalid(
@@ -126,8 +162,10 @@ async def test_docker_plugin_test_metadata_some_fields_invalid(
     """测试 metadata 的部分字段不符合规范"""
     from src.providers.docker_test import DockerPluginTest, DockerTestResult, Metadata
 
-    mocked_run = mocker.Mock()
-    mocked_run.return_value = json.dumps(
+    mocked_container = mocker.Mock()
+    mocked_container.status = "exited"
+    mocked_container.attrs = {"State": {"ExitCode": 0}}
+    mocked_container.logs.return_value = json.dumps(
         {
             "metadata": {
                 "name": "name",
@@ -144,10 +182,13 @@ async def test_docker_plugin_test_metadata_some_fields_invalid(
             "test_env": "python==3.12",
         }
     ).encode()
+    mocked_run = mocker.Mock(return_value=mocked_container)
     mocked_client = mocker.Mock()
     mocked_client.containers.run = mocked_run
     mocked_docker = mocker.patch("docker.DockerClient")
     mocked_docker.return_value = mocked_client
+    mocked_time = mocker.patch("src.providers.docker_test.time")
+    mocked_time.perf_counter.side_effect = [0.0, 12.5]
 
     test = DockerPluginTest("project_link", "module_name")
     result = await test.run("3.12")
@@ -167,12 +208,14 @@ async def test_docker_plugin_test_metadata_some_fields_invalid(
             run=True,
             test_env="python==3.12",
             version="0.0.1",
+            runtime=12.5,
         )
     )
 
     assert not mocked_api["store_plugins"].called
     mocked_run.assert_called_once_with(
         "ghcr.io/nonebot/nonetest:3.12-latest",
+        name=mocker.ANY,
         environment=snapshot(
             {
                 "PLUGIN_INFO": "project_link:module_name",
@@ -180,6 +223,235 @@ async def test_docker_plugin_test_metadata_some_fields_invalid(
                 "PLUGINS_URL": "https://raw.githubusercontent.com/nonebot/registry/results/plugins.json",
             }
         ),
-        detach=False,
-        remove=True,
+        volumes={},
+        detach=True,
+    )
+    mocked_container.reload.assert_called_once_with()
+    mocked_container.logs.assert_called_once_with(stdout=True, stderr=False)
+    mocked_container.remove.assert_called_once_with(force=True)
+
+
+async def test_docker_plugin_test_cancelled(
+    mocked_api: MockRouter, mocker: MockerFixture
+):
+    """测试被取消时删除容器"""
+    import asyncio
+
+    from src.providers.docker_test import DockerPluginTest
+
+    mocker.patch("src.providers.docker_test.CONTAINER_POLL_INTERVAL", 0.01)
+    started = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    mocked_container = mocker.Mock()
+    mocked_container.status = "running"
+    mocked_container.reload.side_effect = lambda: loop.call_soon_threadsafe(started.set)
+    mocked_client = mocker.Mock()
+    mocked_client.containers.run.return_value = mocked_container
+    mocked_docker = mocker.patch("docker.DockerClient")
+    mocked_docker.return_value = mocked_client
+    mocked_time = mocker.patch("src.providers.docker_test.time")
+    mocked_time.perf_counter.side_effect = [0.0, 12.5]
+
+    test = DockerPluginTest("project_link", "module_name")
+    task = asyncio.create_task(test.run("3.12"))
+    await started.wait()
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    mocked_container.logs.assert_not_called()
+    mocked_container.remove.assert_called_once_with(force=True)
+
+
+async def test_docker_plugin_test_cancelled_during_run(
+    mocked_api: MockRouter, mocker: MockerFixture
+):
+    """创建容器时被取消，等待创建结束后按名称删除容器"""
+    import asyncio
+    import threading
+
+    from src.providers.docker_test import DockerPluginTest
+
+    started = asyncio.Event()
+    release = threading.Event()
+    loop = asyncio.get_running_loop()
+    mocked_container = mocker.Mock()
+
+    def run(*args, **kwargs):
+        loop.call_soon_threadsafe(started.set)
+        release.wait()
+        return mocked_container
+
+    mocked_client = mocker.Mock()
+    mocked_client.containers.run.side_effect = run
+    mocked_client.containers.get.return_value = mocked_container
+    mocker.patch("docker.DockerClient", return_value=mocked_client)
+
+    task = asyncio.create_task(
+        DockerPluginTest("project_link", "module_name").run("3.12")
     )
+    await started.wait()
+    task.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    name = mocked_client.containers.run.call_args.kwargs["name"]
+    assert name.startswith("noneflow-plugin-test-")
+    mocked_client.containers.get.assert_called_once_with(name)
+    mocked_container.remove.assert_called_once_with(force=True)
+    mocked_container.reload.assert_not_called()
+
+
+async def test_docker_plugin_test_exit_code(
+    mocked_api: MockRouter, mocker: MockerFixture
+):
+    """容器运行出错时抛出 ContainerError，附带最后几行错误输出"""
+    from docker.errors import ContainerError
+
+    from src.providers.docker_test import DockerPluginTest
+
+    mocker.patch("src.providers.docker_test.CONTAINER_POLL_INTERVAL", 0)
+    statuses = iter(["running", "exited"])
+
+    def reload():
+        mocked_container.status = next(statuses)
+
+    mocked_container = mocker.Mock()
+    mocked_container.reload.side_effect = reload
+    mocked_container.attrs = {"State": {"ExitCode": 137}}
+    mocked_container.logs.return_value = b"Killed\n"
+    mocked_client = mocker.Mock()
+    mocked_client.containers.run.return_value = mocked_container
+    mocker.patch("docker.DockerClient", return_value=mocked_client)
+
+    with pytest.raises(
+        ContainerError, match="returned non-zero exit status 137"
+    ) as exc_info:
+        await DockerPluginTest("project_link", "module_name").run("3.12")
+
+    assert exc_info.value.stderr == "Killed\n"
+    assert mocked_container.reload.call_count == 2
+    mocked_container.logs.assert_called_once_with(stdout=False, stderr=True, tail=20)
+    mocked_container.remove.assert_called_once_with(force=True)
+
+
+async def test_docker_client_shared(mocker: MockerFixture):
+    """同一进程内共用 Docker 客户端"""
+    from src.providers.docker_test import get_docker_client
+
+    mocked_docker = mocker.patch("docker.DockerClient")
+
+    assert get_docker_client() is get_docker_client()
+    mocked_docker.assert_called_once_with(base_url="unix://var/run/docker.sock")
+
+
+async def test_docker_plugin_test_matrix(mocker: MockerFixture):
+    """同时测试多个 Python 版本，以默认版本的结果为准并合并测试环境"""
+    import asyncio
+
+    from src.providers.docker_test import DockerPluginTest, DockerTestResult
+
+    running: set[str] = set()
+    concurrent: list[int] = []
+
+    async def run(version: str):
+        running.add(version)
+        await asyncio.sleep(0)
+        concurrent.append(len(running))
+        running.discard(version)
+        if version == "3.9":
+            raise RuntimeError("镜像不存在")
+        return DockerTestResult(
+            run=True,
+            load=version != "3.13",
+            version="0.0.1",
+            metadata=None,
+            outputs=[version],
+            test_env=f"python=={version}.0 nonebot2==2.4.0",
+        )
+
+    mocker.patch.object(DockerPluginTest, "run", side_effect=run)
+
+    test = DockerPluginTest("project_link", "module_name")
+    result = await test.run_matrix(["3.13", "3.9"], default="3.12")
+
+    # 所有版本同时测试
+    assert max(concurrent) == 3
+    assert result.outputs == ["3.12"]
+    assert result.load is True
+    assert result.test_envs == snapshot(
+        {
+            "python==3.12.0 nonebot2==2.4.0": True,
+            "python==3.13.0 nonebot2==2.4.0": False,
+            "python==3.9": False,
+        }
+    )
+
+    result = await test.run_matrix(["3.12", "3.13"], default="3.12", policy="all")
+    assert result.load is False
+    result = await test.run_matrix(["3.13"], default="3.13", policy="any")
+    assert result.load is False
+
+    with pytest.raises(RuntimeError, match="镜像不存在"):
+        await test.run_matrix(["3.12"], default="3.9")
+    with pytest.raises(ValueError, match="未知的加载判定方式：unknown"):
+        await test.run_matrix(["3.12"], default="3.12", policy="unknown")
+
+
+async def test_merge_results_unknown_test_env():
+    """容器没有输出测试环境时，用 Python 版本区分，不记录 unknown"""
+    from src.providers.docker_test import DockerTestResult, merge_results
+
+    results = {
+        version: DockerTestResult(run=True, load=True, metadata=None, outputs=[])
+        for version in ["3.12", "3.13"]
+    }
+    result = merge_results(results, "3.12", "default")
+    assert result.test_envs == snapshot({"python==3.12": True, "python==3.13": True})
+
+
+async def test_docker_plugin_test_pypi_proxy(mocker: MockerFixture):
+    """设置 PyPI 代理时，告诉容器中的测试使用代理"""
+    from src.providers.docker_test import DockerPluginTest
+
+    mocker.patch("src.providers.docker_test.PYPI_PROXY_URL", "http://172.17.0.1:3141/")
+    mocked_container = mocker.Mock()
+    mocked_container.status = "exited"
+    mocked_container.attrs = {"State": {"ExitCode": 0}}
+    mocked_container.logs.return_value = json.dumps(
+        {"metadata": None, "outputs": [], "load": True, "run": True}
+    ).encode()
+    mocked_client = mocker.Mock()
+    mocked_client.containers.run.return_value = mocked_container
+    mocker.patch("docker.DockerClient", return_value=mocked_client)
+
+    await DockerPluginTest("project_link", "module_name").run("3.12")
+
+    environment = mocked_client.containers.run.call_args.kwargs["environment"]
+    assert environment["PYPI_INDEX_URL"] == snapshot("http://172.17.0.1:3141/simple/")
+
+
+async def test_docker_plugin_test_backend(mocker: MockerFixture):
+    """设置依赖管理工具时，告诉容器中的测试使用对应的工具"""
+    from src.providers.docker_test import DockerPluginTest
+
+    mocker.patch("src.providers.docker_test.PLUGIN_TEST_BACKEND", "uv")
+    mocked_container = mocker.Mock()
+    mocked_container.status = "exited"
+    mocked_container.attrs = {"State": {"ExitCode": 0}}
+    mocked_container.logs.return_value = json.dumps(
+        {"metadata": None, "outputs": [], "load": True, "run": True}
+    ).encode()
+    mocked_client = mocker.Mock()
+    mocked_client.containers.run.return_value = mocked_container
+    mocker.patch("docker.DockerClient", return_value=mocked_client)
+
+    await DockerPluginTest("project_link", "module_name").run("3.12")
+
+    environment = mocked_client.containers.run.call_args.kwargs["environment"]
+    assert environment["PLUGIN_TEST_BACKEND"] == "uv"
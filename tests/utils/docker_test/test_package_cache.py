@@ -0,0 +1,138 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from inline_snapshot import snapshot
+from pytest_mock import MockerFixture
+
+
+async def test_docker_plugin_test_package_cache(mocker: MockerFixture, tmp_path: Path):
+    """设置缓存目录时挂载到容器中，并告诉容器中的测试缓存目录的位置"""
+    from src.providers.docker_test import DockerPluginTest
+    from src.providers.docker_test.package_cache import package_cache
+
+    mocker.patch.object(package_cache, "root", tmp_path / "cache")
+    mocked_container = mocker.Mock()
+    mocked_container.status = "exited"
+    mocked_container.attrs = {"State": {"ExitCode": 0}}
+    mocked_container.logs.return_value = json.dumps(
+        {"metadata": None, "outputs": [], "load": True, "run": True}
+    ).encode()
+    mocked_client = mocker.Mock()
+    mocked_client.containers.run.return_value = mocked_container
+    mocker.patch("docker.DockerClient", return_value=mocked_client)
+
+    await DockerPluginTest("project_link", "module_name").run("3.12")
+
+    kwargs = mocked_client.containers.run.call_args.kwargs
+    assert kwargs["environment"]["PACKAGE_CACHE_DIR"] == snapshot(
+        "/root/.cache/noneflow"
+    )
+    assert kwargs["volumes"] == {
+        str(tmp_path / "cache"): {"bind": "/root/.cache/noneflow", "mode": "rw"}
+    }
+    # 提前创建好各个工具的子目录
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == snapshot(
+        ["envs", "pip", "poetry", "uv"]
+    )
+
+
+def make_file(root: Path, name: str, size: int, hours: float, atime: float = 0):
+    """创建指定大小与修改时间的文件"""
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"0" * size)
+    now = time.time()
+    used = now - hours * 60 * 60
+    os.utime(path, (now - atime * 60 * 60 if atime else used, used))
+    return path
+
+
+def test_package_cache_evict(tmp_path: Path):
+    """超过大小上限时按照最近修改的时间整个删除条目，最近使用过的条目不会被删除"""
+    from src.providers.docker_test.package_cache import PackageCache
+
+    root = tmp_path / "cache"
+
+    # 同一个目录中的文件为一个条目，访问时间不可靠不作为依据
+    make_file(root, "pip/http-v2/a/1", 50, 48, atime=0.1)
+    make_file(root, "pip/http-v2/a/1.body", 50, 47)
+    make_file(root, "pip/http-v2/b/2", 100, 24)
+    make_file(root, "poetry/artifacts/c/c.whl", 100, 12)
+    make_file(root, "poetry/artifacts/d/d.whl", 100, 0)
+
+    cache = PackageCache(root, max_size=250)
+    assert cache.evict() == (2, 200)
+    assert sorted(
+        str(path.relative_to(root)) for path in root.rglob("*") if path.is_file()
+    ) == snapshot(["poetry/artifacts/c/c.whl", "poetry/artifacts/d/d.whl"])
+
+    # 最近使用过的文件可能正在被容器使用
+    cache.max_size = 0
+    assert cache.evict() == (1, 100)
+    assert (root / "poetry/artifacts/d/d.whl").exists()
+
+    assert PackageCache(None).evict() == (0, 0)
+
+
+def test_package_cache_evict_envs(tmp_path: Path):
+    """删除测试环境时同时删除只被它使用的文件，其他测试环境使用的文件不会被删除"""
+    from src.providers.docker_test.package_cache import PackageCache
+
+    root = tmp_path / "cache"
+    store = root / "envs"
+
+    def make_env(key: str, digests: list[str], hours: float):
+        for digest in digests:
+            make_file(store, f"objects/{digest[:2]}/{digest}", 100, 48)
+        path = make_file(store, f"envs/{key}.json", 0, 0)
+        path.write_text(
+            json.dumps(
+                {
+                    "files": [
+                        [f"{i}.py", digest, 420] for i, digest in enumerate(digests)
+                    ]
+                }
+            ),
+            encoding="utf-8",
+        )
+        used = time.time() - hours * 60 * 60
+        os.utime(path, (used, used))
+
+    make_env("old", ["aa01", "bb02"], 48)
+    make_env("new", ["aa01", "cc03"], 24)
+    make_env("recent", ["dd04"], 0)
+
+    # 测试环境的记录文件也占用少量空间
+    cache = PackageCache(root, max_size=450)
+    assert cache.evict()[0] == 1
+    assert not (store / "envs/old.json").exists()
+    assert not (store / "objects/bb/bb02").exists()
+    # 共用的文件仍然被其他测试环境使用
+    assert (store / "objects/aa/aa01").exists()
+
+    cache.max_size = 0
+    assert cache.evict()[0] == 1
+    assert not (store / "objects/aa/aa01").exists()
+    # 正在使用的测试环境不会被删除
+    assert sorted(
+        str(path.relative_to(store)) for path in store.rglob("*") if path.is_file()
+    ) == snapshot(["envs/recent.json", "objects/dd/dd04"])
+
+
+def test_package_cache_evict_uv(tmp_path: Path):
+    """uv 解压后的软件包整个删除，不会只删除其中的部分文件"""
+    from src.providers.docker_test.package_cache import PackageCache
+
+    root = tmp_path / "cache"
+    make_file(root, "uv/CACHEDIR.TAG", 0, 48)
+    make_file(root, "uv/archive-v0/old/nonebot/__init__.py", 100, 48)
+    make_file(root, "uv/archive-v0/old/nonebot/plugin/__init__.py", 100, 30)
+    make_file(root, "uv/archive-v0/new/pydantic/__init__.py", 100, 24)
+
+    cache = PackageCache(root, max_size=150)
+    assert cache.evict() == (1, 200)
+    assert not (root / "uv/archive-v0/old").exists()
+    assert (root / "uv/archive-v0/new/pydantic/__init__.py").exists()
+    assert (root / "uv/CACHEDIR.TAG").exists()
@@ -1,6 +1,10 @@
+import itertools
 import json
+import stat
+import sys
 from pathlib import Path
 
+import pytest
 from inline_snapshot import snapshot
 from pytest_mock import MockerFixture
 
@@ -111,6 +115,12 @@ pydantic==2.10.0 ; python_version >= "3.9" and python_version < "4.0"
         "src.providers.docker_test.plugin_test.get_plugin_list"
     )
     mocked_get_plugin_list.return_value = {}
+    mocked_time = mocker.patch("src.providers.docker_test.plugin_test.time")
+    mocked_time.perf_counter.side_effect = itertools.count()
+    mocker.patch(
+        "src.providers.docker_test.plugin_test.get_peak_memory",
+        return_value=104857600,
+    )
 
     result = await test.run()
     assert result == snapshot(
@@ -178,8 +188,345 @@ pydantic==2.10.0 ; python_version >= "3.9" and python_version < "4.0"
             "version": "0.5.0",
             "config": "test=123",
             "test_env": "python==3.12.7 nonebot2==2.4.0 pydantic==2.10.0",
+            "deps": {},
+            "timings": {
+                "create_poetry_project": 1.0,
+                "show_package_info": 1.0,
+                "show_plugin_dependencies": 1.0,
+                "run_poetry_project": 1.0,
+            },
+            "peak_memory": 104857600,
         }
     )
 
     mocked_get_plugin_list.assert_called_once()
     mocked_command.assert_called()
+
+
+async def test_get_peak_memory(mocker: MockerFixture):
+    """优先读取 cgroup 中的内存占用峰值"""
+    from src.providers.docker_test.plugin_test import get_peak_memory
+
+    mocked_open = mocker.patch(
+        "src.providers.docker_test.plugin_test.open",
+        mocker.mock_open(read_data="104857600\n"),
+        create=True,
+    )
+    assert get_peak_memory() == 104857600
+    mocked_open.assert_called_once_with("/sys/fs/cgroup/memory.peak", encoding="utf-8")
+
+    # 不在容器中运行时，使用子进程的最大常驻内存
+    mocked_open.side_effect = OSError
+    mocked_getrusage = mocker.patch(
+        "src.providers.docker_test.plugin_test.resource.getrusage"
+    )
+    mocked_getrusage.return_value.ru_maxrss = 1024
+    assert get_peak_memory() == 1048576
+
+
+async def test_package_cache_env(mocker: MockerFixture):
+    """设置共用的软件包缓存时，pip 与 Poetry 使用各自的子目录"""
+    from src.providers.docker_test.plugin_test import PluginTest
+
+    test = PluginTest("project_link:module_name")
+    assert "POETRY_CACHE_DIR" not in test.env
+
+    mocker.patch(
+        "src.providers.docker_test.plugin_test.PACKAGE_CACHE_DIR",
+        "/root/.cache/noneflow",
+    )
+    assert test.env["PIP_CACHE_DIR"] == "/root/.cache/noneflow/pip"
+    assert test.env["POETRY_CACHE_DIR"] == "/root/.cache/noneflow/poetry"
+
+
+async def test_pypi_index_env(mocker: MockerFixture, tmp_path: Path):
+    """设置 PyPI 代理时，pip 与 Poetry 都使用代理安装软件包"""
+    from src.providers.docker_test.plugin_test import PluginTest
+
+    mocker.patch(
+        "src.providers.docker_test.plugin_test.PYPI_INDEX_URL",
+        "http://172.17.0.1:3141/simple/",
+    )
+    test = PluginTest("project_link:module_name")
+    mocker.patch.object(test, "_test_dir", tmp_path)
+    mocked_command = mocker.patch.object(test, "command", return_value=(True, "", ""))
+
+    assert test.env["PIP_INDEX_URL"] == "http://172.17.0.1:3141/simple/"
+    assert test.env["PIP_TRUSTED_HOST"] == "172.17.0.1"
+
+    await test.create_poetry_project()
+    mocked_command.assert_called_once_with(
+        r"""poetry init -n && sed -i "s/\^/~/g" pyproject.toml && poetry source add --priority=primary pypi-proxy http://172.17.0.1:3141/simple/ && poetry env info --ansi && poetry add project_link"""
+    )
+
+
+async def test_base_env(mocker: MockerFixture, tmp_path: Path):
+    """存在基础环境时复制后再安装插件，并在测试环境中记录基础环境的指纹"""
+    from src.providers.docker_test.plugin_test import PluginTest
+
+    base_env = tmp_path / "base"
+    (base_env / ".venv").mkdir(parents=True)
+    (base_env / "poetry.lock").write_text("lock", encoding="utf-8")
+
+    test = PluginTest("project_link:module_name")
+    mocker.patch.object(test, "_test_dir", tmp_path / "plugin_test")
+    (tmp_path / "plugin_test").mkdir()
+    mocked_command = mocker.patch.object(test, "command", return_value=(True, "", ""))
+    assert test.base_env is None
+    assert test._get_test_env({"nonebot2": "2.4.0"}) == [
+        f"python=={sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
+        "nonebot2==2.4.0",
+    ]
+
+    mocker.patch("src.providers.docker_test.plugin_test.BASE_ENV_DIR", str(base_env))
+    assert test.base_fingerprint == snapshot("0c030586945f")
+    assert test._get_test_env({"nonebot2": "2.4.0"})[1:] == snapshot(
+        ["nonebot2==2.4.0", "base==0c030586945f"]
+    )
+
+    await test.create_poetry_project()
+    mocked_command.assert_called_once_with(
+        f"""poetry init -n && sed -i "s/\\^/~/g" pyproject.toml && cp -a --reflink=auto {base_env}/.venv .venv && poetry env info --ansi && poetry add project_link && poetry install --sync --no-root"""
+    )
+
+
+def make_project(path: Path, content: str = "shared"):
+    """创建包含虚拟环境的测试项目"""
+    site_packages = path / ".venv" / "lib" / "site-packages"
+    site_packages.mkdir(parents=True)
+    (site_packages / "nonebot.py").write_text("shared", encoding="utf-8")
+    (site_packages / "plugin.py").write_text(content, encoding="utf-8")
+    (path / ".venv" / "lib64").symlink_to("lib")
+
+
+async def test_env_store(tmp_path: Path):
+    """相同内容的文件只保存一份，还原时通过硬链接使用仓库中的文件"""
+    from src.providers.docker_test.plugin_test import EnvStore
+
+    store = EnvStore(tmp_path / "store")
+    make_project(tmp_path / "a", "a")
+    make_project(tmp_path / "b", "b")
+
+    key = store.save(tmp_path / "a", "a==1.0.0")
+    assert key == store.env_key("a==1.0.0")
+    store.save(tmp_path / "b", "b==1.0.0")
+    # nonebot.py 只保存了一份，并且两个项目共用
+    assert len(list((tmp_path / "store" / "objects").rglob("*"))) == 6
+    assert (tmp_path / "a/.venv/lib/site-packages/nonebot.py").samefile(
+        tmp_path / "b/.venv/lib/site-packages/nonebot.py"
+    )
+
+    assert store.exists(key)
+    assert not store.exists(store.env_key("a==1.0.1"))
+
+    workspace = store.workspace()
+    assert workspace.parent == tmp_path / "store" / "tmp"
+    store.restore(key, workspace)
+    assert (workspace / ".venv/lib/site-packages/plugin.py").samefile(
+        tmp_path / "a/.venv/lib/site-packages/plugin.py"
+    )
+    assert (workspace / ".venv/lib64").readlink() == Path("lib")
+
+
+async def test_env_store_read_only(tmp_path: Path):
+    """仓库中的文件只读，可执行文件分开保存，被修改的文件在还原时会被发现"""
+    from src.providers.docker_test.plugin_test import EnvStore
+
+    store = EnvStore(tmp_path / "store")
+    make_project(tmp_path / "a")
+    script = tmp_path / "a/.venv/bin/nonebot"
+    script.parent.mkdir()
+    script.write_text("shared", encoding="utf-8")
+    script.chmod(0o755)
+
+    key = store.save(tmp_path / "a", "a==1.0.0")
+    shared = tmp_path / "a/.venv/lib/site-packages/nonebot.py"
+    assert stat.S_IMODE(shared.stat().st_mode) == 0o444
+    assert stat.S_IMODE(script.stat().st_mode) == 0o555
+    # 内容相同但权限不同的文件不共用
+    assert not script.samefile(shared)
+    # 没有留下临时文件
+    assert not list((tmp_path / "store").rglob("*.tmp"))
+
+    # 以 root 身份运行时仍然可以原地修改
+    shared.chmod(0o644)
+    shared.write_text("modified", encoding="utf-8")
+
+    workspace = store.workspace()
+    with pytest.raises(OSError, match="已被修改"):
+        store.restore(key, workspace)
+    assert not store.exists(key)
+
+
+async def test_reuse_env(mocker: MockerFixture, tmp_path: Path):
+    """解析出的依赖与保存的测试环境完全相同时直接还原，依赖有新版本时重新安装"""
+    from src.providers.docker_test.plugin_test import EnvStore, PluginTest
+
+    mocker.patch(
+        "src.providers.docker_test.plugin_test.ENV_STORE_DIR", str(tmp_path / "store")
+    )
+    make_project(tmp_path / "old")
+    key = EnvStore(tmp_path / "store").save(
+        tmp_path / "old", "nonebot2==2.4.0\nproject_link==1.0.0\n"
+    )
+
+    requirements = "nonebot2==2.4.0\nproject_link==1.0.0\n"
+
+    def command_output(cmd: str, timeout: int = 300):
+        if cmd == "poetry export --without-hashes":
+            return True, requirements, ""
+        return True, "", ""
+
+    test = PluginTest("project_link:module_name")
+    mocker.patch.object(test, "_test_dir", tmp_path / "plugin_test")
+    (tmp_path / "plugin_test").mkdir()
+    mocked_command = mocker.patch.object(test, "command", side_effect=command_output)
+
+    await test.create_poetry_project()
+
+    assert [call.args[0] for call in mocked_command.call_args_list] == snapshot(
+        [
+            r"""poetry init -n && sed -i "s/\^/~/g" pyproject.toml && poetry add --lock project_link""",
+            "poetry export --without-hashes",
+        ]
+    )
+    assert test._create
+    assert test._env_key == key
+    assert (test.path / ".venv/lib/site-packages/nonebot.py").exists()
+    assert test._lines_output == [
+        f"项目 project_link 使用已有的测试环境 {key} 创建成功。"
+    ]
+
+    # 还原的测试环境不需要重新保存
+    mocked_save = mocker.patch.object(EnvStore, "save")
+    test._requirements = requirements
+    test.save_env()
+    mocked_save.assert_not_called()
+
+    # nonebot2 发布了新版本，解析出的依赖不同，需要重新安装
+    requirements = "nonebot2==2.5.0\nproject_link==1.0.0\n"
+    test = PluginTest("project_link:module_name")
+    mocker.patch.object(test, "_test_dir", tmp_path / "plugin_test_new")
+    (tmp_path / "plugin_test_new").mkdir()
+    mocked_command = mocker.patch.object(test, "command", side_effect=command_output)
+
+    await test.create_poetry_project()
+
+    assert mocked_command.call_args_list[-1].args[0] == snapshot(
+        "poetry env info --ansi && poetry install --no-root"
+    )
+    assert test._create
+    assert test._env_key is None
+
+
+async def test_env_store_workspace(mocker: MockerFixture, tmp_path: Path):
+    """使用测试环境仓库时在仓库中创建测试目录，测试结束后删除"""
+    from src.providers.docker_test.plugin_test import PluginTest
+
+    mocker.patch(
+        "src.providers.docker_test.plugin_test.ENV_STORE_DIR", str(tmp_path / "store")
+    )
+    test = PluginTest("project_link:module_name")
+    mocker.patch.object(test, "command", return_value=(False, "", ""))
+
+    await test.run()
+
+    assert test._test_dir.parent == tmp_path / "store" / "tmp"
+    assert not test._test_dir.exists()
+
+
+async def test_uv_backend(mocker: MockerFixture, tmp_path: Path):
+    """使用 uv 创建测试项目时，测试结果与 Poetry 相同"""
+    from src.providers.docker_test.plugin_test import PluginTest
+
+    mocker.patch("src.providers.docker_test.plugin_test.PLUGIN_TEST_BACKEND", "uv")
+    mocker.patch(
+        "src.providers.docker_test.plugin_test.PYPI_INDEX_URL",
+        "http://172.17.0.1:3141/simple/",
+    )
+    python = f"{sys.version_info.major}.{sys.version_info.minor}"
+
+    def command_output(cmd: str, timeout: int = 300):
+        if (
+            cmd
+            == f"""(uv init --app --no-readme --no-pin-python --no-workspace --vcs none && sed -i 's/^requires-python = .*/requires-python = "=={python}.*"/' pyproject.toml && uv add project_link) 2>&1"""
+        ):
+            return True, "Resolved 16 packages in 1.00s\nInstalled 16 packages", ""
+        if cmd == "uv pip show --python .venv/bin/python project_link":
+            return (
+                True,
+                "Name: nonebot-plugin-treehelp\nVersion: 0.5.0\nRequires: nonebot2",
+                "",
+            )
+        if cmd == "uv export --frozen --no-hashes --no-header --no-emit-project":
+            return (
+                True,
+                """annotated-types==0.7.0
+nonebot-plugin-alconna==0.54.0
+nonebot2==2.4.0
+pydantic==2.10.0
+pydantic-core==2.27.0
+""",
+                "",
+            )
+        if cmd == "uv run --no-sync python runner.py":
+            return True, "", ""
+        raise ValueError(f"Unknown command: {cmd}")
+
+    test = PluginTest("project_link:module_name")
+    mocker.patch.object(test, "_test_dir", tmp_path / "plugin_test")
+    mocker.patch.object(test, "command", side_effect=command_output)
+    mocker.patch(
+        "src.providers.docker_test.plugin_test.get_plugin_list",
+        return_value={"nonebot-plugin-alconna": "nonebot_plugin_alconna"},
+    )
+    assert test.env["UV_DEFAULT_INDEX"] == "http://172.17.0.1:3141/simple/"
+    assert "POETRY_VIRTUALENVS_IN_PROJECT" not in test.env
+
+    result = await test.run()
+
+    assert result["load"] is True
+    assert result["version"] == "0.5.0"
+    assert result["deps"] == {"nonebot_plugin_alconna": "0.54.0"}
+    assert result["test_env"] == snapshot(
+        f"python=={sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro} nonebot2==2.4.0 pydantic==2.10.0"
+    )
+    assert result["outputs"][:3] == snapshot(
+        [
+            "项目 project_link 创建成功。",
+            "    Resolved 16 packages in 1.00s",
+            "    Installed 16 packages",
+        ]
+    )
+
+
+async def test_uv_backend_create_failed(mocker: MockerFixture, tmp_path: Path):
+    """uv 创建失败时从版本解析失败的输出中获取插件版本"""
+    from src.providers.docker_test.plugin_test import Backend, PluginTest, get_backend
+
+    mocker.patch("src.providers.docker_test.plugin_test.PLUGIN_TEST_BACKEND", "uv")
+    test = PluginTest("project_link:module_name")
+    mocker.patch.object(test, "_test_dir", tmp_path)
+    mocker.patch.object(
+        test,
+        "command",
+        return_value=(
+            False,
+            "× No solution found when resolving dependencies:\n╰─▶ Because project-link==0.5.0 depends on nonebot2>=2.5.0 ...",
+            "",
+        ),
+    )
+
+    await test.create_poetry_project()
+
+    assert not test._create
+    assert test._version == "0.5.0"
+    # 无法从输出中获取时不使用 PyPI 上的最新版本代替
+    assert (
+        test.backend.extract_version("error: Failed to fetch", "project_link") is None
+    )
+
+    with pytest.raises(ValueError, match="不支持的依赖管理工具 pdm"):
+        get_backend("pdm")
+    with pytest.raises(TypeError):
+        Backend()  # type: ignore[abstract]
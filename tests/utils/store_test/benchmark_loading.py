@@ -0,0 +1,86 @@
+"""比较加载商店测试结果的速度
+
+python -m tests.utils.store_test.benchmark_loading [插件数量]
+"""
+# ruff: noqa: T201
+
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import pyjson5
+
+from src.providers.models import (
+    RegistryPlugin,
+    RegistryPluginList,
+    StoreTestResult,
+    StoreTestResultDict,
+)
+from src.providers.utils import dump_json, load_json_from_file
+
+STORE_DIR = Path(__file__).parent / "store"
+
+
+def generate(path: Path, count: int) -> None:
+    """根据测试数据生成指定数量的插件与测试结果"""
+    plugin = load_json_from_file(STORE_DIR / "registry_plugins.json")[1]
+    result = load_json_from_file(STORE_DIR / "registry_results.json")[
+        "nonebot-plugin-treehelp:nonebot_plugin_treehelp"
+    ]
+
+    plugins = []
+    results = {}
+    for i in range(count):
+        module_name = f"nonebot_plugin_{i}"
+        project_link = f"nonebot-plugin-{i}"
+        plugins.append(
+            {**plugin, "module_name": module_name, "project_link": project_link}
+        )
+        results[f"{project_link}:{module_name}"] = result
+
+    dump_json(path / "plugins.json", plugins)
+    dump_json(path / "results.json", results)
+
+
+def load_with_pyjson5(path: Path):
+    with open(path / "plugins.json", encoding="utf-8") as f:
+        plugins = [RegistryPlugin(**plugin) for plugin in pyjson5.decode_io(f)]  # type: ignore
+    with open(path / "results.json", encoding="utf-8") as f:
+        results = {
+            key: StoreTestResult(**value)
+            for key, value in pyjson5.decode_io(f).items()  # type: ignore
+        }
+    return plugins, results
+
+
+def load_with_type_adapter(path: Path):
+    plugins = load_json_from_file(path / "plugins.json", RegistryPluginList)
+    results = load_json_from_file(path / "results.json", StoreTestResultDict)
+    return plugins, results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2500
+    number = 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        generate(path, count)
+        assert load_with_pyjson5(path) == load_with_type_adapter(path)
+
+        before = min(
+            timeit.repeat(lambda: load_with_pyjson5(path), number=number, repeat=3)
+        )
+        after = min(
+            timeit.repeat(lambda: load_with_type_adapter(path), number=number, repeat=3)
+        )
+
+    print(f"插件数量：{count}")
+    print(f"pyjson5 + 逐个构造模型：{before / number * 1000:.1f} ms")
+    print(f"pydantic-core + TypeAdapter：{after / number * 1000:.1f} ms")
+    print(f"加速比：{before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,14 @@ from respx import MockRouter
 
 from src.providers.constants import (
     REGISTRY_ADAPTERS_URL,
+    REGISTRY_AUTHORS_URL,
     REGISTRY_BOTS_URL,
+    REGISTRY_CHECKPOINT_URL,
     REGISTRY_DRIVERS_URL,
     REGISTRY_PLUGIN_CONFIG_URL,
     REGISTRY_PLUGINS_URL,
     REGISTRY_RESULTS_URL,
+    REGISTRY_SCHEDULER_URL,
     STORE_ADAPTERS_URL,
     STORE_BOTS_URL,
     STORE_DRIVERS_URL,
@@ -45,6 +48,10 @@ def mocked_store_data(
         "plugins": plugin_test_path / "plugins.json",
         "results": plugin_test_path / "results.json",
         "plugin_configs": plugin_test_path / "plugin_configs.json",
+        "checkpoint": plugin_test_path / "checkpoint.jsonl",
+        "retest_checkpoint": plugin_test_path / "retest_checkpoint.jsonl",
+        "scheduler": plugin_test_path / "scheduler.json",
+        "authors": plugin_test_path / "authors.json",
     }
 
     mocker.patch("src.providers.store_test.store.RESULTS_PATH", paths["results"])
@@ -55,6 +62,13 @@ def mocked_store_data(
     mocker.patch(
         "src.providers.store_test.store.PLUGIN_CONFIG_PATH", paths["plugin_configs"]
     )
+    mocker.patch("src.providers.store_test.store.CHECKPOINT_PATH", paths["checkpoint"])
+    mocker.patch(
+        "src.providers.store_test.store.RETEST_CHECKPOINT_PATH",
+        paths["retest_checkpoint"],
+    )
+    mocker.patch("src.providers.store_test.store.SCHEDULER_PATH", paths["scheduler"])
+    mocker.patch("src.providers.store_test.store.AUTHORS_PATH", paths["authors"])
 
     mocked_api.get(STORE_ADAPTERS_URL).respond(json=load_json("store_adapters"))
     mocked_api.get(STORE_BOTS_URL).respond(json=load_json("store_bots"))
@@ -66,5 +80,8 @@ def mocked_store_data(
     mocked_api.get(REGISTRY_PLUGINS_URL).respond(json=load_json("registry_plugins"))
     mocked_api.get(REGISTRY_RESULTS_URL).respond(json=load_json("registry_results"))
     mocked_api.get(REGISTRY_PLUGIN_CONFIG_URL).respond(json=load_json("plugin_configs"))
+    mocked_api.get(REGISTRY_SCHEDULER_URL, name="registry_scheduler").respond(404)
+    mocked_api.get(REGISTRY_AUTHORS_URL, name="registry_authors").respond(404)
+    mocked_api.get(REGISTRY_CHECKPOINT_URL, name="registry_checkpoint").respond(404)
 
     return paths
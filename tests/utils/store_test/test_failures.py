@@ -0,0 +1,273 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from inline_snapshot import snapshot
+from pytest_mock import MockerFixture
+from respx import MockRouter
+
+NOW = datetime(2023, 9, 1, tzinfo=ZoneInfo("Asia/Shanghai"))
+TREEHELP = "nonebot-plugin-treehelp:nonebot_plugin_treehelp"
+
+
+def make_test_result(load: bool, output: str):
+    from src.providers.models import RegistryPlugin, StoreTestResult
+
+    return (
+        StoreTestResult(
+            time="2023-09-01T00:00:00.000000+08:00",
+            version="0.3.0",
+            results={"load": load, "metadata": load, "validation": True},
+            outputs={"load": output, "metadata": None, "validation": None},
+        ),
+        RegistryPlugin(
+            name="帮助",
+            module_name="nonebot_plugin_treehelp",
+            author="he0119",
+            version="0.3.0",
+            desc="获取插件帮助信息",
+            homepage="https://nonebot.dev/",
+            project_link="nonebot-plugin-treehelp",
+            tags=[],
+            supported_adapters=None,
+            type="application",
+            time="2023-09-01T00:00:00.000000+08:00",
+            is_official=False,
+            valid=True,
+            skip_test=False,
+        ),
+    )
+
+
+async def test_classify_failure():
+    """根据测试输出区分确定性失败与临时性失败"""
+    from src.providers.store_test.failures import classify_failure
+
+    def classify(load: bool, output: str):
+        return classify_failure(make_test_result(load, output)[0])
+
+    assert classify(True, "No module named 'abc'") is None
+    assert classify(False, "插件加载出错：Exception") is None
+    assert classify(
+        False,
+        "Because nonebot-plugin-a depends on nonebot2 (^2.0.0) which doesn't match any versions, version solving failed.",
+    ) == snapshot("deterministic")
+    assert classify(
+        False, "ModuleNotFoundError: No module named 'nonebot_plugin_a'"
+    ) == snapshot("deterministic")
+    assert classify(False, "执行命令超时") == snapshot("transient")
+    # 网络错误导致的依赖解析失败也属于临时性失败
+    assert classify(
+        False,
+        "HTTPSConnectionPool(host='pypi.org', port=443): Read timed out.\nversion solving failed.",
+    ) == snapshot("transient")
+    # 插件运行日志中的网络错误不算临时性失败
+    assert classify(
+        False,
+        "项目 nonebot-plugin-a 创建成功。\n"
+        "插件 nonebot_plugin_a 加载出错：\n"
+        "    Connection refused\n"
+        "    ModuleNotFoundError: No module named 'abc'",
+    ) == snapshot("deterministic")
+    assert (
+        classify(
+            False,
+            "插件 nonebot_plugin_a 加载出错：\n    httpx.ConnectTimeout: timed out",
+        )
+        is None
+    )
+
+
+async def test_scheduler_backoff():
+    """连续失败时退避时间翻倍，插件或 nonebot2 有新版本时立即重试"""
+    from src.providers.store_test.scheduler import Scheduler
+
+    scheduler = Scheduler(now=NOW)
+
+    record = scheduler.record_failure("a", "1.0.0", "2.4.0")
+    assert record.retry_at == NOW + timedelta(days=1)
+    assert scheduler.record_failure("a", "1.0.0", "2.4.0").retry_at == NOW + timedelta(
+        days=2
+    )
+    for _ in range(10):
+        record = scheduler.record_failure("a", "1.0.0", "2.4.0")
+    # 不超过最大退避天数
+    assert record.attempts == 12
+    assert record.retry_at == NOW + timedelta(days=30)
+
+    assert scheduler.backoff("a", "1.0.0", "2.4.0") == record
+    # 获取不到最新版本时不作为重试的依据
+    assert scheduler.backoff("a", None, None) == record
+    assert scheduler.backoff("a", "1.0.1", "2.4.0") is None
+    assert scheduler.backoff("a", "1.0.0", "2.5.0") is None
+    assert scheduler.backoff("b", "1.0.0", "2.4.0") is None
+
+    scheduler.now = NOW + timedelta(days=30)
+    assert scheduler.backoff("a", "1.0.0", "2.4.0") is None
+
+    scheduler.clear_failure("a")
+    assert scheduler.state.failures == {}
+
+
+async def test_store_test_deterministic_failure(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """确定性失败的插件记录退避时间，退避期间跳过测试"""
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.return_value = make_test_result(
+        False, "version solving failed."
+    )
+
+    test = await StoreTest.create()
+    await test.run(1, 0, False)
+
+    assert mocked_validate_plugin.call_count == 1
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    failure = state.failures[TREEHELP]
+    assert failure.attempts == 1
+    # 失败时 PyPI 上的最新版本
+    assert failure.version == snapshot("0.3.1")
+    assert failure.nonebot_version is None
+
+    # 测试结果的版本与 PyPI 不一致，但仍在退避中
+    assert await test.should_skip(TREEHELP)
+    assert not await test.should_skip(TREEHELP, force=True)
+
+
+async def test_store_test_transient_failure(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """临时性失败的插件在本次运行中立即重试一次"""
+    from src.providers.models import StoreTestResultDict
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.side_effect = [
+        make_test_result(False, "执行命令超时"),
+        make_test_result(True, "treehelp"),
+    ]
+
+    test = await StoreTest.create()
+    await test.run(1, 0, False)
+
+    assert [
+        call.kwargs["store_plugin"].module_name
+        for call in mocked_validate_plugin.call_args_list
+    ] == ["nonebot_plugin_treehelp", "nonebot_plugin_treehelp"]
+    results = StoreTestResultDict.validate_json(
+        mocked_store_data["results"].read_bytes()
+    )
+    assert results[TREEHELP].results["load"] is True
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    assert state.failures == {}
+
+
+def test_extract_signature():
+    """去掉路径、版本号与插件名称等差异后提取失败特征"""
+    from src.providers.store_test.failures import extract_signature
+
+    output = """插件 nonebot_plugin_treehelp 加载出错：
+    \x1b[31m09-01 00:00:00 [ERROR] nonebot | Failed to import "nonebot_plugin_treehelp"\x1b[0m
+    Traceback (most recent call last):
+      File "/app/.venv/lib/python3.12/site-packages/nonebot_plugin_treehelp/__init__.py", line 12, in <module>
+        from pydantic import validator
+    ImportError: cannot import name 'validator' from 'pydantic' (/app/.venv/lib/python3.12/site-packages/pydantic/__init__.py)
+    """
+    assert extract_signature(output, TREEHELP) == snapshot(
+        "ImportError: cannot import name 'validator' from 'pydantic' (<path>)"
+    )
+    assert extract_signature(
+        "ModuleNotFoundError: No module named 'nonebot_plugin_treehelp.config'",
+        TREEHELP,
+    ) == snapshot("ModuleNotFoundError: No module named '<plugin>.config'")
+    assert extract_signature(
+        "Because nonebot-plugin-treehelp depends on nonebot2 (^2.0.0b1) which doesn't match any versions, version solving failed.",
+        TREEHELP,
+    ) == snapshot(
+        "Because <plugin> depends on nonebot2 (^<version>) which doesn't match any versions, version solving failed."
+    )
+    assert extract_signature("执行命令超时") == snapshot("执行命令超时")
+    assert extract_signature("插件加载出错") is None
+
+
+def test_signature_index():
+    """不同插件的相同错误归为一类"""
+    from src.providers.store_test.failures import fingerprint, signature_index
+
+    ok, _ = make_test_result(True, "treehelp")
+    a, _ = make_test_result(
+        False, "ModuleNotFoundError: No module named 'nonebot_plugin_a'"
+    )
+    b, _ = make_test_result(
+        False, "ModuleNotFoundError: No module named 'nonebot_plugin_b'"
+    )
+    other, _ = make_test_result(False, "ModuleNotFoundError: No module named 'httpx'")
+
+    index = signature_index(
+        {
+            "nonebot-plugin-ok:nonebot_plugin_ok": ok,
+            "nonebot-plugin-a:nonebot_plugin_a": a,
+            "nonebot-plugin-httpx:nonebot_plugin_httpx": other,
+            "nonebot-plugin-b:nonebot_plugin_b": b,
+        }
+    )
+    signature = "ModuleNotFoundError: No module named '<plugin>'"
+    assert list(index) == [
+        fingerprint(signature),
+        fingerprint("ModuleNotFoundError: No module named 'httpx'"),
+    ]
+    assert index[fingerprint(signature)].keys == [
+        "nonebot-plugin-a:nonebot_plugin_a",
+        "nonebot-plugin-b:nonebot_plugin_b",
+    ]
+
+
+async def test_store_test_retest(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """按照失败特征强制重新测试对应的插件，不影响全量测试的检查点"""
+    from src.providers.models import StoreTestResultDict
+    from src.providers.store_test.failures import fingerprint
+    from src.providers.store_test.store import StoreTest
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.return_value = make_test_result(True, "treehelp")
+
+    mocked_store_data["checkpoint"].write_text("{}\n", encoding="utf-8")
+
+    test = await StoreTest.create()
+    test._previous_results[TREEHELP] = make_test_result(
+        False, "ModuleNotFoundError: No module named 'pydantic.v1'"
+    )[0]
+
+    await test.retest(["0000"])
+    assert mocked_validate_plugin.call_count == 0
+
+    fp = fingerprint("ModuleNotFoundError: No module named 'pydantic.v1'")
+    await test.retest([fp[:6]])
+
+    assert mocked_validate_plugin.call_count == 1
+    assert (
+        mocked_validate_plugin.call_args.kwargs["store_plugin"].module_name
+        == "nonebot_plugin_treehelp"
+    )
+    results = StoreTestResultDict.validate_json(
+        mocked_store_data["results"].read_bytes()
+    )
+    assert results[TREEHELP].results["load"] is True
+    assert mocked_store_data["checkpoint"].read_text(encoding="utf-8") == "{}\n"
+    assert not mocked_store_data["retest_checkpoint"].exists()
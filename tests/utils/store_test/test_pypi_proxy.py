@@ -0,0 +1,137 @@
+import http.client
+import os
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import httpx
+import pytest
+from inline_snapshot import snapshot
+from respx import MockRouter
+
+SIMPLE_PAGE = b'<a href="https://files.pythonhosted.org/packages/ab/cd/nonebot2-2.4.0-py3-none-any.whl#sha256=0">nonebot2-2.4.0-py3-none-any.whl</a>'
+
+
+@pytest.fixture
+def proxy_server(tmp_path: Path) -> Iterator[str]:
+    """在后台线程中启动 PyPI 代理，返回代理的地址"""
+    from src.providers.store_test.pypi_proxy import PyPIProxy, PyPIProxyServer
+
+    proxy = PyPIProxy(tmp_path / "pypi")
+    server = PyPIProxyServer(("127.0.0.1", 0), proxy)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    proxy.close()
+    thread.join()
+
+
+def get(url: str, accept: str = "") -> tuple[int, bytes]:
+    request = Request(url, headers={"Accept": accept} if accept else {})
+    try:
+        with urlopen(request) as response:
+            return response.status, response.read()
+    except HTTPError as e:
+        return e.code, b""
+
+
+def test_proxy_index(proxy_server: str, respx_mock: MockRouter):
+    """索引页面中的文件地址替换为代理的地址，有效期内直接使用缓存"""
+    simple = respx_mock.get("https://pypi.org/simple/nonebot2/").respond(
+        content=SIMPLE_PAGE, headers={"Content-Type": "text/html", "ETag": '"1"'}
+    )
+    respx_mock.get("https://pypi.org/simple/missing/").respond(404)
+
+    status, content = get(f"{proxy_server}/simple/nonebot2/")
+    assert status == 200
+    assert content == SIMPLE_PAGE.replace(
+        b"https://files.pythonhosted.org", proxy_server.encode()
+    )
+    assert get(f"{proxy_server}/simple/nonebot2/")[1] == content
+    assert simple.call_count == 1
+
+    # 不同的格式分开缓存
+    get(f"{proxy_server}/simple/nonebot2/", "application/vnd.pypi.simple.v1+json")
+    assert simple.call_count == 2
+
+    assert get(f"{proxy_server}/simple/missing/")[0] == 404
+    assert get(f"{proxy_server}/unknown")[0] == 404
+
+
+def test_proxy_file_dedupe(proxy_server: str, respx_mock: MockRouter):
+    """同一个文件同时被多次请求时只下载一次"""
+
+    def download(request: httpx.Request):
+        time.sleep(0.2)
+        return httpx.Response(200, content=b"wheel")
+
+    path = "/packages/ab/cd/nonebot2-2.4.0-py3-none-any.whl"
+    route = respx_mock.get(f"https://files.pythonhosted.org{path}").mock(
+        side_effect=download
+    )
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(get, [f"{proxy_server}{path}"] * 4))
+
+    assert results == [(200, b"wheel")] * 4
+    assert route.call_count == 1
+
+
+def test_proxy_offline(tmp_path: Path, respx_mock: MockRouter):
+    """上游无法访问时使用过期的缓存，离线模式只使用缓存"""
+    from src.providers.store_test.pypi_proxy import PyPIProxy
+
+    route = respx_mock.get("https://pypi.org/pypi/nonebot2/json").respond(
+        content=b'{"info": {"version": "2.4.0"}}'
+    )
+    proxy = PyPIProxy(tmp_path)
+    entry = proxy.get_index("/pypi/nonebot2/json")
+    assert entry is not None
+    assert entry.content == snapshot(b'{"info": {"version": "2.4.0"}}')
+
+    # 过期后上游无法访问
+    route.mock(side_effect=httpx.ConnectError)
+    proxy_path = proxy._index_path("https://pypi.org/pypi/nonebot2/json", "")
+    expired = time.time() - 60 * 60
+    os.utime(proxy_path, (expired, expired))
+    assert proxy.get_index("/pypi/nonebot2/json") == entry
+
+    offline = PyPIProxy(tmp_path, offline=True)
+    assert offline.get_index("/pypi/nonebot2/json") == entry
+    assert offline.get_index("/pypi/nonebot/json") is None
+    assert offline.get_file("/packages/ab/cd/nonebot2.whl") is None
+    assert route.call_count == 2
+    assert offline.summary() == snapshot("PyPI 代理命中缓存 1 次，请求上游 0 次")
+
+
+def test_proxy_path_traversal(tmp_path: Path, proxy_server: str):
+    """不能通过 .. 访问缓存目录以外的文件"""
+    from src.providers.store_test.pypi_proxy import PyPIProxy
+
+    secret = tmp_path / "secret.txt"
+    secret.write_text("secret")
+
+    host, port = proxy_server.removeprefix("http://").split(":")
+    for path in [
+        "/packages/../../secret.txt",
+        "/packages/%2e%2e/%2E%2E/secret.txt",
+        "/simple/../packages/../../secret.txt",
+    ]:
+        # urllib 会规范化路径，直接发送原始的请求
+        conn = http.client.HTTPConnection(host, int(port))
+        conn.request("GET", path)
+        response = conn.getresponse()
+        assert response.status == 400
+        assert response.read() != b"secret"
+        conn.close()
+
+    proxy = PyPIProxy(tmp_path / "pypi", offline=True)
+    assert proxy.get_file("/packages/../../secret.txt") is None
+    assert proxy.get_file("/packages/ab/../../../secret.txt") is None
+    assert proxy.get_file("/packages/") is None
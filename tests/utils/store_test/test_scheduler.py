@@ -0,0 +1,368 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+from inline_snapshot import snapshot
+from pytest_mock import MockerFixture
+from respx import MockRouter
+
+NOW = datetime(2023, 9, 1, tzinfo=ZoneInfo("Asia/Shanghai"))
+
+
+def make_result(time: str, version: str = "1.0.0", load: bool = True):
+    from src.providers.models import StoreTestResult
+
+    return StoreTestResult(
+        time=time,
+        version=version,
+        results={"validation": True, "load": load, "metadata": True},
+        outputs={"validation": None, "load": "", "metadata": None},
+    )
+
+
+async def test_scheduler_priority():
+    """首次测试 > 有新版本 > 上次加载失败 > 距离上次测试的时间"""
+    from src.providers.store_test.scheduler import Scheduler
+
+    scheduler = Scheduler(now=NOW)
+
+    assert scheduler.priority(None) == snapshot(1000.0)
+    assert scheduler.priority(
+        make_result("2023-08-31T00:00:00+08:00"), "2.0.0"
+    ) == snapshot(101.0)
+    assert scheduler.priority(
+        make_result("2023-08-31T00:00:00+08:00", load=False), "1.0.0"
+    ) == snapshot(11.0)
+    assert scheduler.priority(make_result("2023-08-22T00:00:00+08:00")) == snapshot(
+        10.0
+    )
+    # 超过最大天数后不再增加
+    assert scheduler.priority(make_result("2022-01-01T00:00:00+08:00")) == snapshot(
+        30.0
+    )
+    # 时间格式无法解析时视为最久未测试
+    assert scheduler.priority(make_result("2023-08-21 00:00:00")) == snapshot(11.0)
+    assert scheduler.priority(make_result("unknown")) == snapshot(30.0)
+
+
+async def test_scheduler_round_robin():
+    """优先级相同的插件从游标开始轮流测试"""
+    from src.providers.store_test.scheduler import Scheduler, SchedulerState
+
+    keys = ["a", "b", "c", "d"]
+    results = {key: make_result("2022-01-01T00:00:00+08:00") for key in keys}
+    results["d"] = make_result("2022-01-01T00:00:00+08:00", load=False)
+
+    scheduler = Scheduler(SchedulerState(cursor="c"), now=NOW)
+    assert scheduler.order(keys, results, {}) == ["d", "c", "a", "b"]
+
+    scheduler.advance(keys, 3)
+    assert scheduler.state.cursor == "b"
+    assert scheduler.order(keys, results, {}) == ["d", "b", "c", "a"]
+
+    # 游标对应的插件已经被删除，则从头开始
+    scheduler.state.cursor = "e"
+    assert scheduler.order(keys, results, {}) == ["d", "a", "b", "c"]
+
+
+async def test_store_test_schedule(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """按照优先级调度测试
+
+    从未测试过的第三个插件优先测试，并保存调度状态
+    """
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.side_effect = Exception
+
+    test = await StoreTest.create()
+    await test.run(limit=1, offset=2, schedule=True)
+
+    assert [
+        call.kwargs["store_plugin"].module_name
+        for call in mocked_validate_plugin.call_args_list
+    ] == [
+        "nonebot_plugin_wordcloud",
+        "nonebot_plugin_treehelp",
+    ]
+    assert mocked_api["registry_scheduler"].called
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    assert state.cursor == "nonebot-plugin-datastore:nonebot_plugin_datastore"
+    # 测试失败的插件也会记录测试耗时
+    assert list(state.durations) == [
+        "nonebot-plugin-wordcloud:nonebot_plugin_wordcloud",
+        "nonebot-plugin-treehelp:nonebot_plugin_treehelp",
+    ]
+
+
+async def test_scheduler_pack():
+    """按照顺序选择能在时间预算内完成的插件，没有记录的插件使用默认耗时"""
+    from src.providers.store_test.scheduler import Scheduler, SchedulerState
+
+    scheduler = Scheduler(SchedulerState(durations={"a": 200.0, "b": 50.0}))
+    assert scheduler.estimate("c") == snapshot(300.0)
+
+    assert scheduler.pack(["c", "a", "b"], 400) == ["c", "b"]
+    assert scheduler.pack(["c", "a", "b"], 300, concurrency=2) == ["c", "a", "b"]
+    assert scheduler.pack(["c", "a", "b"], 10) == []
+    # 单个插件的耗时超过预算时，即使同时测试多个插件也放不下
+    assert scheduler.pack(["c", "a", "b"], 250, concurrency=2) == ["a", "b"]
+
+    scheduler.record("c", 123.456)
+    assert scheduler.estimate("c") == snapshot(123.5)
+
+
+async def test_store_test_time_budget(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """在时间预算内测试插件
+
+    第二个插件上次测试耗时过长，放不下，跳过
+    """
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    mocked_api.routes["registry_scheduler"].respond(
+        json={
+            "cursor": None,
+            "durations": {
+                "nonebot-plugin-treehelp:nonebot_plugin_treehelp": 1000.0,
+                "nonebot-plugin-wordcloud:nonebot_plugin_wordcloud": 60.0,
+            },
+        }
+    )
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.side_effect = Exception
+    mocked_should_skip = mocker.spy(StoreTest, "should_skip")
+
+    test = await StoreTest.create()
+    await test.run(limit=1, force=True, time_budget=6)
+
+    # 提前检查过的插件不会再次检查
+    checked = [call.args[1] for call in mocked_should_skip.call_args_list]
+    assert len(checked) == len(set(checked))
+
+    assert [
+        call.kwargs["store_plugin"].module_name
+        for call in mocked_validate_plugin.call_args_list
+    ] == [
+        "nonebot_plugin_datastore",
+        "nonebot_plugin_wordcloud",
+    ]
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    assert state.durations[
+        "nonebot-plugin-treehelp:nonebot_plugin_treehelp"
+    ] == snapshot(1000.0)
+    assert state.durations["nonebot-plugin-wordcloud:nonebot_plugin_wordcloud"] < 60
+
+
+async def test_store_test_plan(
+    mocked_store_data: dict[str, Path],
+    mocked_api: MockRouter,
+    mocker: MockerFixture,
+    capsys: pytest.CaptureFixture[str],
+):
+    """只输出测试计划，不实际测试也不保存数据"""
+    from src.providers.store_test.store import StoreTest
+
+    mocked_api.routes["registry_scheduler"].respond(
+        json={
+            "cursor": None,
+            "durations": {
+                "nonebot-plugin-treehelp:nonebot_plugin_treehelp": 90.0,
+            },
+        }
+    )
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+
+    test = await StoreTest.create()
+    await test.run(limit=5, concurrency=2, time_budget=10, dry_run=True)
+
+    mocked_validate_plugin.assert_not_called()
+    assert not mocked_store_data["results"].exists()
+    assert not mocked_store_data["scheduler"].exists()
+    assert capsys.readouterr().out.splitlines()[-3:] == snapshot(
+        [
+            "1. nonebot-plugin-treehelp:nonebot_plugin_treehelp（预计 90 秒）",
+            "2. nonebot-plugin-wordcloud:nonebot_plugin_wordcloud（预计 300 秒）",
+            "计划测试 2 个插件，预计耗时 3.2 分钟（同时测试 2 个）",
+        ]
+    )
+
+
+async def test_scheduler_reverse_dependencies():
+    """根据依赖构建反向依赖索引，依赖有新版本的插件优先测试"""
+    from src.providers.store_test.scheduler import Scheduler
+
+    results = {
+        "a": make_result("2023-08-31T00:00:00+08:00"),
+        "b": make_result("2023-08-31T00:00:00+08:00"),
+        "c": make_result("2023-08-31T00:00:00+08:00"),
+    }
+    results["a"].deps = {"module_b": "1.0.0", "module_c": "0.1.0"}
+    # 不在商店中的插件与插件自己都不需要记录
+    results["b"].deps = {"module_b": "1.0.0", "module_d": "2.0.0"}
+    results["c"].deps = {"module_b": "1.1.0"}
+    modules = {"module_a": "a", "module_b": "b", "module_c": "c"}
+
+    assert Scheduler.reverse_dependencies(results, modules) == snapshot(
+        {"b": {"a": "1.0.0", "c": "1.1.0"}, "c": {"a": "0.1.0"}}
+    )
+
+    scheduler = Scheduler(now=NOW)
+    assert scheduler.priority(results["a"], dependency_updated=True) == snapshot(51.0)
+    assert scheduler.order(["a", "b", "c"], results, {}, {"c"}) == ["c", "a", "b"]
+
+
+async def test_store_test_dependents(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """依赖的商店插件有新版本时重新测试
+
+    datastore 已是最新版本，但依赖的 treehelp 有新版本，也需要重新测试
+    """
+    from src.providers.constants import REGISTRY_RESULTS_URL
+    from src.providers.store_test.store import StoreTest
+
+    results = json.loads(
+        (Path(__file__).parent / "store" / "registry_results.json").read_text(
+            encoding="utf-8"
+        )
+    )
+    results["nonebot-plugin-datastore:nonebot_plugin_datastore"]["deps"] = {
+        "nonebot_plugin_treehelp": "0.3.0"
+    }
+    mocked_api.get(REGISTRY_RESULTS_URL).respond(json=results)
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.side_effect = Exception
+
+    test = await StoreTest.create()
+    await test.run(limit=5, dependents=True)
+
+    assert [
+        call.kwargs["store_plugin"].module_name
+        for call in mocked_validate_plugin.call_args_list
+    ] == [
+        "nonebot_plugin_datastore",
+        "nonebot_plugin_treehelp",
+        "nonebot_plugin_wordcloud",
+    ]
+
+
+async def test_scheduler_framework_releases():
+    """框架发布新版本后，使用旧版本测试的插件优先测试，其中上次加载失败的更优先"""
+    from src.providers.store_test.scheduler import Scheduler
+
+    scheduler = Scheduler(now=NOW)
+    # 第一次记录只作为基准
+    assert scheduler.detect_releases({"nonebot2": "2.0.0", "pydantic": "2.0.0"}) == []
+    assert scheduler.detect_releases({"nonebot2": "2.1.0", "pydantic": "2.0.0"}) == [
+        "nonebot2"
+    ]
+    assert scheduler.state.frameworks["nonebot2"].time == NOW
+    assert scheduler.state.frameworks["pydantic"].time is None
+
+    old = make_result("2023-08-31T00:00:00+08:00")
+    old.test_env = {"python==3.12.0 nonebot2==2.0.0 pydantic==2.0.0": True}
+    failed = make_result("2023-08-31T00:00:00+08:00", load=False)
+    failed.test_env = {"python==3.12.0 nonebot2==2.0.0": False}
+    unknown = make_result("2023-08-31T00:00:00+08:00")
+    latest = make_result("2023-08-31T00:00:00+08:00")
+    latest.test_env = {"python==3.12.0 nonebot2==2.1.0 pydantic==2.0.0": True}
+    # 发现新版本之后测试的插件即使使用旧版本也不需要重新测试
+    retested = make_result("2023-09-01T00:00:00+08:00")
+    retested.test_env = {"python==3.12.0 nonebot2==2.0.0": True}
+
+    assert scheduler.framework_outdated(old)
+    assert scheduler.framework_outdated(failed)
+    # 测试环境中没有记录框架版本时无法判断
+    assert not scheduler.framework_outdated(unknown)
+    assert not scheduler.framework_outdated(latest)
+    assert not scheduler.framework_outdated(retested)
+
+    assert scheduler.priority(old, framework_updated=True) == snapshot(201.0)
+    assert scheduler.priority(failed, framework_updated=True) == snapshot(411.0)
+
+    results = {"a": latest, "b": old, "c": failed}
+    assert scheduler.order(
+        ["a", "b", "c"], results, {}, framework_updated={"b", "c"}
+    ) == ["c", "b", "a"]
+
+
+async def test_store_test_framework_updated(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """nonebot2 发布新版本后，使用旧版本测试的插件优先测试
+
+    只有设置 frameworks 时才会重新测试已是最新版本的 datastore，
+    datastore 上次加载失败，排在有新版本的 treehelp 之前
+    """
+    from src.providers.constants import REGISTRY_RESULTS_URL, REGISTRY_SCHEDULER_URL
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    results = json.loads(
+        (Path(__file__).parent / "store" / "registry_results.json").read_text(
+            encoding="utf-8"
+        )
+    )
+    results["nonebot-plugin-datastore:nonebot_plugin_datastore"]["results"]["load"] = (
+        False
+    )
+    for result in results.values():
+        result["test_env"] = {"python==3.12.0 nonebot2==2.0.0": True}
+    mocked_api.get(REGISTRY_RESULTS_URL).respond(json=results)
+    mocked_api.get(REGISTRY_SCHEDULER_URL).respond(
+        json={"frameworks": {"nonebot2": {"version": "2.0.0"}}}
+    )
+    mocked_api.get("https://pypi.org/pypi/nonebot2/json").respond(
+        json={"info": {"name": "nonebot2", "version": "2.1.0"}}
+    )
+    mocked_api.get("https://pypi.org/pypi/pydantic/json").respond(404)
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.side_effect = Exception
+
+    test = await StoreTest.create()
+    await test.run(limit=5, schedule=True)
+
+    assert [
+        call.kwargs["store_plugin"].module_name
+        for call in mocked_validate_plugin.call_args_list
+    ] == ["nonebot_plugin_wordcloud", "nonebot_plugin_treehelp"]
+
+    mocked_validate_plugin.reset_mock()
+    test = await StoreTest.create()
+    await test.run(limit=5, schedule=True, frameworks=True)
+
+    assert [
+        call.kwargs["store_plugin"].module_name
+        for call in mocked_validate_plugin.call_args_list
+    ] == [
+        "nonebot_plugin_wordcloud",
+        "nonebot_plugin_datastore",
+        "nonebot_plugin_treehelp",
+    ]
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    assert state.frameworks["nonebot2"].version == "2.1.0"
+    assert state.frameworks["nonebot2"].time is not None
@@ -0,0 +1,237 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from inline_snapshot import snapshot
+from pytest_mock import MockerFixture
+from respx import MockRouter
+
+STORE_DIR = Path(__file__).parent / "store"
+
+
+async def test_parse_shard():
+    from src.providers.store_test.shard import parse_shard
+
+    assert parse_shard("1/4") == (1, 4)
+    assert parse_shard("4/4") == (4, 4)
+
+    with pytest.raises(ValueError, match="分片格式不正确"):
+        parse_shard("1")
+    with pytest.raises(ValueError, match="分片序号 0 应在 1 到 4 之间"):
+        parse_shard("0/4")
+    with pytest.raises(ValueError, match="分片序号 5 应在 1 到 4 之间"):
+        parse_shard("5/4")
+
+
+async def test_shard_of():
+    """每个插件都只属于一个分片，且分配结果稳定"""
+    from src.providers.store_test.shard import shard_of
+
+    keys = [f"nonebot-plugin-{i}:nonebot_plugin_{i}" for i in range(100)]
+    shards = [shard_of(key, 4) for key in keys]
+
+    assert set(shards) == {1, 2, 3, 4}
+    assert shards == [shard_of(key, 4) for key in keys]
+    assert shard_of("nonebot-plugin-treehelp:nonebot_plugin_treehelp", 4) == snapshot(1)
+    assert all(shard_of(key, 1) == 1 for key in keys)
+
+
+def make_shard(path: Path) -> Path:
+    path.mkdir()
+    for name in ["adapters", "bots", "drivers", "plugins", "results"]:
+        shutil.copyfile(STORE_DIR / f"registry_{name}.json", path / f"{name}.json")
+    shutil.copyfile(STORE_DIR / "plugin_configs.json", path / "plugin_configs.json")
+    return path
+
+
+def update_json(path: Path, func):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    func(data)
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+async def test_merge_shards(tmp_path: Path, mocker: MockerFixture):
+    """合并分片时以测试时间最新的结果为准"""
+    from src.providers.store_test.shard import merge_shards
+
+    output_path = tmp_path / "plugin_test"
+    output_path.mkdir()
+    for name in [
+        "adapters",
+        "bots",
+        "drivers",
+        "plugins",
+        "results",
+        "scheduler",
+        "authors",
+    ]:
+        mocker.patch(
+            f"src.providers.store_test.shard.{name.upper()}_PATH",
+            output_path / f"{name}.json",
+        )
+    mocker.patch(
+        "src.providers.store_test.shard.PLUGIN_CONFIG_PATH",
+        output_path / "plugin_configs.json",
+    )
+
+    shard1 = make_shard(tmp_path / "shard1")
+    shard2 = make_shard(tmp_path / "shard2")
+
+    datastore = "nonebot-plugin-datastore:nonebot_plugin_datastore"
+    treehelp = "nonebot-plugin-treehelp:nonebot_plugin_treehelp"
+
+    (shard1 / "scheduler.json").write_text(
+        json.dumps({"cursor": "a", "durations": {datastore: 10.0, treehelp: 20.0}}),
+        encoding="utf-8",
+    )
+    (shard2 / "scheduler.json").write_text(
+        json.dumps({"cursor": "b", "durations": {datastore: 30.0, treehelp: 40.0}}),
+        encoding="utf-8",
+    )
+
+    (shard1 / "authors.json").write_text(
+        json.dumps(
+            {
+                "users": {
+                    "1": {"login": "old", "time": "2023-01-01T00:00:00+08:00"},
+                    "2": {"login": "BigOrangeQWQ", "time": "2023-01-01T00:00:00+08:00"},
+                },
+                "keys": {datastore: 1},
+            }
+        ),
+        encoding="utf-8",
+    )
+    (shard2 / "authors.json").write_text(
+        json.dumps(
+            {
+                "users": {
+                    "1": {"login": "he0119", "time": "2023-09-01T00:00:00+08:00"}
+                },
+                "keys": {treehelp: 1},
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    def update_results(data: dict):
+        # 第二个分片重新测试了 treehelp
+        data[treehelp]["time"] = "2023-09-01T00:00:00.000000+08:00"
+        data[treehelp]["version"] = "2.0.0"
+        # datastore 的结果比第一个分片旧
+        data[datastore]["time"] = "2023-01-01T00:00:00.000000+08:00"
+        data[datastore]["version"] = "0.1.0"
+
+    def update_plugins(data: list):
+        for plugin in data:
+            plugin["version"] = "2.0.0"
+
+    def update_configs(data: dict):
+        data[treehelp] = "TEST_CONFIG=false"
+        data[datastore] = "OUTDATED=true"
+
+    update_json(shard2 / "results.json", update_results)
+    update_json(shard2 / "plugins.json", update_plugins)
+    update_json(shard2 / "plugin_configs.json", update_configs)
+
+    merge_shards([shard1, shard2])
+
+    results = json.loads((output_path / "results.json").read_text(encoding="utf-8"))
+    assert {key: result["version"] for key, result in results.items()} == snapshot(
+        {
+            "nonebot-plugin-datastore:nonebot_plugin_datastore": "1.0.0",
+            "nonebot-plugin-treehelp:nonebot_plugin_treehelp": "2.0.0",
+        }
+    )
+    plugins = json.loads((output_path / "plugins.json").read_text(encoding="utf-8"))
+    assert {plugin["module_name"]: plugin["version"] for plugin in plugins} == snapshot(
+        {"nonebot_plugin_datastore": "0.0.1", "nonebot_plugin_treehelp": "2.0.0"}
+    )
+    plugin_configs = json.loads(
+        (output_path / "plugin_configs.json").read_text(encoding="utf-8")
+    )
+    assert plugin_configs == snapshot(
+        {
+            "nonebot-plugin-treehelp:nonebot_plugin_treehelp": "TEST_CONFIG=false",
+            "nonebot-plugin-datastore:nonebot_plugin_datastore": "",
+        }
+    )
+    assert (output_path / "adapters.json").exists()
+    # 测试耗时与测试结果来自同一分片
+    assert (output_path / "scheduler.json").read_text(encoding="utf-8") == snapshot(
+        '{"cursor":"a","serial":null,"cursors":{},"serials":{},"shard":null,"durations":{"nonebot-plugin-datastore:nonebot_plugin_datastore":10.0,"nonebot-plugin-treehelp:nonebot_plugin_treehelp":40.0},"failures":{},"frameworks":{}}'
+    )
+    # 同一作者以获取时间最新的为准
+    assert (output_path / "authors.json").read_text(encoding="utf-8") == snapshot(
+        '{"users":{"1":{"login":"he0119","time":"2023-09-01T00:00:00+08:00"},"2":{"login":"BigOrangeQWQ","time":"2023-01-01T00:00:00+08:00"}},"keys":{"nonebot-plugin-datastore:nonebot_plugin_datastore":1,"nonebot-plugin-treehelp:nonebot_plugin_treehelp":1}}'
+    )
+
+
+async def test_merge_shards_cursors(tmp_path: Path, mocker: MockerFixture):
+    """每个分片的游标与变更序号分别保留，合并后每个分片都能继续向后测试"""
+    from src.providers.store_test.scheduler import Scheduler, SchedulerState
+    from src.providers.store_test.shard import merge_shards
+
+    output_path = tmp_path / "plugin_test"
+    output_path.mkdir()
+    for name in ["adapters", "bots", "drivers", "plugins", "results", "scheduler"]:
+        mocker.patch(
+            f"src.providers.store_test.shard.{name.upper()}_PATH",
+            output_path / f"{name}.json",
+        )
+    mocker.patch(
+        "src.providers.store_test.shard.PLUGIN_CONFIG_PATH",
+        output_path / "plugin_configs.json",
+    )
+
+    keys = {1: ["a", "b", "c"], 2: ["d", "e", "f"]}
+    # 上次合并后的调度状态
+    state = SchedulerState(cursors={"1/2": "a", "2/2": "d"}, serials={"1/2": 100})
+    shard_dirs = []
+    for index in [1, 2]:
+        scheduler = Scheduler(state.model_copy(deep=True))
+        scheduler.use_shard((index, 2))
+        scheduler.advance(keys[index], 1)
+        scheduler.serial = 100 + index
+        shard_dir = make_shard(tmp_path / f"shard{index}")
+        (shard_dir / "scheduler.json").write_text(
+            scheduler.state.model_dump_json(), encoding="utf-8"
+        )
+        shard_dirs.append(shard_dir)
+
+    merge_shards(shard_dirs)
+
+    merged = SchedulerState.model_validate_json(
+        (output_path / "scheduler.json").read_text(encoding="utf-8")
+    )
+    assert merged.cursors == snapshot({"1/2": "b", "2/2": "e"})
+    assert merged.serials == snapshot({"1/2": 101, "2/2": 102})
+    assert merged.shard is None
+
+    # 下次运行时每个分片都从自己的游标继续
+    for index, expected in [(1, "c"), (2, "f")]:
+        scheduler = Scheduler(merged.model_copy(deep=True))
+        scheduler.use_shard((index, 2))
+        scheduler.advance(keys[index], 1)
+        assert scheduler.cursor == expected
+
+
+async def test_store_test_shard(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """只测试分配到当前分片的插件"""
+    from src.providers.store_test.store import StoreTest
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin"
+    )
+    mocked_validate_plugin.side_effect = Exception
+
+    test = await StoreTest.create()
+    await test.run(limit=5, force=True, shard=(2, 3))
+
+    mocked_validate_plugin.assert_called_once()
+    assert (
+        mocked_validate_plugin.call_args.kwargs["store_plugin"].module_name
+        == "nonebot_plugin_wordcloud"
+    )
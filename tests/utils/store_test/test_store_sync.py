@@ -20,7 +20,7 @@ async def test_store_sync(
     """
     from src.providers.store_test.store import StoreTest
 
-    test = StoreTest()
+    test = await StoreTest.create()
     await test.run(0, 0, False)
 
     assert load_json(mocked_store_data["adapters"]) == snapshot(
@@ -189,3 +189,47 @@ async def test_store_sync(
             },
         }
     )
+
+
+async def test_store_sync_author_changed(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter
+) -> None:
+    """作者 ID 变化时重新获取作者名称
+
+    作者 ID 未变化的插件仍然使用仓库中的作者名称，同一作者只请求一次
+    """
+    from src.providers.store_test.store import StoreTest
+
+    mocked_api["registry_authors"].respond(
+        json={
+            "users": {},
+            "keys": {
+                "nonebot-adapter-onebot:nonebot.adapters.onebot.v11": 2,
+                "nonebot-plugin-treehelp:nonebot_plugin_treehelp": 2,
+            },
+        }
+    )
+    mocked_api.get("https://api.github.com/user/1", name="github_username_1").respond(
+        json={"login": "new_author"}
+    )
+
+    test = await StoreTest.create()
+    await test.run(0, 0, False)
+
+    assert [
+        adapter["author"] for adapter in load_json(mocked_store_data["adapters"])
+    ] == snapshot(["new_author", "new_author"])
+    assert {
+        plugin["module_name"]: plugin["author"]
+        for plugin in load_json(mocked_store_data["plugins"])
+    } == snapshot(
+        {
+            "nonebot_plugin_datastore": "he0119",
+            "nonebot_plugin_treehelp": "new_author",
+        }
+    )
+    assert mocked_api["github_username_1"].call_count == 1
+
+    authors = load_json(mocked_store_data["authors"])
+    assert authors["users"]["1"]["login"] == "new_author"
+    assert authors["keys"]["nonebot-adapter-onebot:nonebot.adapters.onebot.v11"] == 1
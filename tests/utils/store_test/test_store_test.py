@@ -1,10 +1,14 @@
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import httpx
 from inline_snapshot import snapshot
 from pytest_mock import MockerFixture
 from respx import MockRouter
 
+if TYPE_CHECKING:
+    from src.providers.models import RegistryPlugin, StorePlugin, StoreTestResult
+
 
 async def test_store_test(
     mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
@@ -62,7 +66,7 @@ async def test_store_test(
         ),
     )
 
-    test = StoreTest()
+    test = await StoreTest.create()
     await test.run(1, 0, False)
 
     mocked_validate_plugin.assert_called_once_with(
@@ -130,7 +134,7 @@ async def test_store_test_with_key(
     )
     mocked_validate_plugin.return_value = ({}, {})
 
-    test = StoreTest()
+    test = await StoreTest.create()
     await test.run_single_plugin(key="nonebot-plugin-treehelp:nonebot_plugin_treehelp")
 
     mocked_validate_plugin.assert_called_once_with(
@@ -174,7 +178,7 @@ async def test_store_test_with_key_skip(
         "src.providers.store_test.store.validate_plugin"
     )
 
-    test = StoreTest()
+    test = await StoreTest.create()
     await test.run_single_plugin(
         key="nonebot-plugin-datastore:nonebot_plugin_datastore"
     )
@@ -210,7 +214,7 @@ async def test_store_test_raise(
     )
     mocked_validate_plugin.side_effect = Exception
 
-    test = StoreTest()
+    test = await StoreTest.create()
     await test.run(limit=1)
 
     mocked_validate_plugin.assert_has_calls(
@@ -263,7 +267,7 @@ async def test_store_test_with_key_raise(
     )
     mocked_validate_plugin.side_effect = Exception
 
-    test = StoreTest()
+    test = await StoreTest.create()
     await test.run_single_plugin(
         key="nonebot-plugin-wordcloud:nonebot_plugin_wordcloud"
     )
@@ -296,3 +300,334 @@ async def test_store_test_with_key_raise(
     assert mocked_store_data["results"].read_text(encoding="utf-8") == snapshot(
         '{"nonebot-plugin-datastore:nonebot_plugin_datastore":{"time":"2023-06-26T22:08:18.945584+08:00","config":"","version":"1.0.0","test_env":null,"results":{"validation":true,"load":true,"metadata":true},"outputs":{"validation":null,"load":"datastore","metadata":{"name":"数据存储","description":"NoneBot 数据存储插件","usage":"请参考文档","type":"library","homepage":"https://github.com/he0119/nonebot-plugin-datastore","supported_adapters":null}}},"nonebot-plugin-treehelp:nonebot_plugin_treehelp":{"time":"2023-06-26T22:20:41.833311+08:00","config":"","version":"0.3.0","test_env":null,"results":{"validation":true,"load":true,"metadata":true},"outputs":{"validation":null,"load":"treehelp","metadata":{"name":"帮助","description":"获取插件帮助信息","usage":"获取插件列表\\n/help\\n获取插件树\\n/help -t\\n/help --tree\\n获取某个插件的帮助\\n/help 插件名\\n获取某个插件的树\\n/help --tree 插件名\\n","type":"application","homepage":"https://github.com/he0119/nonebot-plugin-treehelp","supported_adapters":null}}}}'
     )
+
+
+def make_test_result(
+    store_plugin: "StorePlugin",
+) -> tuple["StoreTestResult", "RegistryPlugin"]:
+    from src.providers.store_test.store import RegistryPlugin, StoreTestResult
+
+    return (
+        StoreTestResult(
+            time="2023-08-28T00:00:00.000000+08:00",
+            version="0.5.0",
+            results={"load": True, "metadata": True, "validation": True},
+            outputs={"load": "output", "metadata": None, "validation": None},
+        ),
+        RegistryPlugin(
+            name="name",
+            module_name=store_plugin.module_name,
+            author="he0119",
+            version="0.5.0",
+            desc="desc",
+            homepage="https://nonebot.dev/",
+            project_link=store_plugin.project_link,
+            tags=[],
+            supported_adapters=None,
+            type="application",
+            time="2023-08-28T00:00:00.000000+08:00",
+            is_official=False,
+            valid=True,
+            skip_test=False,
+        ),
+    )
+
+
+async def test_store_test_concurrency(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """并行测试插件
+
+    第一个插件因为版本号无变化跳过
+    第二个与第三个插件同时测试，第二个插件测试报错，不计入测试数量
+    测试成功的插件写入检查点
+    """
+    import asyncio
+
+    from src.providers.store_test.store import StoreTest
+
+    running = 0
+    max_running = 0
+
+    async def validate_plugin(store_plugin, config, previous_plugin):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if store_plugin.module_name == "nonebot_plugin_treehelp":
+            raise ValueError("测试失败")
+        return make_test_result(store_plugin)
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin",
+        side_effect=validate_plugin,
+    )
+
+    test = await StoreTest.create()
+    new_results, new_plugins = await test.test_plugins(
+        limit=2, offset=0, force=False, concurrency=2
+    )
+
+    assert mocked_validate_plugin.call_count == 2
+    assert max_running == 2
+    assert list(new_results) == ["nonebot-plugin-wordcloud:nonebot_plugin_wordcloud"]
+    assert list(new_plugins) == ["nonebot-plugin-wordcloud:nonebot_plugin_wordcloud"]
+
+    checkpoint = mocked_store_data["checkpoint"].read_text(encoding="utf-8")
+    assert checkpoint.count("\n") == 1
+    assert checkpoint.startswith(
+        '{"key":"nonebot-plugin-wordcloud:nonebot_plugin_wordcloud"'
+    )
+
+
+async def test_store_test_resume(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """从检查点恢复测试
+
+    检查点中已有第三个插件的结果，计入测试数量且不再测试
+    不完整的记录会被忽略
+    测试完成后删除检查点
+    """
+    from src.providers.store_test.checkpoint import Checkpoint
+    from src.providers.store_test.store import StorePlugin, StoreTest
+
+    wordcloud = StorePlugin(
+        module_name="nonebot_plugin_wordcloud",
+        project_link="nonebot-plugin-wordcloud",
+        author_id=1,
+        tags=[],
+        is_official=False,
+    )
+    Checkpoint(mocked_store_data["checkpoint"]).append(
+        wordcloud.key, *make_test_result(wordcloud)
+    )
+    with open(mocked_store_data["checkpoint"], "a", encoding="utf-8") as f:
+        f.write('{"key":"nonebot-plugin-treehelp')
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin",
+        side_effect=lambda store_plugin, config, previous_plugin: make_test_result(
+            store_plugin
+        ),
+    )
+
+    test = await StoreTest.create()
+    await test.run(limit=2, resume=True)
+
+    mocked_validate_plugin.assert_called_once()
+    assert (
+        mocked_validate_plugin.call_args.kwargs["store_plugin"].module_name
+        == "nonebot_plugin_treehelp"
+    )
+    plugins = mocked_store_data["plugins"].read_text(encoding="utf-8")
+    assert '"module_name":"nonebot_plugin_wordcloud"' in plugins
+    assert not mocked_store_data["checkpoint"].exists()
+
+
+async def test_store_test_resume_download(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """本地没有检查点时，从上次上传的测试结果中下载检查点再恢复"""
+    from src.providers.store_test.checkpoint import CheckpointRecord
+    from src.providers.store_test.store import StorePlugin, StoreTest
+
+    wordcloud = StorePlugin(
+        module_name="nonebot_plugin_wordcloud",
+        project_link="nonebot-plugin-wordcloud",
+        author_id=1,
+        tags=[],
+        is_official=False,
+    )
+    result, plugin = make_test_result(wordcloud)
+    record = CheckpointRecord(key=wordcloud.key, result=result, plugin=plugin)
+    mocked_api["registry_checkpoint"].respond(
+        content=(record.model_dump_json() + "\n").encode()
+    )
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin",
+        side_effect=lambda store_plugin, config, previous_plugin: make_test_result(
+            store_plugin
+        ),
+    )
+
+    test = await StoreTest.create()
+    await test.run(limit=2, resume=True)
+
+    assert mocked_api["registry_checkpoint"].called
+    mocked_validate_plugin.assert_called_once()
+    assert (
+        mocked_validate_plugin.call_args.kwargs["store_plugin"].module_name
+        == "nonebot_plugin_treehelp"
+    )
+
+
+async def test_store_test_incremental(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """增量测试
+
+    PyPI 上只有第二个插件发生变化，第三个插件从未测试过，第一个插件不需要检查
+    所有插件都检查过后记录新的变更序号
+    """
+    import xmlrpc.client
+
+    from src.providers.constants import PYPI_XMLRPC_URL
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    mocked_api.routes["registry_scheduler"].respond(json={"serial": 100})
+    mocked_changelog = mocked_api.post(PYPI_XMLRPC_URL).respond(
+        content=xmlrpc.client.dumps(
+            (
+                [
+                    [
+                        "Nonebot_Plugin.TreeHelp",
+                        "0.3.0",
+                        1693497600,
+                        "new release",
+                        105,
+                    ],
+                    ["other-project", "1.0.0", 1693497601, "new release", 110],
+                ],
+            ),
+            methodresponse=True,
+        )
+    )
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin",
+        side_effect=lambda store_plugin, config, previous_plugin: make_test_result(
+            store_plugin
+        ),
+    )
+
+    test = await StoreTest.create()
+    await test.run(limit=5, incremental=True)
+
+    assert xmlrpc.client.loads(mocked_changelog.calls[0].request.content) == (
+        (100,),
+        "changelog_since_serial",
+    )
+    assert [
+        call.kwargs["store_plugin"].module_name
+        for call in mocked_validate_plugin.call_args_list
+    ] == ["nonebot_plugin_treehelp", "nonebot_plugin_wordcloud"]
+    assert not mocked_api["project_link_datastore"].called
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    assert state.serial == 110
+
+
+async def test_store_test_incremental_errored(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """增量测试中有插件测试出错时，不更新变更序号"""
+    import xmlrpc.client
+
+    from src.providers.constants import PYPI_XMLRPC_URL
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    mocked_api.routes["registry_scheduler"].respond(json={"serial": 100})
+    mocked_api.post(PYPI_XMLRPC_URL).respond(
+        content=xmlrpc.client.dumps(
+            (
+                [
+                    [
+                        "Nonebot_Plugin.TreeHelp",
+                        "0.3.0",
+                        1693497600,
+                        "new release",
+                        105,
+                    ],
+                ],
+            ),
+            methodresponse=True,
+        )
+    )
+
+    def validate_plugin(store_plugin, config, previous_plugin):
+        if store_plugin.module_name == "nonebot_plugin_wordcloud":
+            raise Exception("测试出错")
+        return make_test_result(store_plugin)
+
+    mocked_validate_plugin = mocker.patch(
+        "src.providers.store_test.store.validate_plugin", side_effect=validate_plugin
+    )
+
+    test = await StoreTest.create()
+    await test.run(limit=5, incremental=True)
+
+    assert mocked_validate_plugin.call_count == 2
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    assert state.serial == 100
+
+
+async def test_store_test_prefetch_authors(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """只预先获取实际测试的插件的作者
+
+    第一个插件因为版本号无变化跳过，limit=1 所以第三个插件未测试
+    """
+    from src.providers.github import author_resolver
+    from src.providers.store_test.store import StoreTest
+
+    prefetched: list[list[int]] = []
+
+    async def prefetch(author_ids):
+        prefetched.append(list(author_ids))
+
+    mocker.patch.object(author_resolver, "prefetch", side_effect=prefetch)
+    mocker.patch(
+        "src.providers.store_test.store.validate_plugin",
+        side_effect=lambda store_plugin, config, previous_plugin: make_test_result(
+            store_plugin
+        ),
+    )
+
+    test = await StoreTest.create()
+    await test.run(limit=1, offset=0, force=False)
+
+    assert [ids for ids in prefetched if ids] == [[1]]
+
+
+async def test_store_test_incremental_unfinished(
+    mocked_store_data: dict[str, Path], mocked_api: MockRouter, mocker: MockerFixture
+):
+    """增量测试达到测试上限时，不更新变更序号
+
+    首次运行时没有变更序号，检查所有插件
+    """
+    import xmlrpc.client
+
+    from src.providers.constants import PYPI_XMLRPC_URL
+    from src.providers.store_test.scheduler import SchedulerState
+    from src.providers.store_test.store import StoreTest
+
+    mocked_last_serial = mocked_api.post(PYPI_XMLRPC_URL).respond(
+        content=xmlrpc.client.dumps((120,), methodresponse=True)
+    )
+    mocker.patch(
+        "src.providers.store_test.store.validate_plugin",
+        side_effect=lambda store_plugin, config, previous_plugin: make_test_result(
+            store_plugin
+        ),
+    )
+
+    test = await StoreTest.create()
+    await test.run(limit=1, incremental=True)
+
+    assert xmlrpc.client.loads(mocked_last_serial.calls[0].request.content) == (
+        (),
+        "changelog_last_serial",
+    )
+    state = SchedulerState.model_validate_json(
+        mocked_store_data["scheduler"].read_text(encoding="utf-8")
+    )
+    assert state.serial is None
@@ -1,7 +1,12 @@
+from pathlib import Path
+
+import httpx
 import pytest
+from inline_snapshot import snapshot
+from pytest_mock import MockerFixture
 from respx import MockRouter
 
-from src.providers.constants import STORE_ADAPTERS_URL
+from src.providers.constants import STORE_ADAPTERS_URL, STORE_PLUGINS_URL
 
 
 async def test_load_json_failed(mocked_api: MockRouter):
@@ -14,9 +19,253 @@ async def test_load_json_failed(mocked_api: MockRouter):
         load_json_from_web(STORE_ADAPTERS_URL)
 
 
+async def test_load_jsons(mocked_api: MockRouter):
+    """并行加载多个 json，结果顺序与传入顺序一致"""
+    from src.providers.utils import load_jsons_from_web
+
+    mocked_api.get(STORE_ADAPTERS_URL).respond(text="[{a: 1,},]")
+
+    adapters, plugins = await load_jsons_from_web(STORE_ADAPTERS_URL, STORE_PLUGINS_URL)
+
+    assert adapters == [{"a": 1}]
+    assert plugins[0]["project_link"] == "nonebot-plugin-treehelp"
+
+
+async def test_load_jsons_failed(mocked_api: MockRouter):
+    """并行加载 json 时有文件下载失败"""
+    from src.providers.utils import load_jsons_from_web
+
+    mocked_api.get(STORE_ADAPTERS_URL).respond(404)
+
+    with pytest.raises(ValueError, match="下载文件失败："):
+        await load_jsons_from_web(STORE_PLUGINS_URL, STORE_ADAPTERS_URL)
+
+
 async def test_get_pypi_data_failed(mocked_api: MockRouter):
     """获取 PyPI 数据失败"""
     from src.providers.utils import get_pypi_data
 
     with pytest.raises(ValueError, match="获取 PyPI 数据失败："):
         get_pypi_data("project_link_failed")
+
+
+async def test_pypi_client_dedupe(mocked_api: MockRouter):
+    """同时请求同一项目时只发送一次请求，同步请求也使用缓存"""
+    import asyncio
+
+    from src.providers.utils import PyPIClient
+
+    client = PyPIClient()
+
+    data = await asyncio.gather(
+        client.get_data("project_link1"), client.get_data("project_link1")
+    )
+
+    assert data[0]["info"]["version"] == "0.5.0"
+    assert data[0] == data[1]
+    assert client.get_data_sync("project_link1") == data[0]
+    assert mocked_api["project_link1"].call_count == 1
+
+
+async def test_pypi_client_prefetch(mocked_api: MockRouter):
+    """批量预取数据，请求失败的项目不会影响其他项目"""
+    from src.providers.utils import PyPIClient
+
+    mocked_api.get("https://pypi.org/pypi/project_link_error/json").mock(
+        side_effect=httpx.ConnectError
+    )
+
+    client = PyPIClient(max_connections=1)
+    await client.prefetch(
+        ["project_link1", "project_link_failed", "project_link_error"]
+    )
+
+    assert mocked_api["project_link1"].call_count == 1
+    assert mocked_api["project_link_failed"].call_count == 1
+    assert client.get_data_sync("project_link1")["info"]["version"] == "0.5.0"
+    with pytest.raises(ValueError, match="获取 PyPI 数据失败："):
+        client.get_data_sync("project_link_failed")
+    with pytest.raises(ValueError, match="获取 PyPI 数据失败："):
+        await client.get_data("project_link_error")
+    assert mocked_api["project_link1"].call_count == 1
+    assert mocked_api["project_link_failed"].call_count == 1
+
+
+async def test_pypi_client_transient_error(mocked_api: MockRouter):
+    """服务器错误或被限流时不缓存响应，之后使用时重新请求"""
+    from src.providers.utils import PyPIClient
+
+    route = mocked_api.get("https://pypi.org/pypi/project_link_busy/json")
+    route.side_effect = [
+        httpx.Response(429),
+        httpx.Response(503),
+        httpx.Response(200, json={"info": {"version": "1.0.0"}}),
+    ]
+
+    client = PyPIClient()
+    await client.prefetch(["project_link_busy"])
+    with pytest.raises(ValueError, match="获取 PyPI 数据失败："):
+        client.get_data_sync("project_link_busy")
+    assert await client.latest_version("project_link_busy") == "1.0.0"
+    assert await client.latest_version("project_link_busy") == "1.0.0"
+    assert route.call_count == 3
+
+
+async def test_pypi_client_changelog(mocked_api: MockRouter):
+    """获取 PyPI 变更记录，项目名称需要规范化"""
+    import xmlrpc.client
+
+    from src.providers.constants import PYPI_XMLRPC_URL
+    from src.providers.utils import pypi_client
+
+    mocked_api.post(PYPI_XMLRPC_URL).respond(
+        content=xmlrpc.client.dumps(
+            ([["Nonebot_Plugin.TreeHelp", "0.3.0", 1693497600, "new release", 105]],),
+            methodresponse=True,
+        )
+    )
+
+    assert await pypi_client.changelog_since(100) == (
+        {"nonebot-plugin-treehelp"},
+        105,
+    )
+
+
+async def test_pypi_client_changelog_failed(mocked_api: MockRouter):
+    """获取 PyPI 变更记录失败"""
+    from src.providers.constants import PYPI_XMLRPC_URL
+    from src.providers.utils import pypi_client
+
+    mocked_api.post(PYPI_XMLRPC_URL).respond(500)
+
+    with pytest.raises(ValueError, match="调用 PyPI 接口 changelog_last_serial 失败"):
+        await pypi_client.last_serial()
+
+
+async def test_load_json_bytes():
+    """严格的 JSON 直接验证，JSON5 或格式不标准时使用 pyjson5"""
+    from pydantic import TypeAdapter, ValidationError
+
+    from src.providers.utils import load_json_bytes
+
+    adapter = TypeAdapter(list[int])
+
+    assert load_json_bytes(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    assert load_json_bytes(b"[1, 2]", adapter) == [1, 2]
+    # 带有注释与末尾逗号的 JSON5
+    assert load_json_bytes(b"// comment\n[1, 2,]", adapter, json5=True) == [1, 2]
+    # 扩展名为 .json 但内容不是严格的 JSON
+    assert load_json_bytes(b"[1, 2,]", adapter) == [1, 2]
+    assert load_json_bytes(b"{a: 1}") == {"a": 1}
+
+    # 数据验证失败时直接报错
+    with pytest.raises(ValidationError, match="list_type"):
+        load_json_bytes(b'{"a": 1}', adapter)
+
+
+async def test_load_json_from_file(tmp_path: Path):
+    """根据扩展名选择解析方式，并一次性验证整个文件"""
+    from src.providers.models import StoreTestResultDict
+    from src.providers.utils import load_json_from_file
+
+    path = Path(__file__).parent / "store" / "registry_results.json"
+    results = load_json_from_file(path, StoreTestResultDict)
+    assert list(results) == [
+        "nonebot-plugin-datastore:nonebot_plugin_datastore",
+        "nonebot-plugin-treehelp:nonebot_plugin_treehelp",
+    ]
+    assert results["nonebot-plugin-treehelp:nonebot_plugin_treehelp"].version == "0.3.0"
+
+    json5_path = tmp_path / "data.json5"
+    json5_path.write_text("[\n  {a: 1},\n]\n", encoding="utf-8")
+    assert load_json_from_file(json5_path) == [{"a": 1}]
+
+
+async def test_dump_json(tmp_path: Path):
+    """直接序列化模型，保持压缩与缩进两种格式"""
+    from src.providers.models import Color, Tag
+    from src.providers.utils import dump_json
+
+    data = {"插件": [Tag(label="sync", color=Color("#fff"))], "empty": {}}
+
+    dump_json(tmp_path / "minify.json", data)
+    assert (tmp_path / "minify.json").read_text(encoding="utf-8") == snapshot(
+        '{"插件":[{"label":"sync","color":"#ffffff"}],"empty":{}}'
+    )
+
+    dump_json(tmp_path / "indent.json", data, False)
+    assert (tmp_path / "indent.json").read_text(encoding="utf-8") == snapshot(
+        """\
+{
+  "插件": [
+    {
+      "label": "sync",
+      "color": "#ffffff"
+    }
+  ],
+  "empty": {}
+}\
+"""
+    )
+
+
+async def test_dump_json5(tmp_path: Path):
+    """只在顶层列表的最后一项末尾添加逗号"""
+    from src.providers.utils import dump_json5
+
+    path = tmp_path / "data.json5"
+
+    dump_json5(path, [{"tags": [{"label": "a"}]}])
+    assert path.read_text(encoding="utf-8") == snapshot(
+        """\
+[
+  {
+    "tags": [
+      {
+        "label": "a"
+      }
+    ]
+  },
+]
+"""
+    )
+
+    dump_json5(path, [])
+    assert path.read_text(encoding="utf-8") == snapshot("[]\n")
+
+
+def test_dump_json_unchanged(tmp_path: Path):
+    """内容没有变化时不重新写入文件"""
+    import os
+
+    from src.providers.utils import dump_json, dump_json5
+
+    path = tmp_path / "data.json"
+    assert dump_json(path, {"a": 1})
+    os.utime(path, ns=(0, 0))
+
+    assert not dump_json(path, {"a": 1})
+    assert path.stat().st_mtime_ns == 0
+
+    # 长度相同但内容不同
+    assert dump_json(path, {"a": 2})
+    assert path.read_text(encoding="utf-8") == '{"a":2}'
+
+    json5_path = tmp_path / "data.json5"
+    assert dump_json5(json5_path, [{"a": 1}])
+    assert not dump_json5(json5_path, [{"a": 1}])
+
+
+def test_dump_json_atomic(tmp_path: Path, mocker: MockerFixture):
+    """写入失败时保留原来的文件，且不留下临时文件"""
+    from src.providers.utils import dump_json
+
+    path = tmp_path / "results.json"
+    dump_json(path, {"a": 1})
+
+    mocker.patch("pathlib.Path.replace", side_effect=OSError("写入中断"))
+    with pytest.raises(OSError, match="写入中断"):
+        dump_json(path, {"a": 2})
+
+    assert path.read_text(encoding="utf-8") == '{"a":1}'
+    assert not list(tmp_path.glob("*.tmp"))
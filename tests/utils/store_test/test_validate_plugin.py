@@ -11,17 +11,9 @@ from respx import MockRouter
 def mock_docker_result(path: Path, mocker: MockerFixture):
     from src.providers.docker_test import DockerTestResult
 
-    mock_plugin_test = mocker.MagicMock()
-
-    mocker.patch(
-        "src.providers.store_test.validation.DockerPluginTest",
-        return_value=mock_plugin_test,
-    )
-
-    mock_run = mocker.AsyncMock()
+    mock_run = mocker.patch("src.providers.docker_test.DockerPluginTest.run")
     mock_run.return_value = DockerTestResult(**json.loads(path.read_text()))
-    mock_plugin_test.run = mock_run
-    return mock_plugin_test
+    return mock_run
 
 
 async def test_validate_plugin(mocked_api: MockRouter, mocker: MockerFixture) -> None:
@@ -70,7 +62,7 @@ async def test_validate_plugin(mocked_api: MockRouter, mocker: MockerFixture) ->
                 },
             },
             results={"validation": True, "load": True, "metadata": True},
-            test_env={"unknown": True},
+            test_env={"python==3.12": True},
             version="0.2.0",
         )
     )
@@ -166,7 +158,7 @@ async def test_validate_plugin_with_previous(
                 },
             },
             results={"validation": True, "load": True, "metadata": True},
-            test_env={"unknown": True},
+            test_env={"python==3.12": True},
             version="0.2.0",
         )
     )
@@ -244,7 +236,7 @@ async def test_validate_plugin_skip_test(
                 },
             },
             results={"validation": True, "load": True, "metadata": True},
-            test_env={"unknown": True},
+            test_env={"python==3.12": True},
             version="0.2.0",
         )
     )
@@ -329,7 +321,7 @@ async def test_validate_plugin_skip_test_plugin_test_failed(
                 "metadata": None,
             },
             results={"validation": True, "load": False, "metadata": False},
-            test_env={"unknown": True},
+            test_env={"python==3.12": False},
             version="0.3.9",
         )
     )
@@ -450,7 +442,7 @@ async def test_validate_plugin_failed_with_previous(
                 "metadata": None,
             },
             results={"validation": False, "load": False, "metadata": False},
-            test_env={"unknown": True},
+            test_env={"python==3.12": False},
             version="0.3.9",
         )
     )
@@ -475,3 +467,46 @@ async def test_validate_plugin_failed_with_previous(
     )
 
     assert mocked_api["homepage"].called
+
+
+async def test_validate_plugin_stats(
+    mocked_api: MockRouter, mocker: MockerFixture
+) -> None:
+    """插件测试的耗时与资源占用记录在测试结果中，未记录时不输出"""
+    from src.providers.docker_test import PluginTestStats
+    from src.providers.models import StorePlugin
+    from src.providers.store_test.validation import validate_plugin
+
+    output_path = Path(__file__).parent / "output.json"
+    mock_run = mock_docker_result(output_path, mocker)
+
+    plugin = StorePlugin(
+        module_name="module_name",
+        project_link="project_link",
+        author_id=1,
+        tags=[],
+        is_official=True,
+    )
+
+    result, _ = await validate_plugin(plugin, "")
+    assert result.stats is None
+    assert "stats" not in result.model_dump()
+
+    docker_result = mock_run.return_value
+    docker_result.timings = {"create_poetry_project": 30.0}
+    docker_result.runtime = 42.0
+    docker_result.peak_memory = 1024
+
+    result, _ = await validate_plugin(plugin, "")
+    assert result.stats == snapshot(
+        PluginTestStats(
+            timings={"create_poetry_project": 30.0}, runtime=42.0, peak_memory=1024
+        )
+    )
+    assert result.model_dump()["stats"] == snapshot(
+        {
+            "timings": {"create_poetry_project": 30.0},
+            "runtime": 42.0,
+            "peak_memory": 1024,
+        }
+    )
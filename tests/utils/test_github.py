@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import httpx
+import pytest
+from inline_snapshot import snapshot
+from pytest_mock import MockerFixture
+from respx import MockRouter
+
+NOW = datetime(2023, 8, 28, 12, 0, tzinfo=ZoneInfo("Asia/Shanghai"))
+
+
+def test_user_node_id():
+    """用户 ID 转换为节点 ID"""
+    from src.providers.github import user_node_id
+
+    assert user_node_id(1) == snapshot("U_kgAB")
+    assert user_node_id(200) == snapshot("U_kgDMyA")
+    assert user_node_id(541842) == snapshot("U_kgDOAAhEkg")
+
+
+async def test_resolve_nodes(respx_mock: MockRouter, mocker: MockerFixture):
+    """设置令牌时通过 nodes 查询批量获取，未找到的再通过 REST 接口获取"""
+    from src.providers.github import AuthorResolver
+
+    mocker.patch("src.providers.github.GITHUB_TOKEN", "token")
+
+    def handler(request: httpx.Request):
+        assert json.loads(request.content)["variables"] == {
+            "ids": ["U_kgAB", "U_kgAC", "U_kgAD"]
+        }
+        return httpx.Response(
+            200,
+            json={
+                "data": {
+                    "nodes": [
+                        {"databaseId": 1, "login": "he0119"},
+                        {"databaseId": 2, "login": "BigOrangeQWQ"},
+                        None,
+                    ]
+                },
+                "errors": [{"type": "NOT_FOUND"}],
+            },
+        )
+
+    graphql = respx_mock.post("https://api.github.com/graphql").mock(
+        side_effect=handler
+    )
+    user = respx_mock.get("https://api.github.com/user/3").respond(
+        json={"login": "yanyongyu"}
+    )
+
+    resolver = AuthorResolver(now=NOW)
+    assert await resolver.resolve(3, 1, 2, 1) == snapshot(
+        {3: "yanyongyu", 1: "he0119", 2: "BigOrangeQWQ"}
+    )
+    assert graphql.call_count == 1
+    assert graphql.calls[0].request.headers["Authorization"] == "Bearer token"
+    assert user.call_count == 1
+
+    # 已经获取过的不再请求
+    assert await resolver.resolve(1, 2, 3) == snapshot(
+        {1: "he0119", 2: "BigOrangeQWQ", 3: "yanyongyu"}
+    )
+    assert resolver.requests == 2
+
+
+async def test_resolve_without_token(respx_mock: MockRouter, mocker: MockerFixture):
+    """没有令牌时通过 REST 接口逐个获取，过期后重新获取"""
+    from src.providers.github import AuthorRecord, AuthorResolver, AuthorState
+
+    mocker.patch("src.providers.github.GITHUB_TOKEN", None)
+    user = respx_mock.get("https://api.github.com/user/1").respond(
+        json={"login": "he0119"}
+    )
+    respx_mock.get("https://api.github.com/user/2").respond(404, text="Not Found")
+
+    resolver = AuthorResolver(
+        AuthorState(
+            users={
+                1: AuthorRecord(login="old", time=NOW - timedelta(days=60)),
+                3: AuthorRecord(login="yanyongyu", time=NOW - timedelta(days=1)),
+            }
+        ),
+        ttl=timedelta(days=30),
+        now=NOW,
+    )
+    assert await resolver.resolve(1, 3) == snapshot({1: "he0119", 3: "yanyongyu"})
+    assert user.call_count == 1
+    assert resolver.state.users[1].time == NOW
+
+    with pytest.raises(ValueError, match="获取作者 2 的用户名失败：Not Found"):
+        await resolver.resolve(2)
+
+
+def test_track():
+    """作者 ID 变化时需要重新获取用户名"""
+    from src.providers.github import AuthorResolver
+
+    resolver = AuthorResolver()
+    assert not resolver.track("key", 1)
+    assert not resolver.track("key", 1)
+    assert resolver.track("key", 2)
+    assert resolver.state.keys == {"key": 2}
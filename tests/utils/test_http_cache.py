@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import httpx
+from pytest_mock import MockerFixture
+from respx import MockRouter
+
+from src.providers.constants import REGISTRY_RESULTS_URL
+
+
+def mock_etag(respx_mock: MockRouter, url: str, json: dict) -> None:
+    """ETag 一致时返回 304"""
+
+    def handler(request: httpx.Request):
+        if request.headers.get("If-None-Match") == '"etag"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=json, headers={"ETag": '"etag"'})
+
+    respx_mock.get(url, name="cached").mock(side_effect=handler)
+
+
+async def test_http_cache_revalidate(respx_mock: MockRouter):
+    """再次请求时验证缓存，服务器返回 304 时使用缓存的内容"""
+    from src.providers.cache import http_cache
+    from src.providers.utils import load_json_from_web, load_jsons_from_web
+
+    mock_etag(respx_mock, REGISTRY_RESULTS_URL, {"key": "value"})
+
+    assert load_json_from_web(REGISTRY_RESULTS_URL) == {"key": "value"}
+    assert load_json_from_web(REGISTRY_RESULTS_URL) == {"key": "value"}
+    assert await load_jsons_from_web(REGISTRY_RESULTS_URL) == [{"key": "value"}]
+
+    assert respx_mock["cached"].call_count == 3
+    assert "If-None-Match" not in respx_mock["cached"].calls[0].request.headers
+    assert respx_mock["cached"].calls[1].request.headers["If-None-Match"] == '"etag"'
+    assert http_cache.hits == 2
+    assert http_cache.misses == 1
+
+
+async def test_http_cache_persistent(
+    respx_mock: MockRouter, mocker: MockerFixture, tmp_path: Path
+):
+    """缓存保存在磁盘中，内存中的缓存清除后仍然可以使用"""
+    from src.providers.cache import http_cache
+    from src.providers.utils import load_json_from_web
+
+    cache_dir = tmp_path / "cache"
+    mocker.patch.object(http_cache, "cache_dir", cache_dir)
+    mock_etag(respx_mock, REGISTRY_RESULTS_URL, {"key": "value"})
+
+    assert load_json_from_web(REGISTRY_RESULTS_URL) == {"key": "value"}
+    assert len(list(cache_dir.iterdir())) == 1
+
+    http_cache.clear()
+    assert load_json_from_web(REGISTRY_RESULTS_URL) == {"key": "value"}
+
+    assert respx_mock["cached"].calls[1].request.headers["If-None-Match"] == '"etag"'
+    assert http_cache.hits == 1
+    assert http_cache.misses == 0
+
+
+async def test_http_cache_lru(respx_mock: MockRouter, mocker: MockerFixture):
+    """内存中只保留最近使用的响应"""
+    from src.providers.cache import http_cache
+    from src.providers.utils import load_json_from_web
+
+    mocker.patch.object(http_cache, "maxsize", 1)
+    mock_etag(respx_mock, "https://example.com/a.json", {"a": 1})
+    respx_mock.get("https://example.com/b.json").respond(
+        json={"b": 1}, headers={"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    )
+
+    load_json_from_web("https://example.com/a.json")
+    load_json_from_web("https://example.com/b.json")
+
+    assert http_cache.get("https://example.com/a.json") is None
+    assert http_cache.get("https://example.com/b.json") is not None